@@ -1,13 +1,34 @@
 import streamlit as st
 import os
 import datetime
+import time
 import random
+import bisect
+import csv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 import logging
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
 import io
+import json
+import re
+import heapq
+import gzip
+import hashlib
+import shutil
+import math
+import queue
+from enum import Enum
+import concurrent.futures
+import atexit
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass
 import folium
 from folium.plugins import Geocoder
 
@@ -26,6 +47,12 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
     st.stop()
 
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 try:
     from gtts import gTTS
     GTTS_AVAILABLE = True
@@ -33,15 +60,83 @@ except ImportError:
     st.error("Required library `gTTS` not found for audio playback. Install: `pip install gTTS`")
     GTTS_AVAILABLE = False
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 
 load_dotenv()
 log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-WEATHER_API_URL = "http://api.openweathermap.org/data/2.5/forecast"
+WEATHER_API_URL = os.environ.get("WEATHER_API_URL", "http://api.openweathermap.org/data/2.5/forecast")
+WEATHER_CONNECT_TIMEOUT_S = float(os.environ.get("WEATHER_CONNECT_TIMEOUT_S", "3.05"))
+WEATHER_READ_TIMEOUT_S = float(os.environ.get("WEATHER_READ_TIMEOUT_S", "15"))
+WEATHER_MAX_RETRIES = int(os.environ.get("WEATHER_MAX_RETRIES", "3"))
+WEATHER_BACKOFF_FACTOR = float(os.environ.get("WEATHER_BACKOFF_FACTOR", "0.5"))
+WEATHER_BACKOFF_JITTER_S = float(os.environ.get("WEATHER_BACKOFF_JITTER_S", "0.25"))
+WEATHER_BACKOFF_MAX_S = float(os.environ.get("WEATHER_BACKOFF_MAX_S", "8"))
+WEATHER_RETRY_AFTER_MAX_S = float(os.environ.get("WEATHER_RETRY_AFTER_MAX_S", "10"))
+WEATHER_RETRY_STATUSES = (429, 500, 502, 503, 504)
+WEATHER_POOL_SIZE = int(os.environ.get("WEATHER_POOL_SIZE", "10"))
+WEATHER_BREAKER_THRESHOLD = int(os.environ.get("WEATHER_BREAKER_THRESHOLD", "5"))
+WEATHER_BREAKER_RESET_S = float(os.environ.get("WEATHER_BREAKER_RESET_S", "60"))
+WEATHER_LATENCY_BUDGET_S = float(os.environ.get("WEATHER_LATENCY_BUDGET_S", "3"))
+WEATHER_STALE_MAX_AGE_S = float(os.environ.get("WEATHER_STALE_MAX_AGE_S", str(48 * 60 * 60)))
+WEATHER_REFRESH_WORKERS = int(os.environ.get("WEATHER_REFRESH_WORKERS", "4"))
+WEATHER_COALESCE_LOCK_DIR = os.environ.get("WEATHER_COALESCE_LOCK_DIR", "")
+WEATHER_COALESCE_LOCK_WAIT_S = float(os.environ.get("WEATHER_COALESCE_LOCK_WAIT_S", "20"))
+WEATHER_QUOTA_PER_MINUTE = float(os.environ.get("WEATHER_QUOTA_PER_MINUTE", "60"))
+WEATHER_QUOTA_BURST = float(os.environ.get("WEATHER_QUOTA_BURST", "10"))
+WEATHER_QUOTA_MAX_WAIT_S = float(os.environ.get("WEATHER_QUOTA_MAX_WAIT_S", "30"))
+WEATHER_QUOTA_BACKGROUND_WAIT_S = float(os.environ.get("WEATHER_QUOTA_BACKGROUND_WAIT_S", "5"))
+WEATHER_PRIORITY_INTERACTIVE = 0
+WEATHER_PRIORITY_BACKGROUND = 1
+WEATHER_CACHE_PATH = os.environ.get("WEATHER_CACHE_PATH", "weather_cache.sqlite")
+WEATHER_CACHE_GRID_DEG = float(os.environ.get("WEATHER_CACHE_GRID_DEG", "0.05"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.environ.get("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+WEATHER_FORECAST_CADENCE_S = 3 * 60 * 60
+CONTEXT_BUNDLE_PATH = os.environ.get("CONTEXT_BUNDLE_PATH", "context_bundles.sqlite")
+CONTEXT_BUNDLE_TTL_S = float(os.environ.get("CONTEXT_BUNDLE_TTL_S", str(24 * 60 * 60)))
+CONTEXT_BUNDLE_MAX_ENTRIES = int(os.environ.get("CONTEXT_BUNDLE_MAX_ENTRIES", "4096"))
+MARKET_DEFAULT_CROP = "Wheat"
+MARKET_DEFAULT_NAME = "Nearby Mandi"
+MARKET_CROP_KEYWORDS = [
+    ("Rice", ["rice", "chawal", "धान", "चावल", "அரிசி", "চাল", "బియ్యం", "तांदूळ"]),
+    ("Maize", ["maize", "makka", "मक्का", "சோளம்", "ভুট্টা", "మొక్కజొన్న", "मका"]),
+    ("Cotton", ["cotton", "kapas", "कपास", "பருத்தி", "তুলা", "పత్తి", "कापूस"]),
+    ("Tomato", ["tomato", "tamatar", "टमाटर", "தக்காளி", "টমেটো", "టమోటా", "टोमॅटो"]),
+]
+MARKET_CROPS = [MARKET_DEFAULT_CROP] + [crop for crop, _ in MARKET_CROP_KEYWORDS]
 FARMER_CSV_PATH = "Data.csv"
+FARMER_SQLITE_PATH = os.environ.get("FARMER_SQLITE_PATH", "Data.db")
+FARMER_PARQUET_PATH = os.environ.get("FARMER_PARQUET_PATH", "Data.parquet")
+FARMER_DB_BACKEND = os.environ.get("FARMER_DB_BACKEND", "csv").strip().lower()
+FARMER_STORE_PATH = FARMER_PARQUET_PATH if FARMER_DB_BACKEND == 'parquet' else FARMER_CSV_PATH
+FARMER_JOURNAL_PATH = FARMER_STORE_PATH + ".journal"
+FARMER_JOURNAL_COMPACT_THRESHOLD = int(os.environ.get("FARMER_JOURNAL_COMPACT_THRESHOLD", "500"))
+FARMER_SPATIAL_CELL_DEG = float(os.environ.get("FARMER_SPATIAL_CELL_DEG", "0.25"))
+EARTH_RADIUS_KM = 6371.0088
 QA_LOG_PATH = "Log.csv"
+QA_LOG_DIR = os.environ.get("QA_LOG_DIR", "qa_logs")
+QA_LOG_INDEX_PATH = os.path.join(QA_LOG_DIR, "index.csv")
+QA_LOG_COMPRESS_CLOSED = os.environ.get("QA_LOG_COMPRESS_CLOSED", "1").strip().lower() not in ("0", "false", "no")
+QA_LOG_BLOB_PATH = os.path.join(QA_LOG_DIR, "prompt_blobs.pack")
+QA_LOG_DEDUP_PROMPTS = os.environ.get("QA_LOG_DEDUP_PROMPTS", "1").strip().lower() not in ("0", "false", "no")
+PROMPT_BLOCK_SEPARATOR = "\n\n"
+PROMPT_REF_PREFIX = "@blocks:"
+PROMPT_DIGEST_LENGTH = 16
+QA_LOG_QUEUE_SIZE = int(os.environ.get("QA_LOG_QUEUE_SIZE", "1000"))
+QA_LOG_BATCH_SIZE = int(os.environ.get("QA_LOG_BATCH_SIZE", "100"))
+QA_LOG_FLUSH_INTERVAL_S = float(os.environ.get("QA_LOG_FLUSH_INTERVAL_S", "1.0"))
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", "10"))
+HISTORY_SEARCH_LIMIT = int(os.environ.get("HISTORY_SEARCH_LIMIT", "20"))
+HISTORY_SEARCH_MAX_FARMERS = int(os.environ.get("HISTORY_SEARCH_MAX_FARMERS", "256"))
+BM25_K1 = 1.5
+BM25_B = 0.75
 CSV_COLUMNS = ['name', 'language', 'latitude', 'longitude', 'soil_type', 'farm_size_ha']
 QA_LOG_COLUMNS = ['timestamp', 'farmer_name', 'language', 'query', 'response', 'internal_prompt']
 
@@ -75,7 +170,7 @@ translations = {
         "gemini_key_label": "Google Gemini API Key", "gemini_key_help": "Required for AI responses.", "weather_key_label": "OpenWeatherMap API Key",
         "weather_key_help": "Required for weather forecasts.", "sidebar_profile_header": "👤 Farmer Profile", "farmer_name_label": "Enter Farmer Name",
         "load_profile_button": "Load Profile", "new_profile_button": "New Profile", "profile_loaded_success": "Loaded profile for {name}.",
-        "profile_not_found_warning": "No profile found for '{name}'. Click 'New Profile' to create one.", "profile_exists_warning": "Profile for '{name}' already exists. Loading existing profile.",
+        "name_suggestions_label": "Did you mean:", "profile_not_found_warning": "No profile found for '{name}'. Click 'New Profile' to create one.", "profile_exists_warning": "Profile for '{name}' already exists. Loading existing profile.",
         "creating_profile_info": "Creating new profile for '{name}'. Fill details below.", "new_profile_form_header": "New Profile for {name}",
         "pref_lang_label": "Preferred Language", "soil_type_label": "Select Soil Type",
         "location_method_label": "Set Farm Location",
@@ -129,6 +224,8 @@ translations = {
         "location_not_set_description": "Location Not Set",
         "past_interactions_header": "All Past Interactions for {name}",
         "log_entry_display": "<small>**Timestamp:** {timestamp}<br>**Query:** {query}<br>**Answer ({lang}):** {response}</small>\n\n---\n",
+        "history_date_range_label": "Filter by date range", "history_load_more_button": "Load more", "history_showing_count": "Showing {shown} of {total} interactions", "history_search_label": "Search this farmer's history", "history_search_results": "{count} matching interactions, best first", "history_search_no_results": "No past interactions match '{query}'.", "weather_stale_label": "⚠️ Live weather is unavailable; this forecast was fetched {age} ago.", "weather_age_minutes": "{minutes} min", "weather_age_hours": "{hours} h",
+        "day_label_mon": "Mon", "day_label_tue": "Tue", "day_label_wed": "Wed", "day_label_thu": "Thu", "day_label_fri": "Fri", "day_label_sat": "Sat", "day_label_sun": "Sun", "weather_alert_heavy_rain": "Heavy Rain ({value:.1f}mm/3h)", "weather_alert_moderate_rain": "Moderate Rain ({value:.1f}mm/3h)", "weather_alert_very_high_temp": "Very High Temp ({value}°C)", "weather_alert_high_temp": "High Temp ({value}°C)", "weather_alert_low_temp": "Low Temp ({value}°C)", "weather_alert_very_strong_wind": "Very Strong Wind ({value}km/h)", "weather_alert_strong_wind": "Strong Wind ({value}km/h)",
         "no_past_interactions": "No past interactions logged for this farmer.",
         "system_error_label": "System Error", "log_file_corrupt_columns": "Error: Past interactions log file ({path}) is missing expected columns: {cols}. Please check or recreate the file.",
         "error_displaying_logs": "Error reading or displaying past interactions: {error}", "profile_reload_error_after_save": "Internal error: Could not reload profile immediately after saving/updating. Please try loading it manually.",
@@ -142,6 +239,9 @@ translations = {
         "weather_error_429": "Weather Forecast Error: API rate limit exceeded. Please try again later.",
         "weather_error_http": "Weather Forecast Error: Could not fetch weather data (HTTP {status_code}).",
         "weather_error_network": "Network error connecting to weather service. Please check your internet connection.",
+        "weather_error_circuit_open": "Weather service is temporarily unavailable. Retrying automatically in about {seconds} seconds.",
+        "weather_error_timeout": "Weather service did not respond within {seconds} seconds and no earlier forecast is available.",
+        "weather_error_quota": "Weather request limit reached for this minute. Please try again in about {seconds} seconds.",
         "weather_error_unexpected": "An unexpected error occurred while getting or processing weather data: {error}",
         "weather_error_unknown": "Could not get weather forecast (unknown reason).",
         "your_area": "your area", "unknown_farmer": "Unknown Farmer", "not_set_label": "Not Set",
@@ -159,7 +259,7 @@ translations = {
         "page_title": "कृषि-सहायक एआई", "page_caption": "एआई-संचालित कृषि सलाह", "sidebar_config_header": "⚙️ सेटिंग",
         "gemini_key_label": "गूगल जेमिनी एपीआई कुंजी", "gemini_key_help": "एआई प्रतिक्रियाओं के लिए आवश्यक।", "weather_key_label": "ओपनवेदरमैप एपीआई कुंजी",
         "weather_key_help": "मौसम पूर्वानुमान के लिए आवश्यक।", "sidebar_profile_header": "👤 किसान प्रोफाइल", "farmer_name_label": "किसान का नाम दर्ज करें", "load_profile_button": "प्रोफ़ाइल लोड करें",
-        "new_profile_button": "नई प्रोफ़ाइल", "profile_loaded_success": "{name} के लिए प्रोफ़ाइल लोड की गई।", "profile_not_found_warning": "'{name}' के लिए कोई प्रोफ़ाइल नहीं मिली। 'नई प्रोफ़ाइल' बनाने के लिए क्लिक करें।",
+        "new_profile_button": "नई प्रोफ़ाइल", "profile_loaded_success": "{name} के लिए प्रोफ़ाइल लोड की गई।", "name_suggestions_label": "क्या आपका मतलब था:", "profile_not_found_warning": "'{name}' के लिए कोई प्रोफ़ाइल नहीं मिली। 'नई प्रोफ़ाइल' बनाने के लिए क्लिक करें।",
         "profile_exists_warning": "'{name}' के लिए प्रोफ़ाइल पहले से मौजूद है। मौजूदा प्रोफ़ाइल लोड हो रही है।", "creating_profile_info": "'{name}' के लिए नई प्रोफ़ाइल बनाई जा रही है। नीचे विवरण भरें।",
         "new_profile_form_header": "{name} के लिए नई प्रोफ़ाइल", "pref_lang_label": "पसंदीदा भाषा", "soil_type_label": "मिट्टी का प्रकार चुनें",
         "location_method_label": "खेत का स्थान निर्धारित करें",
@@ -211,6 +311,8 @@ translations = {
         "location_set_description": "खेत {lat:.2f},{lon:.2f} के पास", "location_not_set_description": "स्थान निर्धारित नहीं है",
         "past_interactions_header": "{name} के लिए सभी पिछली बातचीत",
         "log_entry_display": "<small>**समय:** {timestamp}<br>**प्रश्न:** {query}<br>**उत्तर ({lang}):** {response}</small>\n\n---\n",
+        "history_date_range_label": "तिथि सीमा से फ़िल्टर करें", "history_load_more_button": "और लोड करें", "history_showing_count": "{total} में से {shown} बातचीत दिखाई जा रही हैं", "history_search_label": "इस किसान का इतिहास खोजें", "history_search_results": "{count} मिलती-जुलती बातचीत, सबसे प्रासंगिक पहले", "history_search_no_results": "'{query}' से मेल खाती कोई पिछली बातचीत नहीं मिली।", "weather_stale_label": "⚠️ ताज़ा मौसम उपलब्ध नहीं है; यह पूर्वानुमान {age} पहले प्राप्त किया गया था।", "weather_age_minutes": "{minutes} मिनट", "weather_age_hours": "{hours} घंटे",
+        "day_label_mon": "सोम", "day_label_tue": "मंगल", "day_label_wed": "बुध", "day_label_thu": "गुरु", "day_label_fri": "शुक्र", "day_label_sat": "शनि", "day_label_sun": "रवि", "weather_alert_heavy_rain": "भारी बारिश ({value:.1f}मिमी/3घं)", "weather_alert_moderate_rain": "मध्यम बारिश ({value:.1f}मिमी/3घं)", "weather_alert_very_high_temp": "बहुत अधिक तापमान ({value}°C)", "weather_alert_high_temp": "उच्च तापमान ({value}°C)", "weather_alert_low_temp": "कम तापमान ({value}°C)", "weather_alert_very_strong_wind": "बहुत तेज़ हवा ({value}किमी/घं)", "weather_alert_strong_wind": "तेज़ हवा ({value}किमी/घं)",
         "no_past_interactions": "इस किसान के लिए कोई पिछली बातचीत लॉग नहीं की गई।",
         "system_error_label": "सिस्टम त्रुटि", "log_file_corrupt_columns": "त्रुटि: पिछली बातचीत की लॉग फ़ाइल ({path}) में अपेक्षित कॉलम गायब हैं: {cols}। कृपया फ़ाइल जाँचें या पुनः बनाएँ।",
         "error_displaying_logs": "पिछली बातचीत पढ़ते या प्रदर्शित करते समय त्रुटि: {error}", "profile_reload_error_after_save": "आंतरिक त्रुटि: सहेजने/अपडेट करने के तुरंत बाद प्रोफ़ाइल पुनः लोड नहीं हो सकी। कृपया इसे मैन्युअल रूप से लोड करने का प्रयास करें।",
@@ -223,6 +325,9 @@ translations = {
         "weather_error_429": "मौसम पूर्वानुमान त्रुटि: एपीआई दर सीमा पार हो गई। कृपया बाद में पुनः प्रयास करें।",
         "weather_error_http": "मौसम पूर्वानुमान त्रुटि: मौसम डेटा प्राप्त नहीं किया जा सका (HTTP {status_code})।",
         "weather_error_network": "मौसम सेवा से कनेक्ट करने में नेटवर्क त्रुटि। कृपया अपना इंटरनेट कनेक्शन जांचें।",
+        "weather_error_circuit_open": "मौसम सेवा अस्थायी रूप से उपलब्ध नहीं है। लगभग {seconds} सेकंड में अपने आप पुनः प्रयास किया जाएगा।",
+        "weather_error_timeout": "मौसम सेवा ने {seconds} सेकंड में जवाब नहीं दिया और कोई पिछला पूर्वानुमान उपलब्ध नहीं है।",
+        "weather_error_quota": "इस मिनट के लिए मौसम अनुरोधों की सीमा पूरी हो गई है। कृपया लगभग {seconds} सेकंड बाद फिर से प्रयास करें।",
         "weather_error_unexpected": "मौसम डेटा प्राप्त करते या संसाधित करते समय एक अप्रत्याशित त्रुटि हुई: {error}",
         "weather_error_unknown": "मौसम पूर्वानुमान प्राप्त नहीं किया जा सका (अज्ञात कारण)।",
         "your_area": "आपका क्षेत्र", "unknown_farmer": "अज्ञात किसान", "not_set_label": "सेट नहीं",
@@ -251,7 +356,7 @@ translations = {
         "sidebar_profile_header": "👤 விவசாயி விவரக்குறிப்பு", "farmer_name_label": "விவசாயி பெயரை உள்ளிடவும்",
         "load_profile_button": "சுயவிவரத்தை ஏற்று", "new_profile_button": "புதிய சுயவிவரம்",
         "profile_loaded_success": "{name} க்கான சுயவிவரம் ஏற்றப்பட்டது.",
-        "profile_not_found_warning": "'{name}' க்கான சுயவிவரம் இல்லை. புதிய ஒன்றை உருவாக்க 'புதிய சுயவிவரம்' என்பதைக் கிளிக் செய்யவும்.",
+        "name_suggestions_label": "நீங்கள் குறிப்பிட்டது இதுவா:", "profile_not_found_warning": "'{name}' க்கான சுயவிவரம் இல்லை. புதிய ஒன்றை உருவாக்க 'புதிய சுயவிவரம்' என்பதைக் கிளிக் செய்யவும்.",
         "profile_exists_warning": "'{name}' க்கான சுயவிவரம் ஏற்கனவே உள்ளது. தற்போதுள்ள சுயவிவரத்தை ஏற்றுகிறது.",
         "creating_profile_info": "'{name}' க்கான புதிய சுயவிவரத்தை உருவாக்குகிறது. கீழே உள்ள விவரங்களை நிரப்பவும்.",
         "new_profile_form_header": "{name} க்கான புதிய சுயவிவரம்",
@@ -297,6 +402,8 @@ translations = {
         "context_data_general": "Farmer Question: '{query}'. (Provide a comprehensive agricultural answer based on profile/history/general knowledge.)",
         "context_footer_general": "--- End General Query Context ---",
         "log_entry_display": "<small>**நேரம்:** {timestamp}<br>**கேள்வி:** {query}<br>**பதில் ({lang}):** {response}</small>\n\n---\n",
+        "history_date_range_label": "தேதி வரம்பின்படி வடிகட்டவும்", "history_load_more_button": "மேலும் ஏற்றவும்", "history_showing_count": "{total} உரையாடல்களில் {shown} காட்டப்படுகின்றன", "history_search_label": "இந்த விவசாயியின் வரலாற்றில் தேடவும்", "history_search_results": "{count} பொருந்தும் உரையாடல்கள், சிறந்தவை முதலில்", "history_search_no_results": "'{query}' உடன் பொருந்தும் முந்தைய உரையாடல்கள் இல்லை.", "weather_stale_label": "⚠️ நேரடி வானிலை கிடைக்கவில்லை; இந்த முன்னறிவிப்பு {age} முன்பு பெறப்பட்டது.", "weather_age_minutes": "{minutes} நிமிடம்", "weather_age_hours": "{hours} மணி நேரம்",
+        "day_label_mon": "திங்", "day_label_tue": "செவ்", "day_label_wed": "புத", "day_label_thu": "வியா", "day_label_fri": "வெள்", "day_label_sat": "சனி", "day_label_sun": "ஞாயி", "weather_alert_heavy_rain": "கனமழை ({value:.1f}மிமீ/3ம)", "weather_alert_moderate_rain": "மிதமான மழை ({value:.1f}மிமீ/3ம)", "weather_alert_very_high_temp": "மிக அதிக வெப்பநிலை ({value}°C)", "weather_alert_high_temp": "அதிக வெப்பநிலை ({value}°C)", "weather_alert_low_temp": "குறைந்த வெப்பநிலை ({value}°C)", "weather_alert_very_strong_wind": "மிக பலத்த காற்று ({value}கிமீ/ம)", "weather_alert_strong_wind": "பலத்த காற்று ({value}கிமீ/ம)",
         "weather_rain_display": f" மழை: {{value:.1f}}மிமீ",
     },
     "Bengali": {
@@ -317,7 +424,7 @@ translations = {
         "sidebar_profile_header": "👤 কৃষক প্রোফাইল", "farmer_name_label": "কৃষকের নাম লিখুন",
         "load_profile_button": "প্রোফাইল লোড করুন", "new_profile_button": "নতুন প্রোফাইল",
         "profile_loaded_success": "{name} এর জন্য প্রোফাইল লোড করা হয়েছে।",
-        "profile_not_found_warning": "'{name}' এর জন্য কোন প্রোফাইল পাওয়া যায়নি। একটি তৈরি করতে 'নতুন প্রোফাইল' ক্লিক করুন।",
+        "name_suggestions_label": "আপনি কি এটি বোঝাতে চেয়েছেন:", "profile_not_found_warning": "'{name}' এর জন্য কোন প্রোফাইল পাওয়া যায়নি। একটি তৈরি করতে 'নতুন প্রোফাইল' ক্লিক করুন।",
         "profile_exists_warning": "'{name}' এর প্রোফাইল ইতিমধ্যে বিদ্যমান। বিদ্যমান প্রোফাইল লোড হচ্ছে।",
         "creating_profile_info": "'{name}' এর জন্য নতুন প্রোফাইল তৈরি করা হচ্ছে। নিচে বিবরণ পূরণ করুন।",
         "new_profile_form_header": "{name} এর জন্য নতুন প্রোফাইল", "pref_lang_label": "পছন্দের ভাষা",
@@ -362,6 +469,8 @@ translations = {
         "context_data_general": "Farmer Question: '{query}'. (Provide a comprehensive agricultural answer based on profile/history/general knowledge.)",
         "context_footer_general": "--- End General Query Context ---",
         "log_entry_display": "<small>**সময়:** {timestamp}<br>**প্রশ্ন:** {query}<br>**উত্তর ({lang}):** {response}</small>\n\n---\n",
+        "history_date_range_label": "তারিখের পরিসর অনুযায়ী ফিল্টার করুন", "history_load_more_button": "আরও লোড করুন", "history_showing_count": "{total}টির মধ্যে {shown}টি কথোপকথন দেখানো হচ্ছে", "history_search_label": "এই কৃষকের ইতিহাসে খুঁজুন", "history_search_results": "{count}টি মিল পাওয়া কথোপকথন, সবচেয়ে প্রাসঙ্গিক আগে", "history_search_no_results": "'{query}' এর সাথে মেলে এমন কোনো পূর্ববর্তী কথোপকথন নেই।", "weather_stale_label": "⚠️ সরাসরি আবহাওয়া পাওয়া যাচ্ছে না; এই পূর্বাভাস {age} আগে আনা হয়েছিল।", "weather_age_minutes": "{minutes} মিনিট", "weather_age_hours": "{hours} ঘণ্টা",
+        "day_label_mon": "সোম", "day_label_tue": "মঙ্গল", "day_label_wed": "বুধ", "day_label_thu": "বৃহস্পতি", "day_label_fri": "শুক্র", "day_label_sat": "শনি", "day_label_sun": "রবি", "weather_alert_heavy_rain": "ভারী বৃষ্টি ({value:.1f}মিমি/৩ঘ)", "weather_alert_moderate_rain": "মাঝারি বৃষ্টি ({value:.1f}মিমি/৩ঘ)", "weather_alert_very_high_temp": "অত্যধিক তাপমাত্রা ({value}°C)", "weather_alert_high_temp": "উচ্চ তাপমাত্রা ({value}°C)", "weather_alert_low_temp": "নিম্ন তাপমাত্রা ({value}°C)", "weather_alert_very_strong_wind": "অত্যন্ত প্রবল বাতাস ({value}কিমি/ঘ)", "weather_alert_strong_wind": "প্রবল বাতাস ({value}কিমি/ঘ)",
         "weather_rain_display": f" বৃষ্টি: {{value:.1f}}মিমি",
     },
     "Telugu": {
@@ -382,7 +491,7 @@ translations = {
         "sidebar_profile_header": "👤 రైతు ప్రొఫైల్", "farmer_name_label": "రైతు పేరు నమోదు చేయండి",
         "load_profile_button": "ప్రొఫైల్ లోడ్ చేయండి", "new_profile_button": "కొత్త ప్రొఫైల్",
         "profile_loaded_success": "{name} కోసం ప్రొఫైల్ లోడ్ చేయబడింది.",
-        "profile_not_found_warning": "'{name}' కోసం ప్రొఫైల్ కనుగొనబడలేదు. కొత్తది సృష్టించడానికి 'కొత్త ప్రొఫైల్' క్లిక్ చేయండి.",
+        "name_suggestions_label": "మీ ఉద్దేశ్యం ఇదేనా:", "profile_not_found_warning": "'{name}' కోసం ప్రొఫైల్ కనుగొనబడలేదు. కొత్తది సృష్టించడానికి 'కొత్త ప్రొఫైల్' క్లిక్ చేయండి.",
         "profile_exists_warning": "'{name}' కోసం ప్రొఫైల్ ఇప్పటికే ఉంది. ఇప్పటికే ఉన్న ప్రొఫైల్ లోడ్ అవుతోంది.",
         "creating_profile_info": "'{name}' కోసం కొత్త ప్రొఫైల్ సృష్టిస్తోంది. క్రింద వివరాలను పూరించండి.",
         "new_profile_form_header": "{name} కోసం కొత్త ప్రొఫైల్", "pref_lang_label": "ఇష్టపడే భాష",
@@ -427,6 +536,8 @@ translations = {
         "context_data_general": "Farmer Question: '{query}'. (Provide a comprehensive agricultural answer based on profile/history/general knowledge.)",
         "context_footer_general": "--- End General Query Context ---",
         "log_entry_display": "<small>**సమయం:** {timestamp}<br>**ప్రశ్న:** {query}<br>**సమాధానం ({lang}):** {response}</small>\n\n---\n",
+        "history_date_range_label": "తేదీ పరిధి ద్వారా ఫిల్టర్ చేయండి", "history_load_more_button": "మరిన్ని లోడ్ చేయండి", "history_showing_count": "{total} సంభాషణలలో {shown} చూపబడుతున్నాయి", "history_search_label": "ఈ రైతు చరిత్రలో వెతకండి", "history_search_results": "{count} సరిపోలిన సంభాషణలు, ఉత్తమమైనవి ముందు", "history_search_no_results": "'{query}' కు సరిపోలే గత సంభాషణలు లేవు.", "weather_stale_label": "⚠️ ప్రత్యక్ష వాతావరణం అందుబాటులో లేదు; ఈ సూచన {age} క్రితం పొందబడింది.", "weather_age_minutes": "{minutes} నిమిషాలు", "weather_age_hours": "{hours} గంటలు",
+        "day_label_mon": "సోమ", "day_label_tue": "మంగళ", "day_label_wed": "బుధ", "day_label_thu": "గురు", "day_label_fri": "శుక్ర", "day_label_sat": "శని", "day_label_sun": "ఆది", "weather_alert_heavy_rain": "భారీ వర్షం ({value:.1f}మిమీ/3గం)", "weather_alert_moderate_rain": "మోస్తరు వర్షం ({value:.1f}మిమీ/3గం)", "weather_alert_very_high_temp": "చాలా అధిక ఉష్ణోగ్రత ({value}°C)", "weather_alert_high_temp": "అధిక ఉష్ణోగ్రత ({value}°C)", "weather_alert_low_temp": "తక్కువ ఉష్ణోగ్రత ({value}°C)", "weather_alert_very_strong_wind": "చాలా బలమైన గాలి ({value}కిమీ/గం)", "weather_alert_strong_wind": "బలమైన గాలి ({value}కిమీ/గం)",
         "weather_rain_display": f" వర్షం: {{value:.1f}}మిమీ",
     },
     "Marathi": {
@@ -447,7 +558,7 @@ translations = {
         "sidebar_profile_header": "👤 शेतकरी प्रोफाइल", "farmer_name_label": "शेतकऱ्याचे नाव प्रविष्ट करा",
         "load_profile_button": "प्रोफाइल लोड करा", "new_profile_button": "नवीन प्रोफाइल",
         "profile_loaded_success": "{name} साठी प्रोफाइल लोड केले.",
-        "profile_not_found_warning": "'{name}' साठी कोणतेही प्रोफाइल आढळले नाही. तयार करण्यासाठी 'नवीन प्रोफाइल' क्लिक करा.",
+        "name_suggestions_label": "तुम्हाला हे म्हणायचे आहे का:", "profile_not_found_warning": "'{name}' साठी कोणतेही प्रोफाइल आढळले नाही. तयार करण्यासाठी 'नवीन प्रोफाइल' क्लिक करा.",
         "profile_exists_warning": "'{name}' साठी प्रोफाइल आधीपासूनच अस्तित्वात आहे. विद्यमान प्रोफाइल लोड करत आहे.",
         "creating_profile_info": "'{name}' साठी नवीन प्रोफाइल तयार करत आहे. खाली तपशील भरा.",
         "new_profile_form_header": "{name} साठी नवीन प्रोफाइल", "pref_lang_label": "पसंतीची भाषा",
@@ -492,17 +603,21 @@ translations = {
         "context_data_general": "Farmer Question: '{query}'. (Provide a comprehensive agricultural answer based on profile/history/general knowledge.)",
         "context_footer_general": "--- End General Query Context ---",
         "log_entry_display": "<small>**वेळ:** {timestamp}<br>**प्रश्न:** {query}<br>**उत्तर ({lang}):** {response}</small>\n\n---\n",
+        "history_date_range_label": "तारीख श्रेणीनुसार फिल्टर करा", "history_load_more_button": "आणखी लोड करा", "history_showing_count": "{total} पैकी {shown} संवाद दाखवत आहे", "history_search_label": "या शेतकऱ्याचा इतिहास शोधा", "history_search_results": "{count} जुळणारे संवाद, सर्वात संबंधित आधी", "history_search_no_results": "'{query}' शी जुळणारे कोणतेही मागील संवाद नाहीत.", "weather_stale_label": "⚠️ थेट हवामान उपलब्ध नाही; हा अंदाज {age} पूर्वी मिळवला होता.", "weather_age_minutes": "{minutes} मिनिटे", "weather_age_hours": "{hours} तास",
+        "day_label_mon": "सोम", "day_label_tue": "मंगळ", "day_label_wed": "बुध", "day_label_thu": "गुरु", "day_label_fri": "शुक्र", "day_label_sat": "शनि", "day_label_sun": "रवि", "weather_alert_heavy_rain": "मुसळधार पाऊस ({value:.1f}मिमी/3ता)", "weather_alert_moderate_rain": "मध्यम पाऊस ({value:.1f}मिमी/3ता)", "weather_alert_very_high_temp": "खूप जास्त तापमान ({value}°C)", "weather_alert_high_temp": "जास्त तापमान ({value}°C)", "weather_alert_low_temp": "कमी तापमान ({value}°C)", "weather_alert_very_strong_wind": "खूप जोरदार वारा ({value}किमी/ता)", "weather_alert_strong_wind": "जोरदार वारा ({value}किमी/ता)",
         "weather_rain_display": f" पाऊस: {{value:.1f}}मिमी",
     },
 
 }
 
 
-def _format_translation(template, **kwargs):
+def _format_translation(template, language="English", **kwargs):
     formatted_kwargs = {}
     for k, v in kwargs.items():
         if pd.isna(v):
-             formatted_kwargs[k] = ui_translator("value_na", default="N/A")
+             formatted_kwargs[k] = translate_for(language, "value_na", default="N/A")
+        elif isinstance(v, (int, float)) and f"{{{k}:" in str(template):
+             formatted_kwargs[k] = v
         elif isinstance(v, float):
              if k in ['price_start', 'price_end', 'farm_size_ha']: formatted_kwargs[k] = f"{v:.2f}"
              elif k in ['latitude', 'longitude']: formatted_kwargs[k] = f"{v:.6f}"
@@ -542,30 +657,406 @@ def _format_translation(template, **kwargs):
         logger.error(f"Translator: Unexpected format error with args {formatted_kwargs}: {e}. Template: '{template}'", exc_info=False)
         return template
 
-def ui_translator(key, default=None, **kwargs):
+def current_ui_language():
     selected_language = st.session_state.get('selected_language', "English")
-
     if selected_language not in translations:
         if selected_language != "English":
             logger.warning(f"Selected language '{selected_language}' not found in translations. Falling back to English.")
             selected_language = "English"
             st.session_state.selected_language = "English"
+    return selected_language
 
-    lang_dict = translations.get(selected_language, translations["English"])
+
+def translate_for(language, key, default=None, **kwargs):
+    lang_dict = translations.get(language, translations["English"])
     default_lang_dict = translations.get("English", {})
 
     template = lang_dict.get(key)
     if template is None:
         template = default_lang_dict.get(key)
         if template is None:
-            missing_key_msg = f"[{key} NOT FOUND in {selected_language} or English]"
-            logger.debug(f"Translation key '{key}' not found for language '{selected_language}' or fallback 'English'.")
+            missing_key_msg = f"[{key} NOT FOUND in {language} or English]"
+            logger.debug(f"Translation key '{key}' not found for language '{language}' or fallback 'English'.")
             template = default if default is not None else missing_key_msg
 
-    return _format_translation(template, **kwargs)
+    return _format_translation(template, language, **kwargs)
+
+
+def ui_translator(key, default=None, **kwargs):
+    return translate_for(current_ui_language(), key, default, **kwargs)
+
+
+FARMER_SCHEMA = {
+    'name': {'type': 'text', 'default': '', 'required': True},
+    'language': {'type': 'text', 'default': 'English', 'allowed': list(translations.keys())},
+    'latitude': {'type': 'number', 'default': PROFILE_DEFAULT_LAT},
+    'longitude': {'type': 'number', 'default': PROFILE_DEFAULT_LON},
+    'soil_type': {'type': 'text', 'default': 'Unknown'},
+    'farm_size_ha': {'type': 'number', 'default': 1.0, 'positive': True},
+}
+_FARMER_VALIDATED_ATTR = 'farmer_profile_validated'
+
+
+def _validate_farmer_column(series, rule):
+    if rule['type'] == 'number':
+        numeric = pd.to_numeric(series, errors='coerce')
+        valid = numeric.notna()
+        if rule.get('positive'):
+            valid &= numeric > 0
+        given = series.notna()
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            given &= series.astype(str).str.strip() != ''
+        return numeric.where(valid, rule['default']), given & ~valid
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Clean the (few) categories once and remap the codes instead of touching every row.
+        codes = series.cat.codes.to_numpy()
+        cleaned, invalid = _validate_farmer_column(pd.Series(series.cat.categories, dtype=object), rule)
+        categories = pd.Index(pd.unique(np.append(cleaned.to_numpy(dtype=object), rule['default'])))
+        remap = np.append(categories.get_indexer(cleaned.to_numpy(dtype=object)), categories.get_loc(rule['default']))
+        values = pd.Categorical.from_codes(remap[codes], categories=categories)
+        invalid_rows = np.append(invalid.to_numpy(dtype=bool), False)[codes]
+        return pd.Series(values, index=series.index), pd.Series(invalid_rows, index=series.index)
+
+    text = series.fillna('').astype(str).str.strip()
+    given = text != ''
+    valid = text.isin(rule['allowed']) if 'allowed' in rule else given
+    return text.where(valid, rule['default']), given & ~valid
+
+
+def validate_farmer_frame(df, stats=None):
+    if df.attrs.get(_FARMER_VALIDATED_ATTR) and stats is None:
+        return df if list(df.columns) == CSV_COLUMNS else df[CSV_COLUMNS]
+
+    validated = pd.DataFrame(index=df.index)
+    for col, rule in FARMER_SCHEMA.items():
+        source = df[col] if col in df.columns else pd.Series(rule['default'], index=df.index, dtype=object)
+        validated[col], invalid = _validate_farmer_column(source, rule)
+        if stats is not None and (rule['type'] == 'number' or 'allowed' in rule):
+            stats[f"{col}_defaulted"] = int(invalid.sum())
+
+    for col, rule in FARMER_SCHEMA.items():
+        if rule.get('required'):
+            validated = validated[validated[col] != rule['default']]
+    validated.attrs[_FARMER_VALIDATED_ATTR] = True
+    return validated
+
+
+def _validate_farmer_value(col, value):
+    rule = FARMER_SCHEMA[col]
+    missing = value is None or (pd.api.types.is_scalar(value) and pd.isna(value))
+    if rule['type'] == 'number':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = math.nan
+        valid = not math.isnan(number) and (number > 0 or not rule.get('positive'))
+        given = not missing and str(value).strip() != ''
+        return (number if valid else rule['default']), given and not valid
+    text = '' if missing else str(value).strip()
+    valid = text in rule['allowed'] if 'allowed' in rule else text != ''
+    return (text if valid else rule['default']), text != '' and not valid
+
+
+@dataclass(frozen=True, slots=True)
+class FarmerProfile:
+    name: str
+    language: str = 'English'
+    latitude: float = PROFILE_DEFAULT_LAT
+    longitude: float = PROFILE_DEFAULT_LON
+    soil_type: str = 'Unknown'
+    farm_size_ha: float = 1.0
+
+    def __post_init__(self):
+        for col in CSV_COLUMNS:
+            raw_value = getattr(self, col)
+            value, invalid = _validate_farmer_value(col, raw_value)
+            if invalid:
+                logger.warning(f"Invalid value '{raw_value}' provided for {col} for farmer '{self.name}'. Using default {FARMER_SCHEMA[col]['default']}.")
+            object.__setattr__(self, col, value)
+        if not self.name:
+            raise ValueError("Farmer profile name must not be empty.")
+
+    @property
+    def has_location(self):
+        return not (self.latitude == PROFILE_DEFAULT_LAT and self.longitude == PROFILE_DEFAULT_LON)
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(**{col: data.get(col) for col in CSV_COLUMNS})
+
+    @classmethod
+    def from_table(cls, df, row_label):
+        if not df.attrs.get(_FARMER_VALIDATED_ATTR):
+            return cls(**{col: df.at[row_label, col] for col in CSV_COLUMNS})
+        # Rows of a validated frame are read straight from the columns without re-checking them.
+        profile = object.__new__(cls)
+        for col in CSV_COLUMNS:
+            value = df.at[row_label, col]
+            object.__setattr__(profile, col, float(value) if FARMER_SCHEMA[col]['type'] == 'number' else str(value))
+        return profile
+
+    def to_dict(self):
+        return {col: getattr(self, col) for col in CSV_COLUMNS}
+
+
+@st.cache_resource(show_spinner=False)
+def _farmer_profile_store():
+    return {
+        'lock': threading.RLock(), 'compaction_lock': threading.Lock(),
+        'df': None, 'name_index': None, 'signature': None, 'journal_rows': 0,
+        'spatial_index': None, 'spatial_signature': None,
+        'name_search': None, 'name_search_signature': None,
+    }
+
+
+def _file_signature(path):
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def farmer_name_key(name):
+    return unicodedata.normalize('NFC', str(name)).strip().casefold()
+
+
+def _farmer_name_keys(names):
+    return names.fillna('').astype(str).str.normalize('NFC').str.strip().str.casefold()
+
+
+def _build_name_index(df):
+    if df.empty or 'name' not in df.columns:
+        return {}
+    keys = _farmer_name_keys(df['name'])
+    first_rows = ~keys.duplicated(keep='first')
+    return dict(zip(keys[first_rows].tolist(), df.index[first_rows.to_numpy()].tolist()))
+
+
+def _farmer_compacting_journal_path():
+    return FARMER_JOURNAL_PATH + ".compacting"
+
+
+def _farmer_store_signature():
+    return (
+        _file_signature(FARMER_STORE_PATH),
+        _file_signature(_farmer_compacting_journal_path()),
+        _file_signature(FARMER_JOURNAL_PATH),
+    )
+
+
+def _set_farmer_store(store, df, journal_rows=0):
+    store['df'] = df
+    store['name_index'] = _build_name_index(df)
+    store['signature'] = _farmer_store_signature()
+    store['journal_rows'] = journal_rows
+    store['spatial_index'] = None
+    store['name_search'] = None
+
+
+def _refresh_farmer_store(store):
+    signature = _farmer_store_signature()
+    if store['df'] is None or store['signature'] != signature:
+        df, cacheable = _read_farmer_table()
+        if not cacheable:
+            return df
+        journal_df = _read_farmer_journals()
+        journal_rows = 0
+        if not journal_df.empty:
+            journal_rows = len(journal_df)
+            merged = pd.concat([df, journal_df], ignore_index=True)
+            df = merged[~_farmer_name_keys(merged['name']).duplicated(keep='last')]
+            logger.info(f"Replayed {journal_rows} journaled profile writes on top of {FARMER_STORE_PATH}.")
+        if FARMER_DB_BACKEND == 'parquet':
+            df = _apply_farmer_dtypes(df)
+        _set_farmer_store(store, df.reset_index(drop=True), journal_rows)
+        logger.debug(f"Farmer profile store refreshed from {FARMER_STORE_PATH} (signature {store['signature']}).")
+    return store['df']
+
+
+def _read_farmer_journals():
+    frames = []
+    for journal_path in (_farmer_compacting_journal_path(), FARMER_JOURNAL_PATH):
+        if not os.path.exists(journal_path):
+            continue
+        try:
+            journal_df = pd.read_csv(journal_path, encoding='utf-8', on_bad_lines='skip')
+        except pd.errors.EmptyDataError:
+            continue
+        except Exception as e:
+            logger.error(f"Could not read farmer journal {journal_path}: {e}", exc_info=True)
+            continue
+        frames.append(validate_farmer_frame(journal_df))
+    if not frames:
+        return pd.DataFrame(columns=CSV_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _append_farmer_journal(profile):
+    new_file = not os.path.exists(FARMER_JOURNAL_PATH)
+    with open(FARMER_JOURNAL_PATH, 'a', newline='', encoding='utf-8') as journal_file:
+        writer = csv.writer(journal_file)
+        if new_file:
+            writer.writerow(CSV_COLUMNS)
+        writer.writerow([getattr(profile, col) for col in CSV_COLUMNS])
+        journal_file.flush()
+
+
+def _remove_farmer_journals():
+    for journal_path in (_farmer_compacting_journal_path(), FARMER_JOURNAL_PATH):
+        try:
+            os.remove(journal_path)
+        except FileNotFoundError:
+            pass
+
+
+def _sort_farmer_frame(df):
+    return df.sort_values(by='name', key=lambda col: col.str.lower(), na_position='last')
+
+
+def _write_farmer_csv(df_sorted):
+    tmp_path = FARMER_CSV_PATH + ".tmp"
+    df_sorted.to_csv(tmp_path, index=False, encoding='utf-8')
+    os.replace(tmp_path, FARMER_CSV_PATH)
+
+
+def _write_farmer_parquet(df_sorted):
+    tmp_path = FARMER_PARQUET_PATH + ".tmp"
+    _apply_farmer_dtypes(df_sorted[CSV_COLUMNS]).to_parquet(tmp_path, index=False, engine='pyarrow', compression='zstd')
+    os.replace(tmp_path, FARMER_PARQUET_PATH)
+
+
+def _write_farmer_table(df_sorted):
+    if FARMER_DB_BACKEND == 'parquet':
+        _write_farmer_parquet(df_sorted)
+    else:
+        _write_farmer_csv(df_sorted)
+
+
+def _apply_farmer_dtypes(df):
+    df = df.copy()
+    if 'language' in df.columns:
+        df['language'] = df['language'].astype(pd.CategoricalDtype(categories=list(translations.keys())))
+    if 'soil_type' in df.columns:
+        observed = [v for v in pd.unique(df['soil_type'].astype(str)) if v not in SOIL_TYPES]
+        df['soil_type'] = df['soil_type'].astype(str).astype(pd.CategoricalDtype(categories=SOIL_TYPES + sorted(observed)))
+    if 'farm_size_ha' in df.columns:
+        df['farm_size_ha'] = df['farm_size_ha'].astype('float32')
+    for col in ('latitude', 'longitude'):
+        if col in df.columns:
+            df[col] = df[col].astype('float64')
+    return df
+
+
+def read_farmer_columns(columns=None):
+    columns = list(columns) if columns is not None else CSV_COLUMNS
+    unknown = [c for c in columns if c not in CSV_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown farmer profile columns requested: {unknown}")
+
+    if FARMER_DB_BACKEND == 'sqlite':
+        return load_or_create_farmer_db()[columns]
+    # Projected from the validated store so journaled saves not yet compacted into the table are included.
+    store = _farmer_profile_store()
+    with store['lock']:
+        return _refresh_farmer_store(store)[columns].copy()
+
+
+def _read_farmer_table():
+    if FARMER_DB_BACKEND != 'parquet':
+        return _read_farmer_csv()
+    if not PYARROW_AVAILABLE:
+        logger.error("FARMER_DB_BACKEND=parquet requires `pyarrow`. Install: `pip install pyarrow`. Falling back to CSV profiles (read-only).")
+        df, _ = _read_farmer_csv()
+        return df, False
+
+    if not os.path.exists(FARMER_PARQUET_PATH):
+        df, ok = _read_farmer_csv()
+        if ok and not df.empty:
+            try:
+                _write_farmer_parquet(_sort_farmer_frame(df))
+                logger.info(f"Migrated {len(df)} profiles from {FARMER_CSV_PATH} to {FARMER_PARQUET_PATH}.")
+            except Exception as e:
+                logger.error(f"Could not migrate {FARMER_CSV_PATH} to {FARMER_PARQUET_PATH}: {e}", exc_info=True)
+                return df, False
+        return df, ok
+
+    try:
+        df = pd.read_parquet(FARMER_PARQUET_PATH, engine='pyarrow')
+        df = validate_farmer_frame(df)
+        logger.info(f"Loaded and validated {len(df)} profiles from {FARMER_PARQUET_PATH}")
+        return df, True
+    except Exception as e:
+        logger.error(f"Error loading or processing {FARMER_PARQUET_PATH}: {e}", exc_info=True)
+        st.error(f"Could not load farmer profiles due to file error: {e}")
+        return pd.DataFrame(columns=CSV_COLUMNS), False
+
+
+def compact_farmer_journal():
+    store = _farmer_profile_store()
+    if not store['compaction_lock'].acquire(blocking=False):
+        logger.debug("Farmer journal compaction already running; skipping.")
+        return False
+    try:
+        compacting_path = _farmer_compacting_journal_path()
+        with store['lock']:
+            df = _refresh_farmer_store(store)
+            if df is not store['df']:
+                logger.warning("Skipping farmer journal compaction: profile store could not be loaded.")
+                return False
+            if os.path.exists(FARMER_JOURNAL_PATH):
+                if os.path.exists(compacting_path):
+                    with open(FARMER_JOURNAL_PATH, 'r', encoding='utf-8', newline='') as src, open(compacting_path, 'a', encoding='utf-8', newline='') as dst:
+                        next(src, None)
+                        dst.writelines(src)
+                    os.remove(FARMER_JOURNAL_PATH)
+                else:
+                    os.replace(FARMER_JOURNAL_PATH, compacting_path)
+            elif not os.path.exists(compacting_path):
+                return False
+            snapshot = df.copy()
+            store['journal_rows'] = 0
+            store['signature'] = _farmer_store_signature()
+
+        started = datetime.datetime.now()
+        df_sorted = _sort_farmer_frame(snapshot[CSV_COLUMNS])
+        _write_farmer_table(df_sorted)
+
+        with store['lock']:
+            os.remove(compacting_path)
+            store['signature'] = _farmer_store_signature()
+        logger.info(f"Compacted farmer journal into {FARMER_STORE_PATH} ({len(df_sorted)} profiles) in {(datetime.datetime.now() - started).total_seconds():.2f}s.")
+        return True
+    except Exception as e:
+        logger.error(f"Farmer journal compaction failed: {e}", exc_info=True)
+        return False
+    finally:
+        store['compaction_lock'].release()
+
+
+def _maybe_compact_farmer_journal(store):
+    if store['journal_rows'] < FARMER_JOURNAL_COMPACT_THRESHOLD or store['compaction_lock'].locked():
+        return
+    logger.info(f"Farmer journal reached {store['journal_rows']} entries; starting background compaction.")
+    threading.Thread(target=compact_farmer_journal, name="farmer-journal-compaction", daemon=True).start()
 
 
 def load_or_create_farmer_db():
+    if FARMER_DB_BACKEND == 'sqlite':
+        try:
+            return _sqlite_load_farmers()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading farmer profiles from {FARMER_SQLITE_PATH}: {e}", exc_info=True)
+            st.error(f"Could not load farmer profiles due to database error: {e}")
+            return pd.DataFrame(columns=CSV_COLUMNS)
+
+    store = _farmer_profile_store()
+    with store['lock']:
+        return _refresh_farmer_store(store).copy()
+
+
+def _read_farmer_csv():
     if os.path.exists(FARMER_CSV_PATH):
         try:
             df = pd.read_csv(FARMER_CSV_PATH, encoding='utf-8')
@@ -575,53 +1066,43 @@ def load_or_create_farmer_db():
                 if col not in df.columns:
                     missing_cols = True
                     logger.warning(f"Column '{col}' missing in {FARMER_CSV_PATH}, adding with default.")
-                    if col == 'latitude': df[col] = PROFILE_DEFAULT_LAT
-                    elif col == 'longitude': df[col] = PROFILE_DEFAULT_LON
-                    elif col == 'farm_size_ha': df[col] = 1.0
-                    elif col == 'soil_type': df[col] = 'Unknown'
-                    elif col == 'language': df[col] = 'English'
-                    elif col == 'name': df[col] = ''
-                    else: df[col] = pd.NA
-
-            df['name'] = df['name'].fillna('').astype(str).str.strip()
-            df = df[df['name'] != '']
-
-            df['language'] = df['language'].fillna('English').astype(str).str.strip()
-            df['language'] = df['language'].apply(lambda x: x if x in translations else 'English')
 
-            df['soil_type'] = df['soil_type'].fillna('Unknown').astype(str).str.strip()
-
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce').fillna(PROFILE_DEFAULT_LAT)
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce').fillna(PROFILE_DEFAULT_LON)
-            df['farm_size_ha'] = pd.to_numeric(df['farm_size_ha'], errors='coerce').fillna(1.0)
-            df['farm_size_ha'] = df['farm_size_ha'].apply(lambda x: x if pd.notna(x) and x > 0 else 1.0)
-
-            df = df[CSV_COLUMNS]
+            df = validate_farmer_frame(df)
 
             if missing_cols:
                 logger.info(f"Resaving {FARMER_CSV_PATH} after adding missing columns.")
                 try:
-                    save_farmer_db(df)
+                    _write_farmer_csv(_sort_farmer_frame(df))
                 except Exception as save_err:
                     logger.error(f"Failed to resave {FARMER_CSV_PATH} after fixing columns: {save_err}")
                     st.warning(f"Could not auto-correct {FARMER_CSV_PATH}. Please check file integrity.")
 
             logger.info(f"Loaded and validated {len(df)} profiles from {FARMER_CSV_PATH}")
-            return df
+            return df, True
 
         except pd.errors.EmptyDataError:
             logger.warning(f"{FARMER_CSV_PATH} is empty. Returning empty DataFrame.")
-            return pd.DataFrame(columns=CSV_COLUMNS)
+            return pd.DataFrame(columns=CSV_COLUMNS), True
         except Exception as e:
             logger.error(f"Error loading or processing {FARMER_CSV_PATH}: {e}", exc_info=True)
             st.error(f"Could not load farmer profiles due to file error: {e}")
-            return pd.DataFrame(columns=CSV_COLUMNS)
+            return pd.DataFrame(columns=CSV_COLUMNS), False
     else:
         logger.info(f"{FARMER_CSV_PATH} not found. Creating an empty DataFrame structure.")
-        return pd.DataFrame(columns=CSV_COLUMNS)
+        return pd.DataFrame(columns=CSV_COLUMNS), True
 
 
-def add_or_update_farmer(df, profile_data):
+def _clean_profile_data(profile_data, profile_name_clean):
+    return FarmerProfile.from_mapping({**profile_data, 'name': profile_name_clean}).to_dict()
+
+
+def _add_missing_categories(df, new_data):
+    for col, value in new_data.items():
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([value])
+
+
+def add_or_update_farmer(df, profile_data, name_index=None):
     if not isinstance(df, pd.DataFrame):
         logger.error("add_or_update_farmer received non-DataFrame.")
         return pd.DataFrame(columns=CSV_COLUMNS)
@@ -631,49 +1112,16 @@ def add_or_update_farmer(df, profile_data):
         logger.warning("Attempted to add/update farmer with empty name.")
         return df
 
-    name_lower = profile_name_clean.lower()
+    name_key = farmer_name_key(profile_name_clean)
     if 'name' not in df.columns: df['name'] = ''
-    df['name'] = df['name'].astype(str)
-
-    existing_indices = df.index[df['name'].str.lower() == name_lower].tolist()
-
-    new_data = {}
-    for col in CSV_COLUMNS:
-        value = profile_data.get(col)
-        if col == 'latitude':
-            default_val = PROFILE_DEFAULT_LAT
-            num_val = pd.to_numeric(value, errors='coerce')
-            final_val = default_val if pd.isna(num_val) else float(num_val)
-            new_data[col] = final_val
-            if pd.isna(num_val) and value is not None and str(value).strip() != "":
-                logger.warning(f"Invalid value '{value}' provided for {col} for farmer '{profile_name_clean}'. Using default {default_val}.")
-        elif col == 'longitude':
-            default_val = PROFILE_DEFAULT_LON
-            num_val = pd.to_numeric(value, errors='coerce')
-            final_val = default_val if pd.isna(num_val) else float(num_val)
-            new_data[col] = final_val
-            if pd.isna(num_val) and value is not None and str(value).strip() != "":
-                logger.warning(f"Invalid value '{value}' provided for {col} for farmer '{profile_name_clean}'. Using default {default_val}.")
-        elif col == 'farm_size_ha':
-            default_val = 1.0
-            num_val = pd.to_numeric(value, errors='coerce')
-            value_float = default_val if pd.isna(num_val) else float(num_val)
-            final_val = value_float if value_float > 0 else default_val
-            new_data[col] = final_val
-            if pd.isna(num_val) and value is not None and str(value).strip() != "":
-                 logger.warning(f"Invalid value '{value}' provided for {col} for farmer '{profile_name_clean}'. Using default {default_val}.")
-            elif value_float <= 0 and value is not None:
-                 logger.warning(f"Non-positive value '{value}' provided for {col} for farmer '{profile_name_clean}'. Using default {default_val}.")
-        elif col == 'name':
-             new_data[col] = profile_name_clean
-        elif col == 'language':
-            cleaned_value = str(value).strip() if pd.notna(value) else ''
-            new_data[col] = cleaned_value if cleaned_value in translations else 'English'
-        elif col == 'soil_type':
-             cleaned_value = str(value).strip() if pd.notna(value) else ''
-             new_data[col] = cleaned_value if cleaned_value else 'Unknown'
-        else:
-             new_data[col] = str(value).strip() if pd.notna(value) else ''
+
+    if name_index is not None:
+        row_label = name_index.get(name_key)
+        existing_indices = [row_label] if row_label is not None and row_label in df.index else []
+    else:
+        existing_indices = df.index[_farmer_name_keys(df['name']) == name_key].tolist()
+
+    new_data = _clean_profile_data(profile_data, profile_name_clean)
 
     logger.debug(f"add_or_update_farmer: Prepared validated data for {profile_name_clean}: {new_data}")
 
@@ -687,6 +1135,7 @@ def add_or_update_farmer(df, profile_data):
         try:
             for col_assign in CSV_COLUMNS:
                 if col_assign not in df.columns: df[col_assign] = None
+            _add_missing_categories(df, new_data)
             for col_name in CSV_COLUMNS:
                  df.loc[idx_to_update, col_name] = new_data[col_name]
         except Exception as e:
@@ -697,8 +1146,14 @@ def add_or_update_farmer(df, profile_data):
     else:
         logger.info(f"Adding new profile for '{profile_name_clean}'")
         try:
-            new_df_row = pd.DataFrame([new_data], columns=CSV_COLUMNS)
-            df_updated = pd.concat([df, new_df_row], ignore_index=True)
+            new_label = int(df.index.max()) + 1 if len(df.index) and pd.api.types.is_integer_dtype(df.index) else len(df.index)
+            _add_missing_categories(df, new_data)
+            new_df_row = pd.DataFrame([new_data], columns=CSV_COLUMNS, index=[new_label])
+            new_df_row.attrs = dict(df.attrs)
+            new_df_row = new_df_row.astype({c: df[c].dtype for c in CSV_COLUMNS if c in df.columns and (isinstance(df[c].dtype, pd.CategoricalDtype) or df[c].dtype == 'float32')})
+            df_updated = pd.concat([df, new_df_row]) if not df.empty else new_df_row
+            if name_index is not None:
+                name_index[name_key] = new_label
             return df_updated[CSV_COLUMNS]
         except Exception as e:
             logger.error(f"Error concatenating new profile row: {e}", exc_info=True)
@@ -713,109 +1168,1192 @@ def save_farmer_db(df):
         return
 
     try:
-        if not all(c in df.columns for c in CSV_COLUMNS):
-            logger.warning(f"DataFrame missing required columns before save. Has: {df.columns.tolist()}. Reindexing.")
-            df_to_save = df.reindex(columns=CSV_COLUMNS).copy()
-            df_to_save['latitude'] = df_to_save['latitude'].fillna(PROFILE_DEFAULT_LAT)
-            df_to_save['longitude'] = df_to_save['longitude'].fillna(PROFILE_DEFAULT_LON)
-            df_to_save['farm_size_ha'] = df_to_save['farm_size_ha'].fillna(1.0)
-            df_to_save['language'] = df_to_save['language'].apply(lambda x: x if pd.notna(x) and x in translations else 'English')
-            df_to_save['soil_type'] = df_to_save['soil_type'].fillna('Unknown')
-            df_to_save['name'] = df_to_save['name'].fillna('')
-        else:
-            df_to_save = df[CSV_COLUMNS].copy()
-
-        df_to_save['name'] = df_to_save['name'].fillna('').astype(str).str.strip()
-        df_to_save = df_to_save[df_to_save['name'] != '']
+        _replace_farmer_table(df)
+    except Exception as e:
+        logger.error(f"Error saving farmer profiles to {FARMER_STORE_PATH}: {e}", exc_info=True)
+        st.error(f"Could not save farmer profiles: {e}")
 
-        df_to_save['language'] = df_to_save['language'].fillna('English').astype(str).str.strip()
-        df_to_save['language'] = df_to_save['language'].apply(lambda x: x if x in translations else 'English')
-        df_to_save['soil_type'] = df_to_save['soil_type'].fillna('Unknown').astype(str).str.strip()
 
-        df_to_save['latitude'] = pd.to_numeric(df_to_save['latitude'], errors='coerce').fillna(PROFILE_DEFAULT_LAT)
-        df_to_save['longitude'] = pd.to_numeric(df_to_save['longitude'], errors='coerce').fillna(PROFILE_DEFAULT_LON)
-        df_to_save['farm_size_ha'] = pd.to_numeric(df_to_save['farm_size_ha'], errors='coerce').fillna(1.0)
-        df_to_save['farm_size_ha'] = df_to_save['farm_size_ha'].apply(lambda x: x if pd.notna(x) and x > 0 else 1.0)
+def _replace_farmer_table(df):
+    # Raising counterpart of save_farmer_db for callers (bulk import) that must report a failed write.
+    if not all(c in df.columns for c in CSV_COLUMNS):
+        logger.warning(f"DataFrame missing required columns before save. Has: {df.columns.tolist()}. Reindexing.")
+    df_to_save = validate_farmer_frame(df)
 
-        logger.debug(f"save_farmer_db: Dataframe state just before sorting and saving ({len(df_to_save)} rows):\n{df_to_save.head().to_string()}")
-        df_sorted = df_to_save.sort_values(by='name', key=lambda col: col.str.lower(), na_position='last')
+    if FARMER_DB_BACKEND == 'sqlite':
+        _sqlite_replace_farmers(df_to_save.to_dict('records'))
+        logger.info(f"Successfully saved {len(df_to_save)} profiles to {FARMER_SQLITE_PATH}.")
+        return
 
-        df_sorted.to_csv(FARMER_CSV_PATH, index=False, encoding='utf-8')
-        logger.info(f"Successfully saved {len(df_sorted)} profiles to {FARMER_CSV_PATH}.")
+    logger.debug(f"save_farmer_db: Dataframe state just before sorting and saving ({len(df_to_save)} rows):\n{df_to_save.head().to_string()}")
+    df_sorted = _sort_farmer_frame(df_to_save)
 
-    except Exception as e:
-        logger.error(f"Error saving farmer profiles to {FARMER_CSV_PATH}: {e}", exc_info=True)
-        st.error(f"Could not save farmer profiles: {e}")
+    store = _farmer_profile_store()
+    with store['lock']:
+        try:
+            _write_farmer_table(df_sorted)
+            _remove_farmer_journals()
+        except Exception:
+            store['df'] = None
+            store['signature'] = None
+            raise
+        _set_farmer_store(store, df_sorted)
+    logger.info(f"Successfully saved {len(df_sorted)} profiles to {FARMER_STORE_PATH}.")
 
 
-def find_farmer(df, name):
+def find_farmer(df, name, name_index=None):
     if df is None or df.empty or not isinstance(name, str):
         return None
     name_clean = name.strip()
     if not name_clean:
         return None
 
-    name_lower = name_clean.lower()
+    name_key = farmer_name_key(name_clean)
 
     if 'name' not in df.columns:
          logger.warning("'name' column missing in DataFrame during find_farmer.")
          return None
-    df['name'] = df['name'].astype(str)
 
-    match = df.loc[df['name'].fillna('').str.lower() == name_lower]
+    if name_index is not None:
+        row_label = name_index.get(name_key)
+        if row_label is None or row_label not in df.index:
+            return None
+    else:
+        matches = df.index[_farmer_name_keys(df['name']) == name_key]
+        if matches.empty:
+            return None
+        row_label = matches[0]
 
-    if not match.empty:
-        profile_dict = match.iloc[0].to_dict()
-        validated_profile = {}
-        for col in CSV_COLUMNS:
-             value = profile_dict.get(col)
-             if col == 'latitude':
-                 num_val = pd.to_numeric(value, errors='coerce')
-                 validated_profile[col] = float(num_val) if pd.notna(num_val) else PROFILE_DEFAULT_LAT
-             elif col == 'longitude':
-                 num_val = pd.to_numeric(value, errors='coerce')
-                 validated_profile[col] = float(num_val) if pd.notna(num_val) else PROFILE_DEFAULT_LON
-             elif col == 'farm_size_ha':
-                 num_val = pd.to_numeric(value, errors='coerce')
-                 validated_profile[col] = float(num_val) if pd.notna(num_val) and num_val > 0 else 1.0
-             elif col == 'name':
-                  validated_profile[col] = str(value).strip()
-             elif col == 'language':
-                  lang_val = str(value).strip()
-                  validated_profile[col] = lang_val if lang_val in translations else 'English'
-             elif col == 'soil_type':
-                  soil_val = str(value).strip()
-                  validated_profile[col] = soil_val if soil_val else 'Unknown'
-             else:
-                 validated_profile[col] = value
-        return validated_profile
-    return None
+    try:
+        return FarmerProfile.from_table(df, row_label)
+    except ValueError:
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _farmer_sqlite_state():
+    return {'local': threading.local(), 'init_lock': threading.RLock(), 'initialized': False, 'initializing': False}
+
+
+def _get_farmer_sqlite_conn():
+    state = _farmer_sqlite_state()
+    conn = getattr(state['local'], 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(FARMER_SQLITE_PATH, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        state['local'].conn = conn
+        logger.debug(f"Opened SQLite connection to {FARMER_SQLITE_PATH} for thread {threading.current_thread().name}.")
+
+    if not state['initialized']:
+        # Re-entrant: the one-off CSV import inside schema init may reach this function again on the same thread.
+        with state['init_lock']:
+            if not state['initialized'] and not state['initializing']:
+                state['initializing'] = True
+                try:
+                    _init_farmer_sqlite_schema(conn)
+                    state['initialized'] = True
+                finally:
+                    state['initializing'] = False
+    return conn
+
+
+def _init_farmer_sqlite_schema(conn):
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS farmers (
+                name TEXT NOT NULL COLLATE NOCASE,
+                name_key TEXT NOT NULL DEFAULT '',
+                language TEXT NOT NULL DEFAULT 'English',
+                latitude REAL NOT NULL DEFAULT 0.0,
+                longitude REAL NOT NULL DEFAULT 0.0,
+                soil_type TEXT NOT NULL DEFAULT 'Unknown',
+                farm_size_ha REAL NOT NULL DEFAULT 1.0
+            )
+        """)
+        _migrate_farmer_name_keys(conn)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_farmers_name_key ON farmers (name_key)")
+        conn.execute("CREATE TABLE IF NOT EXISTS farmer_db_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    imported = conn.execute("SELECT value FROM farmer_db_meta WHERE key = 'csv_imported_at'").fetchone()
+    if imported is None and os.path.exists(FARMER_CSV_PATH):
+        import_farmer_csv_to_sqlite(conn)
+
+
+def _migrate_farmer_name_keys(conn):
+    # Databases created before name_key: identity was SQLite's ASCII-only NOCASE, not farmer_name_key (NFC + casefold).
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(farmers)").fetchall()]
+    if 'name_key' not in columns:
+        conn.execute("ALTER TABLE farmers ADD COLUMN name_key TEXT NOT NULL DEFAULT ''")
+    conn.execute("DROP INDEX IF EXISTS idx_farmers_name_nocase")
+    rows = conn.execute("SELECT rowid, name FROM farmers WHERE name_key = '' ORDER BY rowid").fetchall()
+    if not rows:
+        return
+    conn.executemany("UPDATE farmers SET name_key = ? WHERE rowid = ?", [(farmer_name_key(row[1]), row[0]) for row in rows])
+    # Rows that only NFC/casefold reveals as the same farmer: keep the oldest, like the CSV store's name index keeps the first.
+    dropped = conn.execute("DELETE FROM farmers WHERE rowid NOT IN (SELECT MIN(rowid) FROM farmers GROUP BY name_key)").rowcount
+    logger.info(f"Added name keys to {len(rows)} profiles in {FARMER_SQLITE_PATH}; merged {dropped} duplicate names.")
+
+
+def _sqlite_farmer_rows(rows):
+    return [{**row, 'name_key': farmer_name_key(row['name'])} for row in rows]
+
+
+_SQLITE_UPSERT_SQL = (
+    "INSERT INTO farmers (name, name_key, language, latitude, longitude, soil_type, farm_size_ha) "
+    "VALUES (:name, :name_key, :language, :latitude, :longitude, :soil_type, :farm_size_ha) "
+    "ON CONFLICT (name_key) DO UPDATE SET "
+    "name = excluded.name, language = excluded.language, latitude = excluded.latitude, "
+    "longitude = excluded.longitude, soil_type = excluded.soil_type, farm_size_ha = excluded.farm_size_ha"
+)
+
+
+def import_farmer_csv_to_sqlite(conn=None):
+    conn = conn if conn is not None else _get_farmer_sqlite_conn()
+    df, ok = _read_farmer_csv()
+    if not ok:
+        logger.error(f"Skipping SQLite import: {FARMER_CSV_PATH} could not be read.")
+        return 0
+
+    duplicated = _farmer_name_keys(df['name']).duplicated(keep='first')
+    if duplicated.any():
+        logger.warning(f"Dropping {int(duplicated.sum())} rows of {FARMER_CSV_PATH} whose names repeat an earlier profile.")
+    rows = _sqlite_farmer_rows(df.loc[~duplicated, CSV_COLUMNS].to_dict('records'))
+    with conn:
+        conn.executemany(_SQLITE_UPSERT_SQL, rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO farmer_db_meta (key, value) VALUES ('csv_imported_at', ?)",
+            (datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),)
+        )
+    logger.info(f"Imported {len(rows)} profiles from {FARMER_CSV_PATH} into {FARMER_SQLITE_PATH}.")
+    return len(rows)
+
+
+def _sqlite_load_farmers():
+    conn = _get_farmer_sqlite_conn()
+    rows = conn.execute(f"SELECT {', '.join(CSV_COLUMNS)} FROM farmers ORDER BY name_key").fetchall()
+    return validate_farmer_frame(pd.DataFrame([tuple(r) for r in rows], columns=CSV_COLUMNS))
+
+
+def _sqlite_upsert_farmers(rows):
+    conn = _get_farmer_sqlite_conn()
+    with conn:
+        conn.executemany(_SQLITE_UPSERT_SQL, _sqlite_farmer_rows(rows))
+
+
+def _sqlite_replace_farmers(rows):
+    # Full-table semantics for save_farmer_db: profiles absent from rows are deleted in the same transaction.
+    conn = _get_farmer_sqlite_conn()
+    with conn:
+        rows = _sqlite_farmer_rows(rows)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS farmers_keep (name_key TEXT NOT NULL PRIMARY KEY)")
+        conn.execute("DELETE FROM farmers_keep")
+        conn.executemany("INSERT OR IGNORE INTO farmers_keep (name_key) VALUES (?)", [(row['name_key'],) for row in rows])
+        conn.executemany(_SQLITE_UPSERT_SQL, rows)
+        conn.execute("DELETE FROM farmers WHERE name_key NOT IN (SELECT name_key FROM farmers_keep)")
+        conn.execute("DELETE FROM farmers_keep")
+
+
+def _sqlite_find_farmer(name):
+    if not isinstance(name, str) or not name.strip():
+        return None
+    conn = _get_farmer_sqlite_conn()
+    row = conn.execute(
+        f"SELECT {', '.join(CSV_COLUMNS)} FROM farmers WHERE name_key = ?",
+        (farmer_name_key(name),)
+    ).fetchone()
+    return FarmerProfile.from_mapping(dict(row)) if row is not None else None
+
+
+def get_farmer_profile(name):
+    if FARMER_DB_BACKEND == 'sqlite':
+        try:
+            return _sqlite_find_farmer(name)
+        except sqlite3.Error as e:
+            logger.error(f"SQLite error looking up farmer '{name}': {e}", exc_info=True)
+            st.error(f"Could not load farmer profiles due to database error: {e}")
+            return None
+    store = _farmer_profile_store()
+    with store['lock']:
+        df = _refresh_farmer_store(store)
+        name_index = store['name_index'] if df is store['df'] else None
+        return find_farmer(df, name, name_index)
+
+
+def save_farmer_profile(profile_data):
+    profile_name_clean = str(profile_data.get('name', '')).strip()
+    if not profile_name_clean:
+        logger.warning("Attempted to save farmer profile with empty name.")
+        return None
+
+    if FARMER_DB_BACKEND == 'sqlite':
+        try:
+            store = _farmer_profile_store()
+            with store['lock']:
+                spatial_current = store['spatial_index'] is not None and store['spatial_signature'] == _farmer_sqlite_signature()
+                names_current = store['name_search'] is not None and store['name_search_signature'] == _farmer_sqlite_signature()
+                _sqlite_upsert_farmers([_clean_profile_data(profile_data, profile_name_clean)])
+                logger.info(f"Upserted profile for '{profile_name_clean}' into {FARMER_SQLITE_PATH}.")
+                saved_profile = _sqlite_find_farmer(profile_name_clean)
+                if spatial_current and saved_profile:
+                    update_spatial_index(store['spatial_index'], saved_profile)
+                    store['spatial_signature'] = _farmer_sqlite_signature()
+                if names_current and saved_profile:
+                    update_name_search_index(store['name_search'], saved_profile.name)
+                    store['name_search_signature'] = _farmer_sqlite_signature()
+            return saved_profile
+        except sqlite3.Error as e:
+            logger.error(f"SQLite error saving farmer '{profile_name_clean}': {e}", exc_info=True)
+            st.error(f"Could not save farmer profiles: {e}")
+            return None
+
+    store = _farmer_profile_store()
+    with store['lock']:
+        df = _refresh_farmer_store(store)
+        if df is not store['df']:
+            logger.error(f"Cannot save profile for '{profile_name_clean}': profile store could not be loaded.")
+            return None
+        updated_db = add_or_update_farmer(df, profile_data, store['name_index'])
+        if not isinstance(updated_db, pd.DataFrame):
+            return None
+        saved_profile = find_farmer(updated_db, profile_name_clean, store['name_index'])
+        if not saved_profile:
+            return None
+        try:
+            _append_farmer_journal(saved_profile)
+        except OSError as e:
+            logger.error(f"Error appending profile for '{profile_name_clean}' to {FARMER_JOURNAL_PATH}: {e}", exc_info=True)
+            st.error(f"Could not save farmer profiles: {e}")
+            store['df'] = None
+            store['signature'] = None
+            return None
+        store['df'] = updated_db
+        store['signature'] = _farmer_store_signature()
+        store['journal_rows'] += 1
+        if store['spatial_index'] is not None:
+            update_spatial_index(store['spatial_index'], saved_profile)
+        if store['name_search'] is not None:
+            update_name_search_index(store['name_search'], saved_profile.name)
+        logger.info(f"Journaled profile for '{profile_name_clean}' ({store['journal_rows']} pending compaction).")
+        _maybe_compact_farmer_journal(store)
+        return saved_profile
+
+
+def read_farmer_import_file(source_path):
+    extension = os.path.splitext(str(source_path))[1].lower()
+    if extension in ('.parquet', '.pq'):
+        raw = pd.read_parquet(source_path)
+        raw = raw.astype(object).where(raw.notna(), '')
+    else:
+        raw = pd.read_csv(source_path, dtype=str, keep_default_na=False, encoding='utf-8')
+    raw.columns = [str(c).strip() for c in raw.columns]
+    if 'name' not in raw.columns:
+        raise ValueError(f"Import file {source_path} has no 'name' column.")
+    return raw.reindex(columns=CSV_COLUMNS)
+
+
+def validate_farmer_import_frame(raw):
+    stats = {}
+    cleaned = validate_farmer_frame(raw, stats)
+
+    rejected_mask = ~raw.index.isin(cleaned.index)
+    rejected = raw[rejected_mask].copy()
+    rejected.insert(0, 'source_row', rejected.index + 1)
+    rejected['reason'] = 'missing name'
+
+    keys = _farmer_name_keys(cleaned['name'])
+    duplicated = keys.duplicated(keep='last')
+    stats['duplicates_in_file'] = int(duplicated.sum())
+    return cleaned[~duplicated], rejected, stats
+
+
+def bulk_import_farmers(source_path, dry_run=False):
+    raw = read_farmer_import_file(source_path)
+    valid, rejected, stats = validate_farmer_import_frame(raw)
+    report = {'read': len(raw), 'valid': len(valid), 'inserted': 0, 'updated': 0, 'rejected': rejected, **stats}
+    logger.info(f"Bulk import from {source_path}: {len(raw)} rows read, {len(valid)} valid, {len(rejected)} rejected.")
+    if valid.empty:
+        return report
+
+    if FARMER_DB_BACKEND == 'sqlite':
+        conn = _get_farmer_sqlite_conn()
+        existing = set()
+        keys = _farmer_name_keys(valid['name']).tolist()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(f"SELECT name_key FROM farmers WHERE name_key IN ({placeholders})", chunk).fetchall()
+            existing.update(r[0] for r in rows)
+        report['updated'] = sum(1 for key in keys if key in existing)
+        report['inserted'] = len(keys) - report['updated']
+        if dry_run:
+            return report
+        _sqlite_upsert_farmers(valid.to_dict('records'))
+        logger.info(f"Bulk import into {FARMER_SQLITE_PATH}: {report['inserted']} inserted, {report['updated']} updated.")
+        return report
+
+    store = _farmer_profile_store()
+    with store['lock']:
+        df = _refresh_farmer_store(store)
+        if df is not store['df']:
+            raise RuntimeError("Profile store could not be loaded; refusing to overwrite farmer database.")
+        import_keys = _farmer_name_keys(valid['name'])
+        is_update = import_keys.isin(list(store['name_index'].keys()))
+        report['updated'] = int(is_update.sum())
+        report['inserted'] = int((~is_update).sum())
+        if dry_run:
+            return report
+
+        merged = pd.concat([df[CSV_COLUMNS], valid], ignore_index=True)
+        merged = merged[~_farmer_name_keys(merged['name']).duplicated(keep='last')]
+        _replace_farmer_table(merged)
+    logger.info(f"Bulk import into {FARMER_STORE_PATH}: {report['inserted']} inserted, {report['updated']} updated.")
+    return report
+
+
+def spatial_cell_for(latitude, longitude, cell_deg=None):
+    cell_deg = cell_deg or FARMER_SPATIAL_CELL_DEG
+    return (int(math.floor(float(latitude) / cell_deg)), int(math.floor(float(longitude) / cell_deg)))
+
+
+def build_spatial_index(df, cell_deg=None):
+    cell_deg = cell_deg or FARMER_SPATIAL_CELL_DEG
+    index = {'cell_deg': cell_deg, 'cells': defaultdict(dict), 'locations': {}}
+    if df.empty or not all(c in df.columns for c in ('name', 'latitude', 'longitude')):
+        return index
+    lats = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype='float64')
+    lons = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype='float64')
+    located = ~(np.isnan(lats) | np.isnan(lons)) & ~((lats == PROFILE_DEFAULT_LAT) & (lons == PROFILE_DEFAULT_LON))
+    names = df['name'].to_numpy()[located]
+    keys = _farmer_name_keys(df['name'][located])
+    lats, lons = lats[located], lons[located]
+    cell_rows = np.floor(lats / cell_deg).astype('int64')
+    cell_cols = np.floor(lons / cell_deg).astype('int64')
+    cells, locations = index['cells'], index['locations']
+    for key, name, lat, lon, row, col in zip(keys.tolist(), names.tolist(), lats.tolist(), lons.tolist(), cell_rows.tolist(), cell_cols.tolist()):
+        if key in locations:
+            continue
+        cell = (row, col)
+        cells[cell][key] = (name, lat, lon)
+        locations[key] = cell
+    return index
+
+
+def update_spatial_index(index, profile):
+    key = farmer_name_key(profile.name)
+    if not key:
+        return
+    previous_cell = index['locations'].pop(key, None)
+    if previous_cell is not None:
+        bucket = index['cells'].get(previous_cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del index['cells'][previous_cell]
+    if not profile.has_location:
+        return
+    cell = spatial_cell_for(profile.latitude, profile.longitude, index['cell_deg'])
+    index['cells'][cell][key] = (profile.name, profile.latitude, profile.longitude)
+    index['locations'][key] = cell
+
+
+def _farmer_sqlite_signature():
+    return (_file_signature(FARMER_SQLITE_PATH), _file_signature(FARMER_SQLITE_PATH + "-wal"))
+
+
+def get_farmer_spatial_index():
+    store = _farmer_profile_store()
+    with store['lock']:
+        if FARMER_DB_BACKEND == 'sqlite':
+            signature = _farmer_sqlite_signature()
+            if store['spatial_index'] is None or store['spatial_signature'] != signature:
+                store['spatial_index'] = build_spatial_index(_sqlite_load_farmers())
+                store['spatial_signature'] = _farmer_sqlite_signature()
+            return store['spatial_index']
+        df = _refresh_farmer_store(store)
+        if df is not store['df']:
+            return build_spatial_index(df)
+        if store['spatial_index'] is None:
+            store['spatial_index'] = build_spatial_index(df)
+            logger.debug(f"Built spatial index over {len(store['spatial_index']['locations'])} located profiles.")
+        return store['spatial_index']
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _spatial_matches(index, cells, latitude, longitude):
+    entries = [entry for cell in cells for entry in index['cells'].get(cell, {}).values()]
+    if not entries:
+        return [], np.empty(0)
+    names, lats, lons = zip(*entries)
+    return list(zip(names, lats, lons)), haversine_km(latitude, longitude, lats, lons)
+
+
+def _spatial_result(entry, distance_km):
+    name, lat, lon = entry
+    return {'name': name, 'latitude': lat, 'longitude': lon, 'distance_km': float(distance_km)}
+
+
+def _spatial_cell_range(index, min_lat, min_lon, max_lat, max_lon):
+    low = spatial_cell_for(max(min_lat, -90.0), max(min_lon, -180.0), index['cell_deg'])
+    high = spatial_cell_for(min(max_lat, 90.0), min(max_lon, 180.0), index['cell_deg'])
+    if (high[0] - low[0] + 1) * (high[1] - low[1] + 1) > len(index['cells']):
+        return [cell for cell in index['cells'] if low[0] <= cell[0] <= high[0] and low[1] <= cell[1] <= high[1]]
+    return [(row, col) for row in range(low[0], high[0] + 1) for col in range(low[1], high[1] + 1)]
+
+
+def farmers_within_radius(latitude, longitude, radius_km, limit=None, index=None):
+    index = index or get_farmer_spatial_index()
+    lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(min(abs(latitude) + lat_span, 90.0)))
+    lon_span = 180.0 if cos_lat < 1e-6 else min(180.0, lat_span / cos_lat)
+    cells = _spatial_cell_range(index, latitude - lat_span, longitude - lon_span, latitude + lat_span, longitude + lon_span)
+    entries, distances = _spatial_matches(index, cells, latitude, longitude)
+    order = np.argsort(distances, kind='stable')
+    results = [_spatial_result(entries[i], distances[i]) for i in order if distances[i] <= radius_km]
+    return results[:limit] if limit is not None else results
+
+
+def nearest_farmers(latitude, longitude, k=5, index=None):
+    index = index or get_farmer_spatial_index()
+    total = len(index['locations'])
+    if k <= 0 or total == 0:
+        return []
+    cell_deg = index['cell_deg']
+    center_row, center_col = spatial_cell_for(latitude, longitude, cell_deg)
+    max_ring = int(math.ceil(360.0 / cell_deg))
+    candidates, seen_cells = [], 0
+    for ring in range(max_ring + 1):
+        if (2 * ring + 1) ** 2 >= len(index['cells']):
+            entries, distances = _spatial_matches(index, list(index['cells']), latitude, longitude)
+            candidates = list(zip(distances.tolist(), entries))
+            break
+        ring_cells = [
+            (center_row + dr, center_col + dc)
+            for dr in range(-ring, ring + 1) for dc in range(-ring, ring + 1)
+            if max(abs(dr), abs(dc)) == ring
+        ]
+        entries, distances = _spatial_matches(index, ring_cells, latitude, longitude)
+        candidates.extend(zip(distances.tolist(), entries))
+        seen_cells += sum(1 for cell in ring_cells if cell in index['cells'])
+        if len(candidates) >= k:
+            candidates.sort(key=lambda item: item[0])
+            # Unsearched cells are at least `ring` whole cells away; longitude cells shrink towards the poles.
+            ring_km = math.radians(ring * cell_deg) * EARTH_RADIUS_KM * math.cos(math.radians(min(abs(latitude) + ring * cell_deg, 90.0)))
+            if candidates[k - 1][0] <= ring_km:
+                break
+        if seen_cells >= len(index['cells']):
+            break
+    candidates.sort(key=lambda item: item[0])
+    return [_spatial_result(entry, distance) for distance, entry in candidates[:k]]
+
+
+def farmers_in_bbox(min_lat, min_lon, max_lat, max_lon, index=None):
+    index = index or get_farmer_spatial_index()
+    results = []
+    for cell in _spatial_cell_range(index, min_lat, min_lon, max_lat, max_lon):
+        for name, lat, lon in index['cells'].get(cell, {}).values():
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                results.append({'name': name, 'latitude': lat, 'longitude': lon})
+    return results
+
+
+def farmers_in_grid_cell(latitude, longitude, index=None):
+    index = index or get_farmer_spatial_index()
+    cell = spatial_cell_for(latitude, longitude, index['cell_deg'])
+    return [{'name': name, 'latitude': lat, 'longitude': lon} for name, lat, lon in index['cells'].get(cell, {}).values()]
+
+
+def build_name_search_index(names):
+    display_names = {}
+    for name in names:
+        if not isinstance(name, str) or not name.strip():
+            continue
+        display_names.setdefault(farmer_name_key(name), name.strip())
+    return {'keys': sorted(display_names), 'names': display_names}
+
+
+def update_name_search_index(index, name):
+    key = farmer_name_key(name)
+    if not key or key in index['names']:
+        return
+    index['names'][key] = str(name).strip()
+    bisect.insort(index['keys'], key)
+
+
+def get_farmer_name_search_index():
+    store = _farmer_profile_store()
+    with store['lock']:
+        if FARMER_DB_BACKEND == 'sqlite':
+            signature = _farmer_sqlite_signature()
+            if store['name_search'] is None or store['name_search_signature'] != signature:
+                names = [r[0] for r in _get_farmer_sqlite_conn().execute("SELECT name FROM farmers").fetchall()]
+                store['name_search'] = build_name_search_index(names)
+                store['name_search_signature'] = _farmer_sqlite_signature()
+            return store['name_search']
+        df = _refresh_farmer_store(store)
+        if df is not store['df']:
+            return build_name_search_index(df['name'].tolist() if 'name' in df.columns else [])
+        if store['name_search'] is None:
+            store['name_search'] = build_name_search_index(df['name'].tolist())
+        return store['name_search']
+
+
+def _name_search_max_distance(query_key):
+    if len(query_key) <= 3:
+        return 0
+    return 1 if len(query_key) <= 8 else 2
+
+
+def _trie_child_row(query_key, prefix, char, row, parent_row):
+    child_row = [row[0] + 1]
+    for col in range(1, len(row)):
+        cost = min(child_row[col - 1] + 1, row[col] + 1, row[col - 1] + (query_key[col - 1] != char))
+        if col > 1 and parent_row is not None and char == query_key[col - 2] and prefix[-1] == query_key[col - 1]:
+            cost = min(cost, parent_row[col - 2] + 1)
+        child_row.append(cost)
+    return child_row
+
+
+def _trie_prefix_ranges(keys, query_key, distance):
+    # The sorted key list is walked as an implicit trie: the keys under a prefix are a contiguous
+    # [lo, hi) slice, so a child is found with a bisect instead of a per-character node object.
+    # Rows are optimal-string-alignment distances, so a swapped pair of letters costs one edit.
+    ranges = []
+    stack = [('', 0, len(keys), list(range(len(query_key) + 1)), None)]
+    while stack:
+        prefix, lo, hi, row, parent_row = stack.pop()
+        if prefix and row[-1] == distance:
+            ranges.append((lo, hi))
+        if prefix and row[-1] < distance:
+            continue
+        depth = len(prefix)
+        if min(row) == distance:
+            # No edits left: only characters continuing an exact alignment can stay within budget.
+            chars = {query_key[col] for col in range(len(query_key)) if row[col] == distance}
+            if parent_row is not None:
+                chars.update(
+                    query_key[col - 2] for col in range(2, len(row))
+                    if parent_row[col - 2] < distance and prefix[-1] == query_key[col - 1]
+                )
+        else:
+            chars = []
+            i = lo
+            while i < hi:
+                key = keys[i]
+                if len(key) <= depth:
+                    i += 1
+                    continue
+                chars.append(key[depth])
+                i = bisect.bisect_left(keys, prefix + chr(ord(key[depth]) + 1), i, hi) if ord(key[depth]) < 0x10FFFF else hi
+            # Typos in the first letter are rare and widen the search the most, so only exact-first-letter
+            # prefixes are explored beyond one edit.
+            if depth == 0 and distance > 1:
+                chars = [c for c in chars if c == query_key[0]]
+        for char in chars:
+            child_prefix = prefix + char
+            child_lo = bisect.bisect_left(keys, child_prefix, lo, hi)
+            child_hi = bisect.bisect_left(keys, prefix + chr(ord(char) + 1), child_lo, hi) if ord(char) < 0x10FFFF else hi
+            if child_lo >= child_hi:
+                continue
+            child_row = _trie_child_row(query_key, prefix, char, row, parent_row)
+            if min(child_row) <= distance:
+                stack.append((child_prefix, child_lo, child_hi, child_row, row))
+    return ranges
+
+
+def search_farmer_names(query, limit=5, max_distance=None, index=None):
+    query_key = farmer_name_key(query) if isinstance(query, str) else ''
+    if not query_key or limit <= 0:
+        return []
+    index = index or get_farmer_name_search_index()
+    keys = index['keys']
+    if max_distance is None:
+        max_distance = _name_search_max_distance(query_key)
+
+    results, seen = [], set()
+    for distance in range(max_distance + 1):
+        if distance == 0:
+            lo = bisect.bisect_left(keys, query_key)
+            hi = bisect.bisect_left(keys, query_key + chr(0x10FFFF))
+            ranges = [(lo, hi)] if lo < hi else []
+        else:
+            ranges = _trie_prefix_ranges(keys, query_key, distance)
+        candidates = set()
+        for lo, hi in ranges:
+            taken = 0
+            for position in range(lo, hi):
+                if taken >= limit:
+                    break
+                if keys[position] not in seen and keys[position] not in candidates:
+                    candidates.add(keys[position])
+                    taken += 1
+        # Closest in length first, so a near-complete name outranks longer names sharing its prefix.
+        for key in sorted(candidates, key=lambda k: (abs(len(k) - len(query_key)), k))[:limit - len(results)]:
+            seen.add(key)
+            results.append(index['names'][key])
+        if len(results) >= limit or (results and distance >= 1):
+            break
+    return results
+
+
+@st.cache_resource(show_spinner=False)
+def _qa_log_writer():
+    state = {
+        'queue': queue.Queue(maxsize=QA_LOG_QUEUE_SIZE), 'file': None, 'segment': None, 'index_file': None,
+        'index_writer': None, 'index': None, 'index_lock': threading.Lock(), 'queue_lock': threading.Lock(), 'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'blob_file': None, 'blobs': None, 'search': OrderedDict(),
+    }
+    _prepare_qa_log_segments(state)
+    state['thread'] = threading.Thread(target=_qa_log_writer_loop, args=(state,), name="qa-log-writer", daemon=True)
+    state['thread'].start()
+    atexit.register(flush_qa_log)
+    return state
+
+
+def _encode_qa_log_row(row):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(row)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _qa_segment_path(day, compressed=False):
+    return os.path.join(QA_LOG_DIR, f"Log-{day}.csv" + (".gz" if compressed else ""))
+
+
+def qa_log_segments(start_date=None, end_date=None):
+    segments = {}
+    if os.path.isdir(QA_LOG_DIR):
+        for file_name in os.listdir(QA_LOG_DIR):
+            if not file_name.startswith("Log-") or not file_name.endswith((".csv", ".csv.gz")):
+                continue
+            day = file_name[len("Log-"):].split(".", 1)[0]
+            if start_date is not None and day < start_date.isoformat():
+                continue
+            if end_date is not None and day > end_date.isoformat():
+                continue
+            # While a closed segment is being compressed both files exist; the plain one is still complete.
+            if day not in segments or file_name.endswith(".csv"):
+                segments[day] = os.path.join(QA_LOG_DIR, file_name)
+    return sorted(segments.items())
+
+
+def _open_qa_segment(day):
+    try:
+        return open(_qa_segment_path(day), 'rb')
+    except FileNotFoundError:
+        return gzip.open(_qa_segment_path(day, compressed=True), 'rb')
+
+
+def _scan_qa_log_records(log_file, start=0):
+    # Records can span lines (quoted newlines), so a record ends at the first newline with balanced quotes.
+    log_file.seek(start)
+    offset, parts, quotes = start, [], 0
+    for line in log_file:
+        parts.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 or not line.endswith(b'\n'):
+            continue
+        record = b''.join(parts)
+        fields = next(csv.reader(io.StringIO(record.decode('utf-8', errors='replace'), newline='')), [])
+        yield offset, len(record), fields
+        offset += len(record)
+        parts, quotes = [], 0
+
+
+def _qa_log_index_rows(day, start):
+    rows, end = [], start
+    with _open_qa_segment(day) as log_file:
+        for offset, length, fields in _scan_qa_log_records(log_file, start):
+            end = offset + length
+            if offset == 0 and fields == QA_LOG_COLUMNS:
+                continue
+            if len(fields) >= 2:
+                rows.append([farmer_name_key(fields[1]), fields[0], day, offset, length])
+    return rows, end
+
+
+def _compress_qa_segment(state, day):
+    plain_path = _qa_segment_path(day)
+    if not os.path.exists(plain_path):
+        return
+    tmp_path = _qa_segment_path(day, compressed=True) + ".tmp"
+    with open(plain_path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, _qa_segment_path(day, compressed=True))
+    os.remove(plain_path)
+    logger.info(f"Compressed closed Q&A log segment {plain_path}.")
+
+
+def _migrate_legacy_qa_log(state):
+    if not os.path.exists(QA_LOG_PATH):
+        return
+    os.makedirs(QA_LOG_DIR, exist_ok=True)
+    handles = {}
+    try:
+        with open(QA_LOG_PATH, 'rb') as legacy_file:
+            for offset, length, fields in _scan_qa_log_records(legacy_file):
+                if offset == 0 and fields == QA_LOG_COLUMNS:
+                    continue
+                day = str(fields[0])[:10] if fields and fields[0][:10].count("-") == 2 else "0000-00-00"
+                if day not in handles:
+                    handles[day] = open(_qa_segment_path(day), 'ab')
+                    if handles[day].tell() == 0:
+                        handles[day].write(_encode_qa_log_row(QA_LOG_COLUMNS))
+                legacy_file.seek(offset)
+                handles[day].write(legacy_file.read(length))
+    finally:
+        for handle in handles.values():
+            handle.close()
+    os.replace(QA_LOG_PATH, QA_LOG_PATH + ".migrated")
+    for stale_index in (QA_LOG_PATH + ".idx", QA_LOG_INDEX_PATH):
+        if os.path.exists(stale_index):
+            os.remove(stale_index)
+    logger.info(f"Split legacy {QA_LOG_PATH} into {len(handles)} daily segments under {QA_LOG_DIR}; original kept as {QA_LOG_PATH}.migrated.")
+
+
+def _rotate_closed_qa_segments(state):
+    today = datetime.date.today().isoformat()
+    for day, path in qa_log_segments():
+        if QA_LOG_COMPRESS_CLOSED and day < today and path.endswith(".csv") and day != state['segment']:
+            _load_qa_log_index(state)
+            _compress_qa_segment(state, day)
+
+
+def rebuild_qa_log_index():
+    state = _qa_log_writer()
+    with state['index_lock']:
+        if state['index_file'] is not None:
+            state['index_file'].close()
+            state['index_file'] = None
+        if os.path.exists(QA_LOG_INDEX_PATH):
+            os.remove(QA_LOG_INDEX_PATH)
+        state['index'] = None
+        return _load_qa_log_index(state)
+
+
+def _read_qa_log_index_file():
+    index = {'entries': defaultdict(list), 'ends': {}}
+    if not os.path.exists(QA_LOG_INDEX_PATH):
+        return index
+    try:
+        with open(QA_LOG_INDEX_PATH, 'r', newline='', encoding='utf-8') as index_file:
+            for name_key, timestamp, day, offset, length in csv.reader(index_file):
+                offset, length = int(offset), int(length)
+                index['entries'][name_key].append((timestamp, day, offset, length))
+                index['ends'][day] = max(index['ends'].get(day, 0), offset + length)
+    except (ValueError, csv.Error) as e:
+        logger.warning(f"Q&A log index {QA_LOG_INDEX_PATH} is unreadable ({e}); rebuilding from {QA_LOG_DIR}.")
+        return None
+    return index
+
+
+def _load_qa_log_index(state):
+    index = state['index']
+    if index is None:
+        index = _read_qa_log_index_file()
+    segments = dict(qa_log_segments())
+    plain_sizes = {day: os.path.getsize(path) for day, path in segments.items() if path.endswith(".csv")}
+
+    # A segment that vanished or shrank invalidates the offsets recorded for it; start over from the files.
+    if index is None or any(
+        day not in segments or (day in plain_sizes and end > plain_sizes[day])
+        for day, end in index['ends'].items()
+    ):
+        index = {'entries': defaultdict(list), 'ends': {}}
+        state['search'].clear()
+        if state['index_file'] is not None:
+            state['index_file'].close()
+            state['index_file'] = None
+        with open(QA_LOG_INDEX_PATH, 'w', newline='', encoding='utf-8'):
+            pass
+
+    new_rows = []
+    for day, path in sorted(segments.items()):
+        known_end = index['ends'].get(day)
+        # Compressed segments are closed, so a segment already in the index is fully covered.
+        if known_end is not None and (day not in plain_sizes or known_end >= plain_sizes[day]):
+            continue
+        segment_rows, end = _qa_log_index_rows(day, known_end or 0)
+        new_rows.extend(segment_rows)
+        index['ends'][day] = end
+    if new_rows:
+        for name_key, timestamp, day, offset, length in new_rows:
+            index['entries'][name_key].append((timestamp, day, offset, length))
+        _open_qa_log_index(state).writerows(new_rows)
+        state['index_file'].flush()
+        logger.info(f"Indexed {len(new_rows)} Q&A log rows from {QA_LOG_DIR} into {QA_LOG_INDEX_PATH}.")
+    state['index'] = index
+    return index
+
+
+def _open_qa_log_index(state):
+    if state['index_file'] is None or not os.path.exists(QA_LOG_INDEX_PATH):
+        if state['index_file'] is not None:
+            state['index_file'].close()
+        state['index_file'] = open(QA_LOG_INDEX_PATH, 'a', newline='', encoding='utf-8')
+        state['index_writer'] = csv.writer(state['index_file'], lineterminator='\n')
+    return state['index_writer']
+
+
+def _open_qa_log(state, day):
+    if state['file'] is not None and state['segment'] == day and os.path.exists(_qa_segment_path(day)):
+        return
+    previous_day = state['segment']
+    if state['file'] is not None:
+        state['file'].close()
+        state['file'] = None
+    if previous_day is not None and previous_day < day and QA_LOG_COMPRESS_CLOSED:
+        _compress_qa_segment(state, previous_day)
+    os.makedirs(QA_LOG_DIR, exist_ok=True)
+    state['file'] = open(_qa_segment_path(day), 'ab')
+    state['segment'] = day
+    if state['file'].tell() == 0:
+        state['file'].write(_encode_qa_log_row(QA_LOG_COLUMNS))
+        state['file'].flush()
+
+
+def _open_prompt_blob_pack(state):
+    if state['blob_file'] is None or not os.path.exists(QA_LOG_BLOB_PATH):
+        if state['blob_file'] is not None:
+            state['blob_file'].close()
+            state['blobs'] = None
+        os.makedirs(QA_LOG_DIR, exist_ok=True)
+        state['blob_file'] = open(QA_LOG_BLOB_PATH, 'ab')
+    return state['blob_file']
+
+
+def _load_prompt_blobs(state):
+    if state['blobs'] is not None and os.path.exists(QA_LOG_BLOB_PATH):
+        return state['blobs']
+    # Pack records are "<digest> <length>\n<bytes>", so the in-memory digest map is rebuilt by hopping over headers.
+    blobs, valid_end = {}, 0
+    if os.path.exists(QA_LOG_BLOB_PATH):
+        pack_size = os.path.getsize(QA_LOG_BLOB_PATH)
+        with open(QA_LOG_BLOB_PATH, 'rb') as pack_file:
+            while True:
+                header = pack_file.readline()
+                try:
+                    digest, length = header.decode('ascii').split()
+                    length = int(length)
+                except (UnicodeDecodeError, ValueError):
+                    break
+                offset = pack_file.tell()
+                if offset + length > pack_size:
+                    break
+                blobs[digest] = (offset, length)
+                pack_file.seek(length, os.SEEK_CUR)
+                valid_end = offset + length
+        if valid_end < pack_size:
+            logger.warning(f"Dropping {pack_size - valid_end} bytes of torn data at the end of {QA_LOG_BLOB_PATH}.")
+            if state['blob_file'] is not None:
+                state['blob_file'].close()
+                state['blob_file'] = None
+            with open(QA_LOG_BLOB_PATH, 'r+b') as pack_file:
+                pack_file.truncate(valid_end)
+    state['blobs'] = blobs
+    return blobs
+
+
+def _store_prompt_blocks(state, prompt):
+    if not prompt:
+        return prompt
+    blobs = _load_prompt_blobs(state)
+    digests = []
+    for block in prompt.split(PROMPT_BLOCK_SEPARATOR):
+        data = block.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:PROMPT_DIGEST_LENGTH]
+        if digest not in blobs:
+            pack_file = _open_prompt_blob_pack(state)
+            pack_file.write(f"{digest} {len(data)}\n".encode('ascii'))
+            blobs[digest] = (pack_file.tell(), len(data))
+            pack_file.write(data)
+        digests.append(digest)
+    return PROMPT_REF_PREFIX + ",".join(digests)
+
+
+def rehydrate_internal_prompt(value):
+    value = str(value)
+    if not value.startswith(PROMPT_REF_PREFIX):
+        return value
+    digests = value[len(PROMPT_REF_PREFIX):].split(",")
+    state = _qa_log_writer()
+    with state['index_lock']:
+        blobs = _load_prompt_blobs(state)
+        locations = [blobs.get(digest) for digest in digests]
+    blocks = []
+    with open(QA_LOG_BLOB_PATH, 'rb') as pack_file:
+        for digest, location in zip(digests, locations):
+            if location is None:
+                logger.warning(f"Prompt block {digest} is missing from {QA_LOG_BLOB_PATH}.")
+                blocks.append(f"[missing prompt block {digest}]")
+                continue
+            pack_file.seek(location[0])
+            blocks.append(pack_file.read(location[1]).decode('utf-8', errors='replace'))
+    return PROMPT_BLOCK_SEPARATOR.join(blocks)
+
+
+def _write_qa_log_rows(state, rows):
+    try:
+        with state['index_lock']:
+            if QA_LOG_DEDUP_PROMPTS:
+                # New blocks reach the pack before the rows that reference them, so a crash never leaves dangling digests.
+                rows = [row[:5] + [_store_prompt_blocks(state, row[5])] for row in rows]
+                if state['blob_file'] is not None:
+                    state['blob_file'].flush()
+            index = _load_qa_log_index(state)
+            index_rows = []
+            for row in rows:
+                # Rows are never written into a segment older than the open one, so closed segments stay closed.
+                day = max(row[0][:10], state['segment'] or "")
+                _open_qa_log(state, day)
+                offset = state['file'].tell()
+                data = _encode_qa_log_row(row)
+                state['file'].write(data)
+                index_rows.append([farmer_name_key(row[1]), row[0], day, offset, len(data)])
+                index['ends'][day] = offset + len(data)
+            state['file'].flush()
+            _open_qa_log_index(state).writerows(index_rows)
+            state['index_file'].flush()
+            for row, (name_key, timestamp, day, offset, length) in zip(rows, index_rows):
+                index['entries'][name_key].append((timestamp, day, offset, length))
+                if name_key in state['search']:
+                    _add_history_search_doc(state['search'][name_key], (timestamp, day, offset, length), row[3], row[4])
+        state['written'] += len(rows)
+        logger.debug(f"Flushed {len(rows)} Q&A log rows to {QA_LOG_DIR}.")
+    except OSError as e:
+        state['failed'] += len(rows)
+        logger.error(f"IOError logging {len(rows)} Q&A rows to {QA_LOG_DIR}: {e}", exc_info=True)
+        _reset_qa_log_handles(state)
+    except Exception as e:
+        # Anything else (e.g. a row that cannot be encoded) must not kill the writer thread.
+        state['failed'] += len(rows)
+        logger.error(f"Unexpected error logging {len(rows)} Q&A rows to {QA_LOG_DIR}: {e}", exc_info=True)
+        _reset_qa_log_handles(state)
+
+
+def _reset_qa_log_handles(state):
+    # Reopened and reloaded from disk on the next batch, so a half-written batch cannot leave the in-memory index out of step.
+    with state['index_lock']:
+        for handle in ('file', 'index_file', 'blob_file'):
+            if state[handle] is not None:
+                try:
+                    state[handle].close()
+                except OSError:
+                    pass
+                state[handle] = None
+        state['index'] = None
+        state['blobs'] = None
+
+
+def farmer_log_entries(farmer_name, start_date=None, end_date=None):
+    state = _qa_log_writer()
+    with state['index_lock']:
+        entries = list(_load_qa_log_index(state)['entries'].get(farmer_name_key(farmer_name), []))
+    # Newest first: the log is appended in time order, so reverse before the stable sort keeps same-second rows newest-first too.
+    entries.reverse()
+    entries.sort(key=lambda entry: entry[0], reverse=True)
+    if start_date is not None:
+        entries = [e for e in entries if e[0][:10] >= start_date.isoformat()]
+    if end_date is not None:
+        entries = [e for e in entries if e[0][:10] <= end_date.isoformat()]
+    return entries
+
+
+def read_qa_log_entries(entries, rehydrate_prompts=False):
+    records = {}
+    by_segment = defaultdict(list)
+    for position, (_, day, offset, length) in enumerate(entries):
+        by_segment[day].append((offset, length, position))
+    for day, segment_entries in by_segment.items():
+        # Ascending offsets keep a gzip segment to a single forward pass.
+        with _open_qa_segment(day) as log_file:
+            for offset, length, position in sorted(segment_entries):
+                log_file.seek(offset)
+                record = log_file.read(length).decode('utf-8', errors='replace')
+                fields = next(csv.reader(io.StringIO(record, newline='')), [])
+                records[position] = (fields + [''] * len(QA_LOG_COLUMNS))[:len(QA_LOG_COLUMNS)]
+    log_df = pd.DataFrame([records[position] for position in range(len(entries))], columns=QA_LOG_COLUMNS)
+    if rehydrate_prompts:
+        log_df['internal_prompt'] = log_df['internal_prompt'].map(rehydrate_internal_prompt)
+    return log_df
+
+
+def read_farmer_log_rows(farmer_name, rehydrate_prompts=False):
+    return read_qa_log_entries(farmer_log_entries(farmer_name)[::-1], rehydrate_prompts)
+
+
+# Word characters plus the Brahmic blocks (Devanagari..Sinhala) whole, so vowel signs, viramas and nuktas stay
+# inside their word; dandas (U+0964/5) split. ZWJ/ZWNJ are kept while matching and dropped from the token.
+HISTORY_TOKEN_PATTERN = re.compile(r"(?:[^\W_]|[\u0900-\u0963\u0966-\u0DFF\u200c\u200d])+")
+HISTORY_STOPWORDS = frozenset(
+    "a an and are as at be by did do for from how i in is it me my of on or our say the this to was we what when "
+    "which who why will with you your".split()
+)
+
+
+def tokenize_history_text(text):
+    text = unicodedata.normalize('NFC', str(text)).casefold()
+    tokens = []
+    for match in HISTORY_TOKEN_PATTERN.findall(text):
+        token = match.replace('\u200c', '').replace('\u200d', '')
+        if token and token not in HISTORY_STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def _add_history_search_doc(search_index, entry, query, response):
+    tokens = tokenize_history_text(f"{query} {response}")
+    doc_id = len(search_index['docs'])
+    search_index['docs'].append(entry)
+    search_index['lengths'].append(len(tokens))
+    search_index['total_length'] += len(tokens)
+    for term, tf in Counter(tokens).items():
+        search_index['postings'][term][doc_id] = tf
+
+
+def _farmer_history_search_index(state, name_key):
+    # Caller holds index_lock. Built on a farmer's first search from their own rows only, then kept current by the writer.
+    search = state['search']
+    search_index = search.get(name_key)
+    if search_index is not None:
+        search.move_to_end(name_key)
+        return search_index
+    entries = list(_load_qa_log_index(state)['entries'].get(name_key, []))
+    search_index = {'docs': [], 'lengths': [], 'total_length': 0, 'postings': defaultdict(dict)}
+    if entries:
+        rows = read_qa_log_entries(entries)
+        for entry, query, response in zip(entries, rows['query'], rows['response']):
+            _add_history_search_doc(search_index, entry, query, response)
+    search[name_key] = search_index
+    while len(search) > HISTORY_SEARCH_MAX_FARMERS:
+        search.popitem(last=False)
+    return search_index
+
+
+def search_farmer_history(farmer_name, query, limit=None, start_date=None, end_date=None):
+    limit = limit or HISTORY_SEARCH_LIMIT
+    query_terms = set(tokenize_history_text(query))
+    if not query_terms:
+        return []
+    state = _qa_log_writer()
+    with state['index_lock']:
+        search_index = _farmer_history_search_index(state, farmer_name_key(farmer_name))
+        n_docs = len(search_index['docs'])
+        if not n_docs:
+            return []
+        avg_length = search_index['total_length'] / n_docs or 1.0
+        scores = defaultdict(float)
+        for term in query_terms:
+            postings = search_index['postings'].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * search_index['lengths'][doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        docs = search_index['docs']
+
+    start = start_date.isoformat() if start_date is not None else None
+    end = end_date.isoformat() if end_date is not None else None
+    ranked = (
+        (score, docs[doc_id]) for doc_id, score in scores.items()
+        if (start is None or docs[doc_id][0][:10] >= start) and (end is None or docs[doc_id][0][:10] <= end)
+    )
+    # Ties go to the newer interaction.
+    return [(entry, score) for score, entry in heapq.nlargest(limit, ranked, key=lambda hit: (hit[0], hit[1][0]))]
+
+
+def _prepare_qa_log_segments(state):
+    # Runs before the writer thread starts, so no history read or flush ever sees a half-migrated legacy Log.csv.
+    try:
+        with state['index_lock']:
+            _migrate_legacy_qa_log(state)
+            os.makedirs(QA_LOG_DIR, exist_ok=True)
+            _rotate_closed_qa_segments(state)
+    except Exception as e:
+        logger.error(f"Could not prepare Q&A log segments in {QA_LOG_DIR}: {e}", exc_info=True)
+
+
+def _qa_log_writer_loop(state):
+    log_queue = state['queue']
+    while True:
+        item = log_queue.get()
+        rows, flush_events = [], []
+        # Linger briefly so rows from concurrent sessions share one write; a flush request cuts it short.
+        deadline = time.monotonic() + QA_LOG_FLUSH_INTERVAL_S
+        while True:
+            if isinstance(item, threading.Event):
+                flush_events.append(item)
+            else:
+                rows.append(item)
+            remaining = deadline - time.monotonic()
+            if flush_events or len(rows) >= QA_LOG_BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = log_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        try:
+            if rows:
+                _write_qa_log_rows(state, rows)
+        except Exception as e:
+            state['failed'] += len(rows)
+            logger.error(f"Q&A log writer failed on a batch of {len(rows)} rows: {e}", exc_info=True)
+        finally:
+            # Waiting flushers are always released, even when the batch was lost.
+            for event in flush_events:
+                event.set()
+
+
+def flush_qa_log(timeout=5.0):
+    state = _qa_log_writer()
+    flushed = threading.Event()
+    try:
+        state['queue'].put(flushed, timeout=timeout)
+    except queue.Full:
+        logger.warning(f"Q&A log queue still full after {timeout}s; flush skipped.")
+        return False
+    return flushed.wait(timeout)
+
+
+def qa_log_pending(queued):
+    # True while rows queued up to position `queued` have not all been written (or given up on) by the writer.
+    state = _qa_log_writer()
+    return queued > state['written'] + state['failed']
 
 
 def log_qa(timestamp, farmer_name, language, query, response, internal_prompt):
     try:
-        log_entry = {
-            'timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-            'farmer_name': str(farmer_name).strip(),
-            'language': str(language),
-            'query': str(query),
-            'response': str(response),
-            'internal_prompt': str(internal_prompt)
-        }
-        log_df_entry = pd.DataFrame([log_entry], columns=QA_LOG_COLUMNS)
-        file_exists = os.path.exists(QA_LOG_PATH)
-        log_df_entry.to_csv(
-            QA_LOG_PATH,
-            mode='a',
-            header=not file_exists,
-            index=False,
-            encoding='utf-8'
-        )
-        logger.info(f"Logged Q&A for farmer '{farmer_name}' to {QA_LOG_PATH}")
-    except IOError as e:
-        logger.error(f"IOError logging Q&A to {QA_LOG_PATH}: {e}", exc_info=True)
+        row = [
+            timestamp.strftime("%Y-%m-%d %H:%M:%S"), str(farmer_name).strip(), str(language),
+            str(query), str(response), str(internal_prompt),
+        ]
+        state = _qa_log_writer()
+        with state['queue_lock']:
+            state['queue'].put_nowait(row)
+            state['queued'] += 1
+        logger.info(f"Queued Q&A for farmer '{farmer_name}' for {QA_LOG_DIR}")
+    except queue.Full:
+        state['dropped'] += 1
+        logger.error(f"Q&A log queue full ({QA_LOG_QUEUE_SIZE} rows); dropped entry for farmer '{farmer_name}'.")
     except Exception as e:
-        logger.error(f"Unexpected error logging Q&A to {QA_LOG_PATH}: {e}", exc_info=True)
+        logger.error(f"Unexpected error queueing Q&A for farmer '{farmer_name}': {e}", exc_info=True)
+
+
+QA_LOG_ERROR_PREFIXES = tuple(
+    f"{lang_dict['system_error_label']}: " for lang_dict in translations.values() if 'system_error_label' in lang_dict
+)
+
+
+def is_error_log_response(response):
+    # process_farmer_request prefixes failed responses with the (translated) system error label before logging them.
+    response = str(response)
+    return response.startswith(QA_LOG_ERROR_PREFIXES) or response.lower().startswith("error:")
 
 
 def initialize_llm(api_key):
@@ -916,7 +2454,634 @@ def forecast_market_price(crop, market_name):
     }
 
 
-def get_weather_forecast(latitude, longitude, api_key):
+class _WeatherRetry(Retry):
+    def get_retry_after(self, response):
+        # Honour Retry-After, but never park a Streamlit session for longer than WEATHER_RETRY_AFTER_MAX_S.
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, WEATHER_RETRY_AFTER_MAX_S)
+
+
+class WeatherQuotaExceeded(Exception):
+    def __init__(self, retry_after_s):
+        super().__init__(f"Weather API quota exhausted; next call allowed in {retry_after_s:.1f}s")
+        self.retry_after_s = retry_after_s
+
+
+def _weather_retry_policy():
+    options = dict(
+        total=WEATHER_MAX_RETRIES, connect=WEATHER_MAX_RETRIES, read=WEATHER_MAX_RETRIES, status=WEATHER_MAX_RETRIES,
+        backoff_factor=WEATHER_BACKOFF_FACTOR, status_forcelist=WEATHER_RETRY_STATUSES,
+        allowed_methods=frozenset({'GET'}), respect_retry_after_header=True, raise_on_status=False,
+    )
+    try:
+        return _WeatherRetry(backoff_jitter=WEATHER_BACKOFF_JITTER_S, backoff_max=WEATHER_BACKOFF_MAX_S, **options)
+    except TypeError:
+        logger.info("urllib3 < 2 detected: weather retries use exponential backoff without jitter.")
+        return _WeatherRetry(**options)
+
+
+@st.cache_resource(show_spinner=False)
+def _weather_http():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=WEATHER_POOL_SIZE, pool_maxsize=WEATHER_POOL_SIZE, max_retries=_weather_retry_policy())
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return {'session': session, 'lock': threading.Lock(), 'failures': 0, 'opened_at': None, 'probe_in_flight': False}
+
+
+def _weather_circuit_wait_s(http):
+    with http['lock']:
+        if http['opened_at'] is None:
+            return 0.0
+        remaining = http['opened_at'] + WEATHER_BREAKER_RESET_S - time.monotonic()
+        if remaining > 0:
+            return remaining
+        if http['probe_in_flight']:
+            return 1.0
+        # Half-open: exactly one request probes the upstream; everyone else keeps failing fast until it reports back.
+        http['probe_in_flight'] = True
+        return 0.0
+
+
+def _record_weather_outcome(http, ok):
+    with http['lock']:
+        http['probe_in_flight'] = False
+        if ok:
+            if http['opened_at'] is not None:
+                logger.info("Weather API recovered; circuit breaker closed.")
+            http['failures'] = 0
+            http['opened_at'] = None
+            return
+        http['failures'] += 1
+        if http['opened_at'] is not None or http['failures'] >= WEATHER_BREAKER_THRESHOLD:
+            if http['opened_at'] is None:
+                logger.warning(f"Weather API failed {http['failures']} times in a row; failing fast for {WEATHER_BREAKER_RESET_S:.0f}s.")
+            http['opened_at'] = time.monotonic()
+
+
+def _release_weather_probe(http, healthy=False):
+    # For refreshes that end without calling the upstream: a half-open probe they may hold must go back, or the breaker never closes.
+    if healthy:
+        _record_weather_outcome(http, True)
+        return
+    with http['lock']:
+        http['probe_in_flight'] = False
+
+
+def fetch_weather_api(params):
+    http = _weather_http()
+    try:
+        response = http['session'].get(WEATHER_API_URL, params=params, timeout=(WEATHER_CONNECT_TIMEOUT_S, WEATHER_READ_TIMEOUT_S))
+    except requests.exceptions.RequestException:
+        _record_weather_outcome(http, False)
+        raise
+    # Client errors (bad key, unknown location) say nothing about upstream health; 5xx and exhausted 429s do.
+    _record_weather_outcome(http, response.status_code < 500 and response.status_code != 429)
+    return response
+
+
+@st.cache_resource(show_spinner=False)
+def _weather_quota():
+    # Token bucket shared by every session in the process; waiters form a heap of (priority, arrival) tickets.
+    return {
+        'cond': threading.Condition(), 'tokens': WEATHER_QUOTA_BURST, 'updated': time.monotonic(), 'waiters': [], 'seq': 0,
+        'calls_made': 0, 'throttled': 0, 'rejected': 0, 'cache_served': 0,
+    }
+
+
+def _refill_weather_quota(quota, now):
+    quota['tokens'] = min(WEATHER_QUOTA_BURST, quota['tokens'] + (now - quota['updated']) * WEATHER_QUOTA_PER_MINUTE / 60)
+    quota['updated'] = now
+
+
+def _weather_quota_wait_s(quota):
+    return max(0.0, (1 - quota['tokens']) * 60 / max(WEATHER_QUOTA_PER_MINUTE, 1e-9))
+
+
+def acquire_weather_quota(priority=WEATHER_PRIORITY_INTERACTIVE, timeout=None):
+    quota = _weather_quota()
+    timeout = WEATHER_QUOTA_MAX_WAIT_S if timeout is None else timeout
+    with quota['cond']:
+        now = time.monotonic()
+        _refill_weather_quota(quota, now)
+        if not quota['waiters'] and quota['tokens'] >= 1:
+            quota['tokens'] -= 1
+            return True
+        quota['throttled'] += 1
+        quota['seq'] += 1
+        ticket = (priority, quota['seq'])
+        heapq.heappush(quota['waiters'], ticket)
+        deadline = now + timeout
+        try:
+            while True:
+                now = time.monotonic()
+                _refill_weather_quota(quota, now)
+                # Only the head of the heap may take a token, so interactive fetches overtake queued background refreshes.
+                if quota['waiters'][0] == ticket and quota['tokens'] >= 1:
+                    quota['tokens'] -= 1
+                    return True
+                if now >= deadline:
+                    quota['rejected'] += 1
+                    raise WeatherQuotaExceeded(_weather_quota_wait_s(quota))
+                quota['cond'].wait(min(deadline - now, max(_weather_quota_wait_s(quota), 0.01)))
+        finally:
+            quota['waiters'].remove(ticket)
+            heapq.heapify(quota['waiters'])
+            quota['cond'].notify_all()
+
+
+def refund_weather_quota():
+    quota = _weather_quota()
+    with quota['cond']:
+        quota['tokens'] = min(WEATHER_QUOTA_BURST, quota['tokens'] + 1)
+        quota['cache_served'] += 1
+        quota['cond'].notify_all()
+
+
+def drain_weather_quota():
+    # The upstream said 429 anyway (the key may be shared with other deployments): stop spending until the bucket refills.
+    quota = _weather_quota()
+    with quota['cond']:
+        quota['tokens'] = min(quota['tokens'], 0.0)
+
+
+def weather_quota_stats():
+    quota = _weather_quota()
+    with quota['cond']:
+        _refill_weather_quota(quota, time.monotonic())
+        return {
+            'calls_made': quota['calls_made'], 'throttled': quota['throttled'], 'rejected': quota['rejected'],
+            'cache_served': quota['cache_served'], 'waiting': len(quota['waiters']),
+            'headroom': quota['tokens'], 'per_minute': WEATHER_QUOTA_PER_MINUTE,
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def _weather_cache():
+    return {
+        'lock': threading.Lock(), 'entries': OrderedDict(), 'parsed': OrderedDict(), 'local': threading.local(),
+        'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'api_calls': 0, 'stale_served': 0, 'coalesced': 0,
+    }
+
+
+def weather_cache_cell(latitude, longitude, cell_deg=None):
+    # Every farmer in a cell shares one forecast, fetched for the cell centre so the cached payload is the same for all.
+    cell_deg = cell_deg or WEATHER_CACHE_GRID_DEG
+    row, col = spatial_cell_for(latitude, longitude, cell_deg)
+    return f"{cell_deg:g}:{row}:{col}", round((row + 0.5) * cell_deg, 6), round((col + 0.5) * cell_deg, 6)
+
+
+def next_forecast_refresh(now=None):
+    now = time.time() if now is None else now
+    return (math.floor(now / WEATHER_FORECAST_CADENCE_S) + 1) * WEATHER_FORECAST_CADENCE_S
+
+
+def _get_weather_cache_conn(cache):
+    conn = getattr(cache['local'], 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(WEATHER_CACHE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS weather_forecasts "
+            "(cell TEXT PRIMARY KEY, fetched_at REAL NOT NULL, expires_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        cache['local'].conn = conn
+    return conn
+
+
+def _remember_forecast(cache, cell, expires_at, fetched_at, data):
+    with cache['lock']:
+        cache['entries'][cell] = (expires_at, fetched_at, data)
+        cache['entries'].move_to_end(cell)
+        while len(cache['entries']) > WEATHER_CACHE_MAX_ENTRIES:
+            cache['entries'].popitem(last=False)
+
+
+def get_cached_forecast_data(cell, record_stats=True):
+    cache = _weather_cache()
+    now = time.time()
+    with cache['lock']:
+        entry = cache['entries'].get(cell)
+        if entry is not None and entry[0] > now:
+            cache['entries'].move_to_end(cell)
+            cache['memory_hits'] += record_stats
+            return entry[2], entry[1]
+
+    try:
+        row = _get_weather_cache_conn(cache).execute(
+            "SELECT expires_at, fetched_at, payload FROM weather_forecasts WHERE cell = ? AND expires_at > ?", (cell, now)
+        ).fetchone()
+        data = json.loads(row[2]) if row else None
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"Weather disk cache {WEATHER_CACHE_PATH} unreadable for cell {cell}: {e}")
+        row, data = None, None
+
+    if data is not None:
+        _remember_forecast(cache, cell, row[0], row[1], data)
+        with cache['lock']:
+            cache['disk_hits'] += record_stats
+        return data, row[1]
+    with cache['lock']:
+        cache['misses'] += record_stats
+    return None
+
+
+def get_stale_forecast_data(cell):
+    # Expired entries are kept for WEATHER_STALE_MAX_AGE_S so an outage can still be answered from the last good forecast.
+    cache = _weather_cache()
+    oldest = time.time() - WEATHER_STALE_MAX_AGE_S
+    with cache['lock']:
+        entry = cache['entries'].get(cell)
+        if entry is not None and entry[1] > oldest:
+            return entry[2], entry[1]
+    try:
+        row = _get_weather_cache_conn(cache).execute(
+            "SELECT fetched_at, payload FROM weather_forecasts WHERE cell = ? AND fetched_at > ?", (cell, oldest)
+        ).fetchone()
+        return (json.loads(row[1]), row[0]) if row else None
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"Weather disk cache {WEATHER_CACHE_PATH} unreadable for cell {cell}: {e}")
+        return None
+
+
+def store_forecast_data(cell, data):
+    cache = _weather_cache()
+    now = time.time()
+    expires_at = next_forecast_refresh(now)
+    _remember_forecast(cache, cell, expires_at, now, data)
+    try:
+        conn = _get_weather_cache_conn(cache)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO weather_forecasts (cell, fetched_at, expires_at, payload) VALUES (?, ?, ?, ?)",
+                (cell, now, expires_at, json.dumps(data, separators=(',', ':'))),
+            )
+            conn.execute("DELETE FROM weather_forecasts WHERE fetched_at <= ?", (now - WEATHER_STALE_MAX_AGE_S,))
+    except sqlite3.Error as e:
+        logger.warning(f"Could not write weather forecast for cell {cell} to {WEATHER_CACHE_PATH}: {e}")
+    return now
+
+
+def weather_cache_stats():
+    cache = _weather_cache()
+    with cache['lock']:
+        stats = {key: cache[key] for key in ('memory_hits', 'disk_hits', 'misses', 'api_calls', 'stale_served', 'coalesced')}
+        stats['memory_entries'] = len(cache['entries'])
+    lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+    return stats
+
+
+@st.cache_resource(show_spinner=False)
+def _weather_refresher():
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=WEATHER_REFRESH_WORKERS, thread_name_prefix="weather-refresh")
+    return {'executor': executor, 'lock': threading.Lock(), 'in_flight': {}}
+
+
+def _acquire_weather_cell_lock(cell):
+    # Cross-process single flight: one process per cell fetches while the others wait on the lock file and then read its result from SQLite.
+    if not WEATHER_COALESCE_LOCK_DIR or not FCNTL_AVAILABLE:
+        return None
+    try:
+        os.makedirs(WEATHER_COALESCE_LOCK_DIR, exist_ok=True)
+        lock_file = open(os.path.join(WEATHER_COALESCE_LOCK_DIR, cell.replace(":", "_") + ".lock"), 'a')
+    except OSError as e:
+        logger.warning(f"Could not open weather fetch lock for cell {cell} in {WEATHER_COALESCE_LOCK_DIR}: {e}")
+        return None
+    deadline = time.monotonic() + WEATHER_COALESCE_LOCK_WAIT_S
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                logger.warning(f"Weather fetch lock for cell {cell} held by another process for over {WEATHER_COALESCE_LOCK_WAIT_S:.0f}s; fetching independently.")
+                lock_file.close()
+                return None
+            time.sleep(0.05)
+
+
+def _release_weather_cell_lock(lock_file):
+    if lock_file is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def _refresh_weather_cell(cell, params, priority=WEATHER_PRIORITY_INTERACTIVE):
+    cache = _weather_cache()
+    http = _weather_http()
+    upstream_called, healthy = False, False
+    lock_file = _acquire_weather_cell_lock(cell)
+    try:
+        # A leader that finished just before this refresh was submitted, or another process holding the cell lock, may already have stored it.
+        fresh = get_cached_forecast_data(cell, record_stats=False)
+        if fresh is not None:
+            with cache['lock']:
+                cache['coalesced'] += 1
+            logger.info(f"Weather fetch for cell {cell} coalesced with one that just completed.")
+            # Someone just fetched this cell successfully: close the breaker rather than leave this process failing fast.
+            healthy = True
+            return fresh
+        background = priority != WEATHER_PRIORITY_INTERACTIVE
+        acquire_weather_quota(priority, WEATHER_QUOTA_BACKGROUND_WAIT_S if background else WEATHER_QUOTA_MAX_WAIT_S)
+        fresh = get_cached_forecast_data(cell, record_stats=False)
+        if fresh is not None:
+            # Filled while this refresh queued for quota (by another process sharing the SQLite cache): hand the token back.
+            refund_weather_quota()
+            healthy = True
+            return fresh
+        with cache['lock']:
+            cache['api_calls'] += 1
+        quota = _weather_quota()
+        with quota['cond']:
+            quota['calls_made'] += 1
+        upstream_called = True
+        response = fetch_weather_api(params)
+        if response.status_code == 429:
+            drain_weather_quota()
+        response.raise_for_status()
+        data = response.json()
+        logger.info(f"Weather data fetched successfully for cell {cell}.")
+        fetched_at = time.time()
+        if isinstance(data, dict) and isinstance(data.get('list'), list):
+            fetched_at = store_forecast_data(cell, data)
+    finally:
+        _release_weather_cell_lock(lock_file)
+        if not upstream_called:
+            _release_weather_probe(http, healthy)
+    stats = weather_cache_stats()
+    logger.info(f"Weather cache hit rate {stats['hit_rate']:.0%} ({stats['memory_hits']} memory, {stats['disk_hits']} disk, {stats['misses']} misses, {stats['stale_served']} stale, {stats['coalesced']} coalesced).")
+    quota_stats = weather_quota_stats()
+    logger.info(f"Weather quota: {quota_stats['calls_made']} calls made, {quota_stats['throttled']} throttled, {quota_stats['rejected']} rejected, {quota_stats['headroom']:.1f} of {WEATHER_QUOTA_BURST:g} calls of headroom.")
+    return data, fetched_at
+
+
+def _submit_weather_refresh(cell, params, priority=WEATHER_PRIORITY_INTERACTIVE):
+    # The refresh runs on its own thread so it can outlive the caller's latency budget and still fill the cache.
+    # Concurrent sessions asking for the same cell wait on the one in-flight future and share its result.
+    refresher = _weather_refresher()
+    with refresher['lock']:
+        future = refresher['in_flight'].get(cell)
+        submitted = future is None
+        if submitted:
+            future = refresher['executor'].submit(_refresh_weather_cell, cell, params, priority)
+            refresher['in_flight'][cell] = future
+    if not submitted:
+        cache = _weather_cache()
+        with cache['lock']:
+            cache['coalesced'] += 1
+    else:
+        # Registered outside the lock: an already-finished future runs the callback immediately.
+        future.add_done_callback(lambda _: _forget_weather_refresh(refresher, cell, future))
+    return future
+
+
+def _forget_weather_refresh(refresher, cell, future):
+    with refresher['lock']:
+        if refresher['in_flight'].get(cell) is future:
+            del refresher['in_flight'][cell]
+
+
+def _log_background_weather_refresh(cell, future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Background weather refresh for cell {cell} failed ({future.exception()}); the last forecast stays in use.")
+
+
+def weather_age_label(age_s, language=None):
+    language = language or current_ui_language()
+    if age_s < 3600:
+        age = translate_for(language, "weather_age_minutes", minutes=max(1, int(round(age_s / 60))))
+    else:
+        age = translate_for(language, "weather_age_hours", hours=int(round(age_s / 3600)))
+    return translate_for(language, "weather_stale_label", age=age)
+
+
+FORECAST_NUMERIC_COLUMNS = ('dt', 'temp', 'temp_min', 'temp_max', 'rain', 'wind')
+
+
+def _forecast_item_row(item):
+    try:
+        main = item['main']
+        rain = item.get('rain') or {}
+        wind = item.get('wind') or {}
+        numbers = (item['dt'], main.get('temp'), main['temp_min'], main['temp_max'], rain.get('3h', 0.0), wind.get('speed', 0.0))
+        return numbers, str(item['weather'][0]['description']).capitalize()
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+def forecast_payload_columns(payload):
+    items = payload.get('list') if isinstance(payload, dict) else None
+    rows = [row for row in map(_forecast_item_row, items if isinstance(items, list) else []) if row is not None]
+    numbers = [row[0] for row in rows]
+    try:
+        table = np.array(numbers, dtype=float).reshape(len(rows), len(FORECAST_NUMERIC_COLUMNS))
+    except (TypeError, ValueError):
+        table = pd.DataFrame(numbers, columns=FORECAST_NUMERIC_COLUMNS).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    columns = {key: table[:, i] for i, key in enumerate(FORECAST_NUMERIC_COLUMNS)}
+    columns['description'] = np.array([row[1] for row in rows], dtype=object)
+    # Items without a usable timestamp or min/max temperature are skipped, as the per-item parser used to do.
+    valid = np.isfinite(columns['dt']) & np.isfinite(columns['temp_min']) & np.isfinite(columns['temp_max'])
+    if not valid.all():
+        logger.warning(f"Skipping {int((~valid).sum())} forecast items with unparseable values.")
+        columns = {key: values[valid] for key, values in columns.items()}
+    for key in ('rain', 'wind'):
+        columns[key][np.isnan(columns[key])] = 0.0
+    return columns
+
+
+def aggregate_forecast_days(payloads):
+    # Accepts one payload or many (e.g. one per grid cell); rows of the result are ordered by (payload, day).
+    payloads = [payloads] if isinstance(payloads, dict) else list(payloads)
+    parts = [forecast_payload_columns(payload) for payload in payloads]
+    if len(parts) == 1:
+        columns = parts[0]
+    else:
+        columns = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]} if parts else {}
+    payload_ids = np.repeat(np.arange(len(parts)), [len(part['dt']) for part in parts]) if parts else np.empty(0, dtype=int)
+    if not len(payload_ids):
+        return {'payload': payload_ids, 'day': np.empty(0, dtype=object), 'conditions': []}
+
+    # Server-local calendar days, like datetime.fromtimestamp; the UTC offset is taken once per payload.
+    first_dt = [int(part['dt'][0]) if len(part['dt']) else 0 for part in parts]
+    offsets = np.array([time.localtime(dt).tm_gmtoff for dt in first_dt], dtype=np.int64)
+    local_days = (columns['dt'].astype(np.int64) + offsets[payload_ids]) // 86400
+
+    order = np.lexsort((local_days, payload_ids))
+    payload_sorted, days_sorted = payload_ids[order], local_days[order]
+    boundaries = (payload_sorted[1:] != payload_sorted[:-1]) | (days_sorted[1:] != days_sorted[:-1])
+    starts = np.concatenate(([0], np.flatnonzero(boundaries) + 1))
+
+    def reduce(ufunc, key):
+        return ufunc.reduceat(columns[key][order], starts)
+
+    days = {
+        'payload': payload_sorted[starts],
+        'day': np.datetime_as_string(days_sorted[starts].astype('datetime64[D]')).astype(object),
+        'min_temp': reduce(np.fmin, 'temp_min'),
+        'max_temp': reduce(np.fmax, 'temp_max'),
+        'total_rain': reduce(np.add, 'rain'),
+        'peak_rain': reduce(np.fmax, 'rain'),
+        'peak_temp': reduce(np.fmax, 'temp'),
+        'low_temp': reduce(np.fmin, 'temp'),
+        'peak_wind': reduce(np.fmax, 'wind'),
+    }
+    # Alert levels: 2 = severe, 1 = elevated, 0 = none. NaN temperatures compare False and raise nothing.
+    days['rain_alert'] = (days['peak_rain'] > 2).astype(int) + (days['peak_rain'] > 7)
+    days['heat_alert'] = (days['peak_temp'] > 37).astype(int) + (days['peak_temp'] > 40)
+    days['cold_alert'] = (days['low_temp'] < 8).astype(int)
+    days['wind_alert'] = (days['peak_wind'] > 12).astype(int) + (days['peak_wind'] > 17)
+
+    group_of_row = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(order))))
+    descriptions, description_codes = np.unique(columns['description'][order], return_inverse=True)
+    pairs = np.unique(group_of_row * len(descriptions) + description_codes)
+    days['conditions'] = [[] for _ in range(len(starts))]
+    for group, code in zip((pairs // len(descriptions)).tolist(), (pairs % len(descriptions)).tolist()):
+        days['conditions'][group].append(descriptions[code])
+    return days
+
+
+def forecast_day_alerts(days, i):
+    alerts = []
+    if days['rain_alert'][i] == 2: alerts.append((WeatherAlert.HEAVY_RAIN, round(float(days['peak_rain'][i]), 1)))
+    elif days['rain_alert'][i] == 1: alerts.append((WeatherAlert.MODERATE_RAIN, round(float(days['peak_rain'][i]), 1)))
+    if days['heat_alert'][i] == 2: alerts.append((WeatherAlert.VERY_HIGH_TEMP, int(round(days['peak_temp'][i]))))
+    elif days['heat_alert'][i] == 1: alerts.append((WeatherAlert.HIGH_TEMP, int(round(days['peak_temp'][i]))))
+    if days['cold_alert'][i]: alerts.append((WeatherAlert.LOW_TEMP, int(round(days['low_temp'][i]))))
+    if days['wind_alert'][i] == 2: alerts.append((WeatherAlert.VERY_STRONG_WIND, int(round(days['peak_wind'][i] * 3.6))))
+    elif days['wind_alert'][i] == 1: alerts.append((WeatherAlert.STRONG_WIND, int(round(days['peak_wind'][i] * 3.6))))
+    return alerts
+
+
+class WeatherAlert(str, Enum):
+    HEAVY_RAIN = "heavy_rain"
+    MODERATE_RAIN = "moderate_rain"
+    VERY_HIGH_TEMP = "very_high_temp"
+    HIGH_TEMP = "high_temp"
+    LOW_TEMP = "low_temp"
+    VERY_STRONG_WIND = "very_strong_wind"
+    STRONG_WIND = "strong_wind"
+
+
+@dataclass(frozen=True, slots=True)
+class ForecastDay:
+    date: datetime.date
+    min_temp: float
+    max_temp: float
+    total_rain: float
+    conditions: tuple
+    # (WeatherAlert, value) pairs; values in display units (mm per 3 h, °C, km/h).
+    alerts: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Forecast:
+    location: str
+    days: tuple
+
+    def to_dict(self):
+        return {
+            'location': self.location,
+            'days': [
+                {
+                    'date': day.date.isoformat(), 'min_temp': day.min_temp, 'max_temp': day.max_temp, 'total_rain': day.total_rain,
+                    'conditions': list(day.conditions), 'alerts': [[WeatherAlert(alert).value, value] for alert, value in day.alerts],
+                }
+                for day in self.days
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        days = tuple(
+            ForecastDay(
+                date=datetime.date.fromisoformat(day['date']), min_temp=day['min_temp'], max_temp=day['max_temp'], total_rain=day['total_rain'],
+                conditions=tuple(day['conditions']), alerts=tuple((WeatherAlert(alert), value) for alert, value in day['alerts']),
+            )
+            for day in data['days']
+        )
+        return cls(location=data['location'], days=days)
+
+
+def _forecast_conditions(conditions):
+    conditions = list(conditions)
+    if 'Light rain' in conditions and 'Rain' in conditions: conditions.remove('Light rain')
+    if 'Few clouds' in conditions and ('Scattered clouds' in conditions or 'Broken clouds' in conditions or 'Overcast clouds' in conditions): conditions.remove('Few clouds')
+    return tuple(conditions)
+
+
+def build_forecasts(payloads):
+    payloads = [payloads] if isinstance(payloads, dict) else list(payloads)
+    days = aggregate_forecast_days(payloads)
+    per_payload = [[] for _ in payloads]
+    for i, date_str in enumerate(days['day']):
+        per_payload[int(days['payload'][i])].append(ForecastDay(
+            date=datetime.date.fromisoformat(date_str),
+            min_temp=float(days['min_temp'][i]),
+            max_temp=float(days['max_temp'][i]),
+            total_rain=float(days['total_rain'][i]),
+            conditions=_forecast_conditions(days['conditions'][i]),
+            alerts=tuple(forecast_day_alerts(days, i)),
+        ))
+    return [
+        Forecast(location=(payload.get('city') or {}).get('name'), days=tuple(forecast_days))
+        for payload, forecast_days in zip(payloads, per_payload)
+    ]
+
+
+def parse_forecast(payload):
+    return build_forecasts([payload])[0]
+
+
+def _parsed_forecast(cell, fetched_at, data):
+    # Parsed once per fetched payload; every language renders from the same object.
+    cache = _weather_cache()
+    with cache['lock']:
+        entry = cache['parsed'].get(cell)
+        if entry is not None and entry[0] == fetched_at:
+            cache['parsed'].move_to_end(cell)
+            return entry[1]
+    forecast = parse_forecast(data)
+    with cache['lock']:
+        cache['parsed'][cell] = (fetched_at, forecast)
+        cache['parsed'].move_to_end(cell)
+        while len(cache['parsed']) > WEATHER_CACHE_MAX_ENTRIES:
+            cache['parsed'].popitem(last=False)
+    return forecast
+
+
+def render_forecast(forecast, language, today=None, max_days=5):
+    today = today or datetime.date.today()
+    tomorrow = today + datetime.timedelta(days=1)
+    lines = []
+    for day in forecast.days:
+        if len(lines) >= max_days:
+            break
+        if day.date < today:
+            continue
+        if day.date == today: day_label = translate_for(language, "label_today", default="Today")
+        elif day.date == tomorrow: day_label = translate_for(language, "label_tomorrow", default="Tomorrow")
+        else: day_label = translate_for(language, "day_label_" + day.date.strftime("%a").lower(), default=day.date.strftime("%a"))
+
+        conditions_str = ", ".join(day.conditions) if day.conditions else translate_for(language, "conditions_unclear")
+        rain_str = translate_for(language, "weather_rain_display", value=day.total_rain) if day.total_rain > 0.1 else ""
+        alerts_str = ""
+        if day.alerts:
+            alerts_joined = ", ".join(translate_for(language, "weather_alert_" + WeatherAlert(alert).value, value=value) for alert, value in day.alerts)
+            alerts_str = translate_for(language, "weather_alerts_display", alerts_joined=alerts_joined)
+
+        lines.append((
+            f"{day_label} ({day.date.strftime('%d %b')}): "
+            f"Temp {day.min_temp:.0f}°C / {day.max_temp:.0f}°C, "
+            f"{conditions_str}"
+            f"{rain_str}"
+            f"{alerts_str}"
+        ).strip().replace("  ", " "))
+    return lines
+
+
+def get_weather_forecast(latitude, longitude, api_key, priority=None):
     try:
         lat_f = float(latitude)
         lon_f = float(longitude)
@@ -932,141 +3097,83 @@ def get_weather_forecast(latitude, longitude, api_key):
         logger.warning("Weather API Key not provided for forecast.")
         return {"status": "error", "message": ui_translator("weather_data_error", message="Weather API Key is missing in the configuration.")}
 
+    cell, cell_lat, cell_lon = weather_cache_cell(lat_f, lon_f)
     params = {
-        'lat': lat_f,
-        'lon': lon_f,
+        'lat': cell_lat,
+        'lon': cell_lon,
         'appid': api_key,
         'units': 'metric',
         'cnt': 40
     }
 
     try:
-        response = requests.get(WEATHER_API_URL, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        logger.info(f"Weather data fetched successfully for {lat_f:.2f},{lon_f:.2f}.")
-
-        daily_forecasts = defaultdict(lambda: {
-            'min_temp': float('inf'),
-            'max_temp': float('-inf'),
-            'conditions': set(),
-            'total_rain': 0.0,
-            'alerts': set(),
-            'raw_temps': [], 'raw_humidities': [], 'raw_windspeeds': []
-        })
-
-        if 'list' not in data or not isinstance(data['list'], list):
+        fresh = get_cached_forecast_data(cell)
+        served_stale = False
+        if fresh is not None:
+            data, fetched_at = fresh
+            logger.info(f"Weather forecast for {lat_f:.2f},{lon_f:.2f} served from cache (cell {cell}).")
+        else:
+            stale = get_stale_forecast_data(cell)
+            wait_s = _weather_circuit_wait_s(_weather_http())
+            if wait_s and stale is None:
+                logger.warning(f"Weather circuit open; skipping API call for cell {cell} ({wait_s:.0f}s until retry).")
+                message = ui_translator("weather_error_circuit_open", seconds=math.ceil(wait_s))
+                return {"status": "error", "message": ui_translator("weather_data_error", message=message)}
+            if wait_s:
+                (data, fetched_at), served_stale = stale, True
+                logger.warning(f"Weather circuit open; serving cell {cell} from the forecast fetched at {datetime.datetime.fromtimestamp(fetched_at):%H:%M}.")
+            else:
+                # A farmer who can already be shown the last forecast does not need to jump the quota queue.
+                if priority is None:
+                    priority = WEATHER_PRIORITY_INTERACTIVE if stale is None else WEATHER_PRIORITY_BACKGROUND
+                refresh = _submit_weather_refresh(cell, params, priority)
+                if stale is not None:
+                    # Stale-while-revalidate: answer now and let the refresh fill the cache for the next request.
+                    refresh.add_done_callback(lambda done: _log_background_weather_refresh(cell, done))
+                    logger.info(f"Serving cell {cell} from the forecast fetched at {datetime.datetime.fromtimestamp(stale[1]):%H:%M} while it refreshes.")
+                    (data, fetched_at), served_stale = stale, True
+                else:
+                    try:
+                        data, fetched_at = refresh.result(timeout=WEATHER_LATENCY_BUDGET_S)
+                    except concurrent.futures.TimeoutError:
+                        logger.warning(f"Weather API exceeded the {WEATHER_LATENCY_BUDGET_S:.1f}s budget for cell {cell}; no earlier forecast cached.")
+                        quota_stats = weather_quota_stats()
+                        if quota_stats['waiting']:
+                            message = ui_translator("weather_error_quota", seconds=math.ceil(WEATHER_LATENCY_BUDGET_S + 60 / max(WEATHER_QUOTA_PER_MINUTE, 1e-9)))
+                        else:
+                            message = ui_translator("weather_error_timeout", seconds=WEATHER_LATENCY_BUDGET_S)
+                        return {"status": "error", "message": ui_translator("weather_data_error", message=message)}
+            if served_stale:
+                cache = _weather_cache()
+                with cache['lock']:
+                    cache['stale_served'] += 1
+
+        if not isinstance(data, dict) or not isinstance(data.get('list'), list):
             logger.error("Unexpected weather API response format: 'list' key missing or not a list.")
             return {"status": "error", "message": "Unexpected weather API response format."}
 
-        city_info = data.get('city', {})
-        location_name = city_info.get('name', f"Lat:{lat_f:.2f},Lon:{lon_f:.2f}")
-
-        for forecast_item in data['list']:
-             if not isinstance(forecast_item, dict) or 'dt' not in forecast_item or 'main' not in forecast_item or 'weather' not in forecast_item: continue
-             if not isinstance(forecast_item['weather'], list) or not forecast_item['weather']: continue
-
-             main_data = forecast_item.get('main', {})
-             weather_data = forecast_item['weather'][0]
-
-             if 'temp_min' not in main_data or 'temp_max' not in main_data or 'description' not in weather_data: continue
-
-             try:
-                 dt_object = datetime.datetime.fromtimestamp(forecast_item['dt'])
-                 date_str = dt_object.strftime("%Y-%m-%d")
-                 temp = float(main_data.get('temp', pd.NA))
-                 temp_min = float(main_data['temp_min'])
-                 temp_max = float(main_data['temp_max'])
-                 humidity = float(main_data.get('humidity', pd.NA))
-                 description_formatted = weather_data['description'].capitalize()
-                 rain_3h = float(forecast_item.get('rain', {}).get('3h', 0.0))
-                 wind_speed = float(forecast_item.get('wind', {}).get('speed', 0.0))
-
-             except (KeyError, ValueError, TypeError) as e:
-                 logger.warning(f"Skipping forecast item due to data parsing error ({e}): {forecast_item}")
-                 continue
-
-             day_data = daily_forecasts[date_str]
-             day_data['min_temp'] = min(day_data['min_temp'], temp_min)
-             day_data['max_temp'] = max(day_data['max_temp'], temp_max)
-             day_data['conditions'].add(description_formatted)
-             day_data['total_rain'] += rain_3h
-
-             if pd.notna(temp): day_data['raw_temps'].append(temp)
-             if pd.notna(humidity): day_data['raw_humidities'].append(humidity)
-             if pd.notna(wind_speed): day_data['raw_windspeeds'].append(wind_speed)
-
-             if rain_3h > 7: day_data['alerts'].add(f"Heavy rain ({rain_3h:.1f}mm/3hr)")
-             elif rain_3h > 2: day_data['alerts'].add(f"Moderate rain ({rain_3h:.1f}mm/3hr)")
-             if pd.notna(temp) and temp > 40: day_data['alerts'].add(f"Very High Temp ({temp:.0f}°C)")
-             elif pd.notna(temp) and temp > 37: day_data['alerts'].add(f"High Temp ({temp:.0f}°C)")
-             elif pd.notna(temp) and temp < 8: day_data['alerts'].add(f"Low Temp ({temp:.0f}°C)")
-             if pd.notna(wind_speed) and wind_speed > 17:
-                 day_data['alerts'].add(f"Very Strong Wind ({wind_speed * 3.6:.0f} km/h)")
-             elif pd.notna(wind_speed) and wind_speed > 12:
-                 day_data['alerts'].add(f"Strong Wind ({wind_speed * 3.6:.0f} km/h)")
-
-        processed_summary = []
-        today = datetime.date.today()
-        tomorrow = today + datetime.timedelta(days=1)
-        sorted_dates = sorted(daily_forecasts.keys())
-
-        days_added = 0
-        for date_str in sorted_dates:
-            if days_added >= 5: break
-            day_data = daily_forecasts[date_str]
-            try:
-                date_obj = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-                if date_obj < today: continue
-                day_name = date_obj.strftime("%a")
-            except ValueError:
-                continue
-
-            day_label_key = "day_label_" + day_name.lower()
-            day_label_translation = ui_translator(day_label_key, default=day_name)
-            if date_obj == today: day_label = ui_translator("label_today", default="Today")
-            elif date_obj == tomorrow: day_label = ui_translator("label_tomorrow", default="Tomorrow")
-            else: day_label = day_label_translation
-
-            conditions_list = sorted(list(day_data['conditions']))
-            if 'Light rain' in conditions_list and 'Rain' in conditions_list: conditions_list.remove('Light rain')
-            if 'Few clouds' in conditions_list and ('Scattered clouds' in conditions_list or 'Broken clouds' in conditions_list or 'Overcast clouds' in conditions_list): conditions_list.remove('Few clouds')
-            conditions_str = ", ".join(conditions_list) if conditions_list else ui_translator("conditions_unclear")
-
-            rain_str = ""
-            if day_data['total_rain'] > 0.1:
-                 rain_str = ui_translator("weather_rain_display", value=float(day_data['total_rain']))
-
-            alerts_str = ""
-            if day_data['alerts']:
-                 alerts_str = ui_translator("weather_alerts_display", alerts_joined=", ".join(sorted(list(day_data['alerts']))))
-
-            min_t_str = f"{day_data['min_temp']:.0f}" if day_data['min_temp'] != float('inf') else ui_translator("value_na")
-            max_t_str = f"{day_data['max_temp']:.0f}" if day_data['max_temp'] != float('-inf') else ui_translator("value_na")
-
-            summary_line = (
-                f"{day_label} ({date_obj.strftime('%d %b')}): "
-                f"Temp {min_t_str}°C / {max_t_str}°C, "
-                f"{conditions_str}"
-                f"{rain_str}"
-                f"{alerts_str}"
-            ).strip().replace("  ", " ")
-            processed_summary.append(summary_line)
-            days_added += 1
+        forecast = _parsed_forecast(cell, fetched_at, data)
+        location_name = forecast.location or f"Lat:{lat_f:.2f},Lon:{lon_f:.2f}"
+        processed_summary = render_forecast(forecast, current_ui_language())
 
         if not processed_summary:
             logger.warning(f"Could not generate daily forecast summary for {lat_f},{lon_f}, though API call succeeded.")
             return {"status": "error", "message": ui_translator("weather_error_summary_generation")}
 
-        return {
+        result = {
             "status": "success",
             "location": location_name,
-            "daily_summary": processed_summary
+            "daily_summary": processed_summary,
+            "forecast": forecast,
         }
+        if served_stale:
+            result["stale_age_s"] = max(0.0, time.time() - fetched_at)
+            result["age_label"] = weather_age_label(result["stale_age_s"])
+        return result
 
     except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else None
-        error_text = e.response.text if e.response else "No response body"
+        status_code = e.response.status_code if e.response is not None else None
+        error_text = e.response.text if e.response is not None else "No response body"
         logger.error(f"HTTP error fetching weather: {status_code} - {error_text}", exc_info=False)
         if status_code == 401: message_key = "weather_error_401"
         elif status_code == 404: message_key = "weather_error_404"
@@ -1079,6 +3186,10 @@ def get_weather_forecast(latitude, longitude, api_key):
         logger.error(f"Network error fetching weather: {e}", exc_info=True)
         message = ui_translator("weather_error_network")
         return {"status": "error", "message": ui_translator("weather_data_error", message=message)}
+    except WeatherQuotaExceeded as e:
+        logger.warning(f"Weather fetch for cell {cell} throttled: {e}")
+        message = ui_translator("weather_error_quota", seconds=math.ceil(e.retry_after_s))
+        return {"status": "error", "message": ui_translator("weather_data_error", message=message)}
     except Exception as e:
         logger.error(f"Unexpected error processing weather data: {e}", exc_info=True)
         message = ui_translator("weather_error_unexpected", error=str(e))
@@ -1147,111 +3258,270 @@ Synthesize all this information to answer the farmer's MOST RECENT query.
         return err_msg
 
 
+INTENT_KEYWORDS = [
+    ('weather', ["weather", "forecast", "mausam", "मौसम", "வானிலை", "আবহাওয়া", "వాతావరణం", "हवामान", "rain", "temperature", "barish", "tapman", "humidity", "wind"]),
+    ('crop', ["crop recommend", "suggest crop", "kya ugana", "फसल सुझा", "பயிர்களைப் பரிந்துரை", "ফসল সুপারিশ", "పంటలను సూచిం", "पिके सुचवा", "grow next", "suitable crop", "कौन सी फसल", "எந்தப் பயிர்", "plant next"]),
+    ('market', ["market price", "mandi rate", "bazaar price", "बाजार भाव", "சந்தை விலை", "বাজার দর", "మార్కెట్ ధర", "बाजार भाव", "what price", "selling price", "bhav", "kimat"]),
+    ('health', ["disease", "pest", "infection", "sick plant", "plant health", "रोग", "कीट", "நோய்", "রোগ", "తెగులు", "कीड", "problem with plant", "issue with crop"]),
+]
+
+
+def detect_query_intent(query):
+    query_lower = str(query).strip().lower()
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(keyword in query_lower for keyword in keywords):
+            return intent
+    return 'general'
+
+
+def current_season(now=None):
+    now = now or datetime.datetime.now()
+    return "Kharif" if 6 <= now.month <= 10 else "Rabi"
+
+
+def detect_market_crop(query_lower):
+    for crop, keywords in MARKET_CROP_KEYWORDS:
+        if any(keyword in query_lower for keyword in keywords):
+            return crop
+    return MARKET_DEFAULT_CROP
+
+
+def weather_context_lines(weather_info, location_desc, language):
+    lines = [translate_for(language, 'intent_weather')]
+    loc_name_weather = location_desc if weather_info.get('location', None) is None else weather_info.get('location', location_desc)
+    lines.append(translate_for(language, 'context_header_weather', location=loc_name_weather))
+    if weather_info.get('status') == 'success':
+        forecast = weather_info.get('forecast')
+        summary_list = render_forecast(forecast, language) if forecast is not None else weather_info.get('daily_summary', [])
+        if 'stale_age_s' in weather_info:
+            lines.append(weather_age_label(weather_info['stale_age_s'], language))
+        if summary_list:
+            lines.extend([f"- {s}" for s in summary_list])
+        else:
+            lines.append(f"- {translate_for(language, 'weather_error_summary_generation')}")
+    else:
+        error_msg_weather = weather_info.get('message', translate_for(language, 'weather_error_unknown'))
+        lines.append(translate_for(language, 'context_weather_unavailable', error_msg=error_msg_weather))
+    lines.append(translate_for(language, 'context_footer_weather'))
+    lines.append("")
+    return lines
+
+
+def crop_context_lines(soil, region, season, language):
+    avg_temp = random.uniform(20, 35)
+    avg_rainfall = random.uniform(400, 800)
+    suggested_crops = predict_suitable_crops(soil, region, avg_temp, avg_rainfall, season)
+
+    lines = [translate_for(language, 'intent_crop'), translate_for(language, 'context_header_crop')]
+    lines.append(translate_for(language, 'context_factors_crop', soil=soil, season=season))
+    crops_str = ', '.join(suggested_crops) if suggested_crops else translate_for(language, "no_crops_recommendation")
+    lines.append(translate_for(language, 'context_crop_ideas', crops=crops_str))
+    lines.append(translate_for(language, 'context_footer_crop'))
+    lines.append("")
+    return lines
+
+
+def market_context_lines(crop, language, market=MARKET_DEFAULT_NAME):
+    forecast = forecast_market_price(crop, market)
+    prices = forecast.get('predicted_prices_per_quintal', [])
+    price_start = float(prices[0]) if prices else 0.0
+    price_end = float(prices[-1]) if prices else 0.0
+
+    lines = [translate_for(language, 'intent_market')]
+    lines.append(translate_for(language, 'context_header_market', crop=forecast.get('crop', crop), market=forecast.get('market', market)))
+    lines.append(
+        translate_for(
+            language,
+            'context_data_market',
+            days=forecast.get('forecast_days', 0),
+            price_start=price_start,
+            price_end=price_end,
+            trend=forecast.get('trend_suggestion', translate_for(language, "value_na"))
+        )
+    )
+    lines.append(translate_for(language, 'context_footer_market'))
+    lines.append("")
+    return lines
+
+
+@st.cache_resource(show_spinner=False)
+def _context_bundle_store():
+    return {'lock': threading.Lock(), 'entries': OrderedDict(), 'local': threading.local(), 'hits': 0, 'misses': 0}
+
+
+def context_bundle_key(latitude, longitude, soil, season, language):
+    # Everything in a bundle is shared by farmers in the same weather cell with the same soil, season and language.
+    return weather_cache_cell(latitude, longitude)[0], str(soil).strip().casefold(), season, language
+
+
+def _get_context_bundle_conn(store):
+    conn = getattr(store['local'], 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(CONTEXT_BUNDLE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS context_bundles "
+            "(cell TEXT NOT NULL, soil TEXT NOT NULL, season TEXT NOT NULL, language TEXT NOT NULL, "
+            "built_at REAL NOT NULL, sections TEXT NOT NULL, PRIMARY KEY (cell, soil, season, language))"
+        )
+        store['local'].conn = conn
+    return conn
+
+
+def _remember_context_bundle(store, key, sections):
+    valid_until = min((section['expires_at'] for section in sections.values()), default=0.0)
+    with store['lock']:
+        store['entries'][key] = (valid_until, sections)
+        store['entries'].move_to_end(key)
+        while len(store['entries']) > CONTEXT_BUNDLE_MAX_ENTRIES:
+            store['entries'].popitem(last=False)
+
+
+def store_context_bundle(key, sections):
+    store = _context_bundle_store()
+    try:
+        conn = _get_context_bundle_conn(store)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO context_bundles (cell, soil, season, language, built_at, sections) VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, time.time(), json.dumps(sections, ensure_ascii=False, separators=(',', ':'))),
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Could not write context bundle {key} to {CONTEXT_BUNDLE_PATH}: {e}")
+        return False
+    _remember_context_bundle(store, key, sections)
+    return True
+
+
+def get_context_bundle(key):
+    store = _context_bundle_store()
+    with store['lock']:
+        entry = store['entries'].get(key)
+        if entry is not None and entry[0] > time.time():
+            store['entries'].move_to_end(key)
+            store['hits'] += 1
+            return entry[1]
+
+    # Not in memory, or a section has expired since it was loaded: the scheduled job may have written a newer bundle.
+    sections = None
+    if os.path.exists(CONTEXT_BUNDLE_PATH):
+        try:
+            row = _get_context_bundle_conn(store).execute(
+                "SELECT sections FROM context_bundles WHERE cell = ? AND soil = ? AND season = ? AND language = ?", key
+            ).fetchone()
+            sections = json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Context bundle store {CONTEXT_BUNDLE_PATH} unreadable for {key}: {e}")
+    if sections is None:
+        with store['lock']:
+            store['misses'] += 1
+        return None
+    _remember_context_bundle(store, key, sections)
+    with store['lock']:
+        store['hits'] += 1
+    return sections
+
+
+def context_bundle_section(bundle, name, now=None):
+    section = bundle.get(name) if bundle else None
+    if section is None or section['expires_at'] <= (time.time() if now is None else now):
+        return None
+    return section.get('data')
+
+
+def build_context_bundle(latitude, longitude, soil, season, language, weather_api_key):
+    now = time.time()
+    expires_at = now + CONTEXT_BUNDLE_TTL_S
+    _, cell_lat, cell_lon = weather_cache_cell(latitude, longitude)
+    sections = {
+        # predict_suitable_crops only logs the region, so crop lines depend on soil and season alone and are shared across the cell.
+        'crop': {'expires_at': expires_at, 'data': crop_context_lines(soil, None, season, language)},
+        'market': {'expires_at': expires_at, 'data': {crop: market_context_lines(crop, language) for crop in MARKET_CROPS}},
+    }
+    # Only a fresh forecast is worth sharing; errors and stale fallbacks are left to the live path.
+    if weather_api_key:
+        weather_info = get_weather_forecast(cell_lat, cell_lon, weather_api_key, priority=WEATHER_PRIORITY_BACKGROUND)
+        if weather_info.get('status') == 'success' and 'stale_age_s' not in weather_info:
+            # Stored language-neutral and rendered per request, so "Today"/"Tomorrow" follow the request's date, not the build's.
+            sections['weather'] = {'expires_at': next_forecast_refresh(now), 'data': weather_info['forecast'].to_dict()}
+    return sections
+
+
+def context_bundle_stats():
+    store = _context_bundle_store()
+    with store['lock']:
+        stats = {'hits': store['hits'], 'misses': store['misses'], 'memory_entries': len(store['entries'])}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
 def process_farmer_request(farmer_profile, current_query, chat_history, llm, weather_api_key, output_language):
     static_context_lines = []
 
-    if not farmer_profile or not isinstance(farmer_profile, dict) or not str(farmer_profile.get('name','')).strip():
+    if not farmer_profile or not str(getattr(farmer_profile, 'name', '')).strip():
         logger.error("process_farmer_request called with invalid farmer_profile.")
         return { "status": "error", "farmer_name": ui_translator("unknown_farmer"), "response_text": ui_translator("system_error_label") + ": Internal error - Farmer profile data missing.", "debug_internal_prompt": "" }
 
-    farmer_name = str(farmer_profile['name']).strip()
+    farmer_name = farmer_profile.name
     query_clean = str(current_query).strip()
     query_lower = query_clean.lower()
     logger.info(f"Processing query for farmer '{farmer_name}': '{query_clean}' | Output Lang: {output_language}")
 
-    lat = farmer_profile.get('latitude', PROFILE_DEFAULT_LAT)
-    lon = farmer_profile.get('longitude', PROFILE_DEFAULT_LON)
-    soil = farmer_profile.get('soil_type', 'Unknown')
-    farm_size = farmer_profile.get('farm_size_ha', 1.0)
+    lat_f, lon_f = farmer_profile.latitude, farmer_profile.longitude
+    soil = farmer_profile.soil_type
+    farm_size = farmer_profile.farm_size_ha
 
-    try: lat_f = float(lat); lon_f = float(lon)
-    except (ValueError, TypeError): lat_f, lon_f = PROFILE_DEFAULT_LAT, PROFILE_DEFAULT_LON
-
-    if lat_f != 0.0 or lon_f != 0.0:
+    if farmer_profile.has_location:
         location_desc = ui_translator('location_set_description', lat=lat_f, lon=lon_f)
     else:
         location_desc = ui_translator('location_not_set_description')
 
     size_str = ui_translator("not_set_label")
-    if isinstance(farm_size, (int, float)) and pd.notna(farm_size) and farm_size > 0:
+    if farm_size > 0:
         size_str = f"{farm_size:.2f} Ha"
 
     static_context_lines.append(ui_translator('farmer_context_data', name=farmer_name, location_description=location_desc, soil=soil, size=size_str))
     static_context_lines.append("")
 
-    intent_identified = False
-    crop_keywords = ["crop recommend", "suggest crop", "kya ugana", "फसल सुझा", "பயிர்களைப் பரிந்துரை", "ফসল সুপারিশ", "పంటలను సూచిం", "पिके सुचवा", "grow next", "suitable crop", "कौन सी फसल", "எந்தப் பயிர்", "plant next"]
-    market_keywords = ["market price", "mandi rate", "bazaar price", "बाजार भाव", "சந்தை விலை", "বাজার দর", "మార్కెట్ ధర", "बाजार भाव", "what price", "selling price", "bhav", "kimat"]
-    weather_keywords = ["weather", "forecast", "mausam", "मौसम", "வானிலை", "আবহাওয়া", "వాతావరణం", "हवामान", "rain", "temperature", "barish", "tapman", "humidity", "wind"]
-    health_keywords = ["disease", "pest", "infection", "sick plant", "plant health", "रोग", "कीट", "நோய்", "রোগ", "తెగులు", "कीड", "problem with plant", "issue with crop"]
+    intent = detect_query_intent(query_clean)
+    language = current_ui_language()
+    bundle = None
+    if intent in ('weather', 'crop', 'market') and farmer_profile.has_location:
+        bundle = get_context_bundle(context_bundle_key(lat_f, lon_f, soil, current_season(), language))
 
-    if any(keyword in query_lower for keyword in weather_keywords):
-        intent_identified = True
+    if intent == 'weather':
         logger.info("Intent Detected: Weather Forecast & Implications")
-        static_context_lines.append(ui_translator('intent_weather'))
-        weather_info = get_weather_forecast(lat_f, lon_f, weather_api_key)
-        loc_name_weather = location_desc if weather_info.get('location', None) is None else weather_info.get('location', location_desc)
-        static_context_lines.append(ui_translator('context_header_weather', location=loc_name_weather))
-        if weather_info.get('status') == 'success':
-            summary_list = weather_info.get('daily_summary', [])
-            if summary_list:
-                static_context_lines.extend([f"- {s}" for s in summary_list])
-            else:
-                static_context_lines.append(f"- {ui_translator('weather_error_summary_generation')}")
+        forecast_data = context_bundle_section(bundle, 'weather')
+        forecast = Forecast.from_dict(forecast_data) if forecast_data is not None else None
+        if forecast is not None and any(day.date >= datetime.date.today() for day in forecast.days):
+            logger.info("Weather context served from a precomputed bundle.")
+            weather_info = {'status': 'success', 'location': forecast.location, 'forecast': forecast}
         else:
-            error_msg_weather = weather_info.get('message', ui_translator('weather_error_unknown'))
-            static_context_lines.append(ui_translator('context_weather_unavailable', error_msg=error_msg_weather))
-        static_context_lines.append(ui_translator('context_footer_weather'))
-        static_context_lines.append("")
+            weather_info = get_weather_forecast(lat_f, lon_f, weather_api_key)
+        static_context_lines.extend(weather_context_lines(weather_info, location_desc, language))
 
-    elif any(keyword in query_lower for keyword in crop_keywords):
-        intent_identified = True
+    elif intent == 'crop':
         logger.info("Intent Detected: Crop Recommendation")
-        static_context_lines.append(ui_translator('intent_crop'))
-        region = location_desc
-        avg_temp = random.uniform(20, 35)
-        avg_rainfall = random.uniform(400, 800)
-        season = "Kharif" if 6 <= datetime.datetime.now().month <= 10 else "Rabi"
-        suggested_crops = predict_suitable_crops(soil, region, avg_temp, avg_rainfall, season)
-
-        static_context_lines.append(ui_translator('context_header_crop'))
-        static_context_lines.append(ui_translator('context_factors_crop', soil=soil, season=season))
-        crops_str = ', '.join(suggested_crops) if suggested_crops else ui_translator("no_crops_recommendation")
-        static_context_lines.append(ui_translator('context_crop_ideas', crops=crops_str))
-        static_context_lines.append(ui_translator('context_footer_crop'))
-        static_context_lines.append("")
+        section_lines = context_bundle_section(bundle, 'crop')
+        if section_lines is None:
+            section_lines = crop_context_lines(soil, location_desc, current_season(), language)
+        else:
+            logger.info("Crop context served from a precomputed bundle.")
+        static_context_lines.extend(section_lines)
 
-    elif any(keyword in query_lower for keyword in market_keywords):
-        intent_identified = True
+    elif intent == 'market':
         logger.info("Intent Detected: Market Price")
-        static_context_lines.append(ui_translator('intent_market'))
-        crop = "Wheat"
-        if any(c in query_lower for c in ["rice", "chawal", "धान", "चावल", "அரிசி", "চাল", "బియ్యం", "तांदूळ"]): crop = "Rice"
-        elif any(c in query_lower for c in ["maize", "makka", "मक्का", "சோளம்", "ভুট্টা", "మొక్కజొన్న", "मका"]): crop = "Maize"
-        elif any(c in query_lower for c in ["cotton", "kapas", "कपास", "பருத்தி", "তুলা", "పత్తి", "कापूस"]): crop = "Cotton"
-        elif any(c in query_lower for c in ["tomato", "tamatar", "टमाटर", "தக்காளி", "টমেটো", "టమోటా", "टोमॅटो"]): crop = "Tomato"
-
-        market = "Nearby Mandi"
-        forecast = forecast_market_price(crop, market)
-        prices = forecast.get('predicted_prices_per_quintal', [])
-        price_start = float(prices[0]) if prices else 0.0
-        price_end = float(prices[-1]) if prices else 0.0
-
-        static_context_lines.append(ui_translator('context_header_market', crop=forecast.get('crop',crop), market=forecast.get('market',market)))
-        static_context_lines.append(
-            ui_translator(
-                'context_data_market',
-                days=forecast.get('forecast_days', 0),
-                price_start=price_start,
-                price_end=price_end,
-                trend=forecast.get('trend_suggestion', ui_translator("value_na"))
-            )
-        )
-        static_context_lines.append(ui_translator('context_footer_market'))
-        static_context_lines.append("")
+        crop = detect_market_crop(query_lower)
+        section_lines = (context_bundle_section(bundle, 'market') or {}).get(crop)
+        if section_lines is None:
+            section_lines = market_context_lines(crop, language)
+        else:
+            logger.info(f"Market context for {crop} served from a precomputed bundle.")
+        static_context_lines.extend(section_lines)
 
-    elif any(keyword in query_lower for keyword in health_keywords):
-         intent_identified = True
+    elif intent == 'health':
          logger.info("Intent Detected: Plant Health (Placeholder)")
          static_context_lines.append(ui_translator('intent_health'))
          detection = predict_disease_from_image_placeholder()
@@ -1269,7 +3539,7 @@ def process_farmer_request(farmer_profile, current_query, chat_history, llm, wea
          static_context_lines.append(ui_translator('context_footer_health'))
          static_context_lines.append("")
 
-    if not intent_identified:
+    if intent == 'general':
         logger.info("Intent Detected: General Question")
         static_context_lines.append(ui_translator('intent_general'))
         static_context_lines.append(ui_translator('context_header_general'))
@@ -1353,17 +3623,11 @@ def handle_map_interaction_reference(map_key="folium_map_reference", center=None
             except (ValueError, TypeError): logger.warning(f"Invalid reference coords in session: {ref_coords}")
 
     current_profile = st.session_state.get('current_farmer_profile')
-    if current_profile:
-        prof_lat = current_profile.get('latitude', PROFILE_DEFAULT_LAT)
-        prof_lon = current_profile.get('longitude', PROFILE_DEFAULT_LON)
-        if prof_lat != PROFILE_DEFAULT_LAT or prof_lon != PROFILE_DEFAULT_LON:
-             try:
-                 prof_lat_f = float(prof_lat); prof_lon_f = float(prof_lon)
-                 folium.Marker(
-                     [prof_lat_f, prof_lon_f], popup=f"Current: {prof_lat_f:.6f}, {prof_lon_f:.6f}",
-                     tooltip=ui_translator('active_profile_loc'), icon=folium.Icon(color='blue', icon='home')
-                 ).add_to(m)
-             except (ValueError, TypeError): logger.warning(f"Invalid profile coords for map marker: lat={prof_lat}, lon={prof_lon}")
+    if current_profile and current_profile.has_location:
+        folium.Marker(
+            [current_profile.latitude, current_profile.longitude], popup=f"Current: {current_profile.latitude:.6f}, {current_profile.longitude:.6f}",
+            tooltip=ui_translator('active_profile_loc'), icon=folium.Icon(color='blue', icon='home')
+        ).add_to(m)
 
     map_data = st_folium(
         m, center=map_center_to_use, zoom=map_zoom_to_use,
@@ -1412,64 +3676,127 @@ def handle_map_interaction_reference(map_key="folium_map_reference", center=None
             st.caption(ui_translator("map_click_prompt_message"))
 
 
+def _load_more_history(pages_key):
+    st.session_state.history_pages_shown[pages_key] = st.session_state.history_pages_shown.get(pages_key, 1) + 1
+
+
+def _render_log_entries(page_df):
+    for row in page_df.itertuples(index=False):
+        ts_dt = pd.to_datetime(row.timestamp, errors='coerce')
+        ts = ts_dt.strftime("%Y-%m-%d %H:%M") if pd.notna(ts_dt) else ui_translator("invalid_date_label")
+        st.markdown(
+            ui_translator("log_entry_display", timestamp=ts, query=str(row.query), lang=str(row.language), response=str(row.response)),
+            unsafe_allow_html=True
+        )
+
+
+def _read_qa_log_segments(segment_paths, **read_kwargs):
+    frames = [pd.read_csv(path, encoding='utf-8', keep_default_na=False, **read_kwargs) for path in segment_paths]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=QA_LOG_COLUMNS)
+
+
+def _scan_farmer_log(farmer_name, qa_log_file, start_date, end_date):
+    segment_paths = [path for _, path in qa_log_segments(start_date, end_date)]
+    try:
+        log_df = _read_qa_log_segments(segment_paths, low_memory=False)
+    except pd.errors.ParserError as parse_err:
+         logger.error(f"Parsing error in {qa_log_file}: {parse_err}. Trying recovery.")
+         st.warning(f"Warning: Could not parse parts of the QA log file ({parse_err}). Displaying available entries.")
+         try:
+             log_df = _read_qa_log_segments(segment_paths, on_bad_lines='warn')
+         except Exception as read_err_fallback:
+              logger.error(f"Fallback reading failed for {qa_log_file}: {read_err_fallback}")
+              st.error(ui_translator("error_displaying_logs", error=f"Could not parse log file: {read_err_fallback}"))
+              return None
+    except pd.errors.EmptyDataError:
+         raise
+    except Exception as read_err:
+         logger.error(f"Error reading QA log file {qa_log_file}: {read_err}", exc_info=True)
+         st.error(ui_translator("error_displaying_logs", error=str(read_err)))
+         return None
+
+    required_cols = ['timestamp', 'farmer_name', 'language', 'query', 'response']
+    missing_cols = [col for col in required_cols if col not in log_df.columns]
+    if missing_cols:
+         logger.error(f"Past interactions log {qa_log_file} missing columns: {missing_cols}")
+         st.error(ui_translator("log_file_corrupt_columns", path=qa_log_file, cols=", ".join(missing_cols)))
+         return None
+
+    farmer_log = log_df[_farmer_name_keys(log_df['farmer_name'].astype(str)) == farmer_name_key(farmer_name)]
+    day = farmer_log['timestamp'].astype(str).str[:10]
+    if start_date is not None:
+        farmer_log = farmer_log[day >= start_date.isoformat()]
+    if end_date is not None:
+        farmer_log = farmer_log[day <= end_date.isoformat()]
+    return farmer_log.iloc[::-1].sort_values(by='timestamp', ascending=False, kind='stable')
+
+
 def display_past_interactions(farmer_name):
     st.header(ui_translator("past_interactions_header", name=farmer_name))
-    qa_log_file = QA_LOG_PATH
-    if not os.path.exists(qa_log_file):
+    qa_log_file = QA_LOG_DIR
+    # Only wait on the writer when this session has rows it may not have written yet.
+    if qa_log_pending(st.session_state.get('qa_log_queued', 0)):
+        flush_qa_log()
+    if not qa_log_segments():
         st.info(ui_translator("no_past_interactions"))
         return
 
+    date_range = st.date_input(ui_translator("history_date_range_label"), value=(), key="history_date_range")
+    start_date = date_range[0] if len(date_range) > 0 else None
+    end_date = date_range[1] if len(date_range) > 1 else None
+    search_query = st.text_input(ui_translator("history_search_label"), key="history_search").strip()
+
     try:
-        try:
-            log_df = pd.read_csv(qa_log_file, encoding='utf-8', keep_default_na=False, low_memory=False)
-        except pd.errors.ParserError as parse_err:
-             logger.error(f"Parsing error in {qa_log_file}: {parse_err}. Trying recovery.")
-             st.warning(f"Warning: Could not parse parts of the QA log file ({parse_err}). Displaying available entries.")
-             try:
-                 log_df = pd.read_csv(qa_log_file, encoding='utf-8', keep_default_na=False, on_bad_lines='warn')
-             except Exception as read_err_fallback:
-                  logger.error(f"Fallback reading failed for {qa_log_file}: {read_err_fallback}")
-                  st.error(ui_translator("error_displaying_logs", error=f"Could not parse log file: {read_err_fallback}"))
-                  return
-        except Exception as read_err:
-             logger.error(f"Error reading QA log file {qa_log_file}: {read_err}", exc_info=True)
-             st.error(ui_translator("error_displaying_logs", error=str(read_err)))
-             return
-
-        required_cols = ['timestamp', 'farmer_name', 'language', 'query', 'response']
-        missing_cols = [col for col in required_cols if col not in log_df.columns]
-        if missing_cols:
-             logger.error(f"Past interactions log {qa_log_file} missing columns: {missing_cols}")
-             st.error(ui_translator("log_file_corrupt_columns", path=qa_log_file, cols=", ".join(missing_cols)))
-             return
-
-        log_df['timestamp'] = pd.to_datetime(log_df['timestamp'], errors='coerce')
-
-        if log_df.empty:
-            st.info(ui_translator("no_past_interactions"))
+        if search_query:
+            hits = search_farmer_history(farmer_name, search_query, start_date=start_date, end_date=end_date)
+            st.markdown("---")
+            if not hits:
+                st.info(ui_translator("history_search_no_results", query=search_query))
+                return
+            st.caption(ui_translator("history_search_results", count=len(hits)))
+            _render_log_entries(read_qa_log_entries([entry for entry, _ in hits]))
             return
 
-        farmer_log = log_df[
-            log_df['farmer_name'].fillna('').astype(str).str.strip().str.lower() == str(farmer_name).strip().lower()
-        ].sort_values(by='timestamp', ascending=False, na_position='last')
-
-        if farmer_log.empty:
+        try:
+            entries = farmer_log_entries(farmer_name, start_date, end_date)
+            farmer_log = None
+        except (OSError, ValueError, csv.Error) as index_err:
+            logger.warning(f"Q&A log index unavailable ({index_err}); scanning all of {qa_log_file}.")
+            entries = None
+            farmer_log = _scan_farmer_log(farmer_name, qa_log_file, start_date, end_date)
+            if farmer_log is None:
+                return
+
+        total = len(entries) if entries is not None else len(farmer_log)
+        if total == 0:
             st.info(ui_translator("no_past_interactions"))
             return
 
-        st.markdown("---")
+        # Pages are cached per session; a new interaction (or filter change) shifts page boundaries, so it resets the cache.
+        pages_key = (farmer_name_key(farmer_name), start_date, end_date)
+        if 'history_pages_shown' not in st.session_state:
+            st.session_state.history_pages_shown = {}
+        cache = st.session_state.get('history_page_cache')
+        if not cache or cache['key'] != pages_key + (total,):
+            cache = {'key': pages_key + (total,), 'pages': {}}
+            st.session_state.history_page_cache = cache
+        pages_shown = st.session_state.history_pages_shown.get(pages_key, 1)
 
-        for _, row in farmer_log.iterrows():
-            ts_dt = row.get('timestamp')
-            ts = ts_dt.strftime("%Y-%m-%d %H:%M") if pd.notna(ts_dt) else ui_translator("invalid_date_label")
-            q = str(row.get('query', ''))
-            a = str(row.get('response', ''))
-            l = str(row.get('language', ui_translator('value_na')))
+        st.markdown("---")
+        for page in range(pages_shown):
+            page_slice = slice(page * HISTORY_PAGE_SIZE, (page + 1) * HISTORY_PAGE_SIZE)
+            if page_slice.start >= total:
+                break
+            page_df = cache['pages'].get(page)
+            if page_df is None:
+                page_df = read_qa_log_entries(entries[page_slice]) if entries is not None else farmer_log.iloc[page_slice]
+                cache['pages'][page] = page_df
+            _render_log_entries(page_df)
 
-            st.markdown(
-                ui_translator("log_entry_display", timestamp=ts, query=q, lang=l, response=a),
-                unsafe_allow_html=True
-            )
+        shown = min(total, pages_shown * HISTORY_PAGE_SIZE)
+        st.caption(ui_translator("history_showing_count", shown=shown, total=total))
+        if shown < total:
+            st.button(ui_translator("history_load_more_button"), key="history_load_more", on_click=_load_more_history, args=(pages_key,))
 
     except FileNotFoundError:
          logger.info(f"QA log file {qa_log_file} not found while trying to display interactions.")
@@ -1538,6 +3865,10 @@ def main():
         st.session_state.chat_history = []
         logger.info("Chat history cleared.")
 
+    def use_name_suggestion(suggested_name):
+        st.session_state.widget_farmer_name_input = suggested_name
+        st.session_state._name_suggestion_applied = True
+
     with st.sidebar:
         st.header(ui_translator("sidebar_output_header"))
         try:
@@ -1570,14 +3901,24 @@ def main():
         st.header(ui_translator("sidebar_profile_header"))
         default_name_val = ""
         if st.session_state.current_farmer_profile and not st.session_state.show_new_profile_form:
-            default_name_val = st.session_state.current_farmer_profile.get('name', '')
+            default_name_val = st.session_state.current_farmer_profile.name
         elif st.session_state.show_new_profile_form and st.session_state.form_trigger_name:
              default_name_val = st.session_state.form_trigger_name
         elif 'widget_farmer_name_input' in st.session_state:
              default_name_val = st.session_state.widget_farmer_name_input
+        if st.session_state.pop('_name_suggestion_applied', False):
+             default_name_val = ""
 
         st.text_input( ui_translator("farmer_name_label"), key="widget_farmer_name_input", value=default_name_val, placeholder="Type name here..." )
 
+        typed_name = st.session_state.get("widget_farmer_name_input", "").strip()
+        if typed_name and not (st.session_state.current_farmer_profile and farmer_name_key(st.session_state.current_farmer_profile.name) == farmer_name_key(typed_name)):
+            name_suggestions = search_farmer_names(typed_name, limit=5)
+            if name_suggestions and farmer_name_key(name_suggestions[0]) != farmer_name_key(typed_name):
+                st.caption(ui_translator("name_suggestions_label"))
+                for i, suggested_name in enumerate(name_suggestions):
+                    st.button(suggested_name, key=f"widget_name_suggestion_{i}", on_click=use_name_suggestion, args=(suggested_name,))
+
         col1, col2 = st.columns(2)
         load_button_clicked = col1.button(ui_translator("load_profile_button"), key="widget_load_button")
         new_button_clicked = col2.button(ui_translator("new_profile_button"), key="widget_new_button")
@@ -1585,11 +3926,10 @@ def main():
         current_entered_name = st.session_state.get("widget_farmer_name_input", "").strip()
 
         if load_button_clicked or new_button_clicked:
-             farmer_db = load_or_create_farmer_db()
              if not current_entered_name:
                  st.warning(ui_translator("name_missing_error"))
              else:
-                 profile = find_farmer(farmer_db, current_entered_name)
+                 profile = get_farmer_profile(current_entered_name)
 
                  if load_button_clicked:
                      if profile:
@@ -1598,28 +3938,26 @@ def main():
                          st.session_state.form_trigger_name = None
                          clear_chat_history()
 
-                         loaded_language = profile.get('language', 'English')
+                         loaded_language = profile.language
                          language_changed = False
                          if loaded_language in translations and st.session_state.selected_language != loaded_language:
                              st.session_state.selected_language = loaded_language
                              language_changed = True
-                             logger.info(f"App language sync to '{loaded_language}' from loaded profile: {profile['name']}.")
+                             logger.info(f"App language sync to '{loaded_language}' from loaded profile: {profile.name}.")
                          elif loaded_language not in translations:
-                             logger.warning(f"Profile '{profile['name']}' invalid lang '{loaded_language}', keeping app lang {st.session_state.selected_language}.")
+                             logger.warning(f"Profile '{profile.name}' invalid lang '{loaded_language}', keeping app lang {st.session_state.selected_language}.")
 
-                         loaded_lat = profile.get('latitude', PROFILE_DEFAULT_LAT)
-                         loaded_lon = profile.get('longitude', PROFILE_DEFAULT_LON)
-                         if loaded_lat != 0.0 or loaded_lon != 0.0:
-                             st.session_state.map_center = [loaded_lat, loaded_lon]; st.session_state.map_zoom = MAP_CLICK_ZOOM
+                         if profile.has_location:
+                             st.session_state.map_center = [profile.latitude, profile.longitude]; st.session_state.map_zoom = MAP_CLICK_ZOOM
                          else:
                              st.session_state.map_center = [MAP_DEFAULT_LAT, MAP_DEFAULT_LON]; st.session_state.map_zoom = 5
                          st.session_state.map_clicked_ref_coords = {'lat': None, 'lon': None}
 
-                         st.success(ui_translator("profile_loaded_success", name=profile['name']))
+                         st.success(ui_translator("profile_loaded_success", name=profile.name))
                          for key in ['_form_lat_default','_form_lon_default','_form_soil_default','_form_size_default','_form_lang_default']:
                               if key in st.session_state: del st.session_state[key]
 
-                         logger.info(f"Profile loaded for '{profile['name']}'. Rerun (Lang changed: {language_changed}).")
+                         logger.info(f"Profile loaded for '{profile.name}'. Rerun (Lang changed: {language_changed}).")
                          st.rerun()
                      else:
                          st.warning(ui_translator("profile_not_found_warning", name=current_entered_name))
@@ -1633,24 +3971,23 @@ def main():
                          st.session_state.form_trigger_name = None
                          clear_chat_history()
 
-                         existing_language = profile.get('language', 'English')
+                         existing_language = profile.language
                          language_changed = False
                          if existing_language in translations and st.session_state.selected_language != existing_language:
                              st.session_state.selected_language = existing_language
                              language_changed = True
-                             logger.info(f"App language sync to '{existing_language}' from existing profile '{profile['name']}' (via New button).")
+                             logger.info(f"App language sync to '{existing_language}' from existing profile '{profile.name}' (via New button).")
                          elif existing_language not in translations:
-                              logger.warning(f"Existing profile '{profile['name']}' invalid lang '{existing_language}', keeping app lang {st.session_state.selected_language}.")
+                              logger.warning(f"Existing profile '{profile.name}' invalid lang '{existing_language}', keeping app lang {st.session_state.selected_language}.")
 
-                         loaded_lat = profile.get('latitude', PROFILE_DEFAULT_LAT); loaded_lon = profile.get('longitude', PROFILE_DEFAULT_LON)
-                         if loaded_lat != 0.0 or loaded_lon != 0.0: st.session_state.map_center = [loaded_lat, loaded_lon]; st.session_state.map_zoom = MAP_CLICK_ZOOM
+                         if profile.has_location: st.session_state.map_center = [profile.latitude, profile.longitude]; st.session_state.map_zoom = MAP_CLICK_ZOOM
                          else: st.session_state.map_center = [MAP_DEFAULT_LAT, MAP_DEFAULT_LON]; st.session_state.map_zoom = 5
                          st.session_state.map_clicked_ref_coords = {'lat': None, 'lon': None}
 
                          for key in ['_form_lat_default','_form_lon_default','_form_soil_default','_form_size_default','_form_lang_default']:
                              if key in st.session_state: del st.session_state[key]
 
-                         logger.info(f"Existing profile '{profile['name']}' loaded instead of creating new. Rerun (Lang changed: {language_changed}).")
+                         logger.info(f"Existing profile '{profile.name}' loaded instead of creating new. Rerun (Lang changed: {language_changed}).")
                          st.rerun()
                      else:
                          st.info(ui_translator("creating_profile_info", name=current_entered_name))
@@ -1721,78 +4058,49 @@ def main():
                         new_profile_data = { 'name': profile_name_to_save, 'language': st.session_state.form_new_lang, 'latitude': st.session_state.form_new_lat, 'longitude': st.session_state.form_new_lon, 'soil_type': st.session_state.form_new_soil, 'farm_size_ha': st.session_state.form_new_size }
                         logger.info(f"Attempting to save new profile for '{profile_name_to_save}'. Data: {new_profile_data}")
 
-                        current_db_state = load_or_create_farmer_db()
-                        updated_db = add_or_update_farmer(current_db_state, new_profile_data)
-
-                        if isinstance(updated_db, pd.DataFrame):
-                            save_farmer_db(updated_db)
-                            saved_profile = find_farmer(updated_db, profile_name_to_save)
-                            if saved_profile:
-                                st.session_state.current_farmer_profile = saved_profile
-                                st.session_state.show_new_profile_form = False
-                                st.session_state.form_trigger_name = None
-                                clear_chat_history()
-
-                                saved_language = saved_profile.get('language', 'English')
-                                lang_changed_on_save = False
-                                if saved_language in translations and st.session_state.selected_language != saved_language:
-                                     st.session_state.selected_language = saved_language
-                                     lang_changed_on_save = True
-                                     logger.info(f"App language sync to '{saved_language}' from saved profile: {profile_name_to_save}.")
-                                elif saved_language not in translations:
-                                     logger.warning(f"Saved profile '{profile_name_to_save}' invalid lang '{saved_language}', keeping app lang {st.session_state.selected_language}.")
-
-                                saved_lat = saved_profile.get('latitude', PROFILE_DEFAULT_LAT); saved_lon = saved_profile.get('longitude', PROFILE_DEFAULT_LON)
-                                if saved_lat != 0.0 or saved_lon != 0.0: st.session_state.map_center = [saved_lat, saved_lon]; st.session_state.map_zoom = MAP_CLICK_ZOOM
-                                else: st.session_state.map_center = [MAP_DEFAULT_LAT, MAP_DEFAULT_LON]; st.session_state.map_zoom = 5
-                                st.session_state.map_clicked_ref_coords = {'lat': None, 'lon': None}
-
-                                for key in ['_form_lat_default','_form_lon_default','_form_soil_default','_form_size_default','_form_lang_default']:
-                                     if key in st.session_state: del st.session_state[key]
-
-                                st.success(ui_translator("profile_saved_success", name=profile_name_to_save))
-                                logger.info(f"New profile saved for '{profile_name_to_save}'. Rerun (Lang changed: {lang_changed_on_save}).")
-                                st.rerun()
-                            else:
-                                logger.error(f"Profile '{profile_name_to_save}' not found immediately after saving.")
-                                st.error(ui_translator("profile_reload_error_after_save"))
-                                st.session_state.show_new_profile_form = False
-                                st.session_state.form_trigger_name = None
-                                st.rerun()
+                        saved_profile = save_farmer_profile(new_profile_data)
+                        if saved_profile:
+                            st.session_state.current_farmer_profile = saved_profile
+                            st.session_state.show_new_profile_form = False
+                            st.session_state.form_trigger_name = None
+                            clear_chat_history()
+
+                            saved_language = saved_profile.language
+                            lang_changed_on_save = False
+                            if saved_language in translations and st.session_state.selected_language != saved_language:
+                                 st.session_state.selected_language = saved_language
+                                 lang_changed_on_save = True
+                                 logger.info(f"App language sync to '{saved_language}' from saved profile: {profile_name_to_save}.")
+                            elif saved_language not in translations:
+                                 logger.warning(f"Saved profile '{profile_name_to_save}' invalid lang '{saved_language}', keeping app lang {st.session_state.selected_language}.")
+
+                            if saved_profile.has_location: st.session_state.map_center = [saved_profile.latitude, saved_profile.longitude]; st.session_state.map_zoom = MAP_CLICK_ZOOM
+                            else: st.session_state.map_center = [MAP_DEFAULT_LAT, MAP_DEFAULT_LON]; st.session_state.map_zoom = 5
+                            st.session_state.map_clicked_ref_coords = {'lat': None, 'lon': None}
+
+                            for key in ['_form_lat_default','_form_lon_default','_form_soil_default','_form_size_default','_form_lang_default']:
+                                 if key in st.session_state: del st.session_state[key]
+
+                            st.success(ui_translator("profile_saved_success", name=profile_name_to_save))
+                            logger.info(f"New profile saved for '{profile_name_to_save}'. Rerun (Lang changed: {lang_changed_on_save}).")
+                            st.rerun()
                         else:
-                            logger.error(f"Failed to get updated DataFrame saving profile '{profile_name_to_save}'.")
+                            logger.error(f"Failed to save or reload profile '{profile_name_to_save}'.")
                             st.error(ui_translator("db_update_error_on_save"))
 
         active_profile = st.session_state.current_farmer_profile
         if not st.session_state.show_new_profile_form:
             st.markdown("---")
-            if active_profile and isinstance(active_profile, dict):
+            if active_profile:
                 st.subheader(ui_translator("active_profile_header"))
-                name_disp = active_profile.get('name', ui_translator('value_na'))
-                lang_disp = active_profile.get('language', ui_translator('value_na'))
-                lat_val = active_profile.get('latitude'); lon_val = active_profile.get('longitude')
-                soil_disp = active_profile.get('soil_type', ui_translator('value_na'))
-                size_val = active_profile.get('farm_size_ha')
-
                 loc_str = ui_translator('location_not_set_description')
-                if pd.notna(lat_val) and pd.notna(lon_val):
-                    try:
-                        lat_f = float(lat_val); lon_f = float(lon_val)
-                        if abs(lat_f) > 1e-9 or abs(lon_f) > 1e-9: loc_str = f"{lat_f:.6f}, {lon_f:.6f}"
-                        else: loc_str = ui_translator('location_not_set_description')
-                    except (ValueError, TypeError): loc_str = ui_translator('location_not_set_description') + " (Invalid)"
-
-                size_str = ui_translator("not_set_label")
-                if pd.notna(size_val):
-                    try:
-                        size_f = float(size_val)
-                        if size_f > 0: size_str = f"{size_f:.2f}"
-                    except (ValueError, TypeError): pass
+                if active_profile.has_location: loc_str = f"{active_profile.latitude:.6f}, {active_profile.longitude:.6f}"
+                size_str = f"{active_profile.farm_size_ha:.2f}" if active_profile.farm_size_ha > 0 else ui_translator("not_set_label")
 
-                st.write(f"**{ui_translator('active_profile_name')}:** {name_disp}")
-                st.write(f"**{ui_translator('active_profile_lang')}:** {lang_disp}")
+                st.write(f"**{ui_translator('active_profile_name')}:** {active_profile.name}")
+                st.write(f"**{ui_translator('active_profile_lang')}:** {active_profile.language}")
                 st.write(f"**{ui_translator('active_profile_loc')}:** {loc_str}")
-                st.write(f"**{ui_translator('active_profile_soil')}:** {soil_disp}")
+                st.write(f"**{ui_translator('active_profile_soil')}:** {active_profile.soil_type}")
                 st.write(f"**{ui_translator('active_profile_size')}:** {size_str}")
             elif not st.session_state.show_new_profile_form:
                  st.info(ui_translator("no_profile_loaded_info"))
@@ -1809,8 +4117,8 @@ def main():
     if not st.session_state.current_farmer_profile:
         st.warning(ui_translator("profile_error"))
     else:
-        farmer_name = st.session_state.current_farmer_profile.get('name', ui_translator("unknown_farmer"))
-        profile_language = st.session_state.current_farmer_profile.get('language', "English")
+        farmer_name = st.session_state.current_farmer_profile.name
+        profile_language = st.session_state.current_farmer_profile.language
 
         tab_chat_label = ui_translator("tab_new_chat")
         tab_history_label = ui_translator("tab_past_interactions")
@@ -1876,6 +4184,7 @@ def main():
                                     weather_api_key=current_weather_key,
                                     output_language=output_lang
                                 )
+                                st.session_state.qa_log_queued = _qa_log_writer()['queued']
                                 response_text = result.get('response_text', ui_translator("processing_error", e="Empty response."))
                                 logger.info(f"AI Response status: {result.get('status', 'unknown')}. Length: {len(response_text)}")
 
@@ -1904,36 +4213,36 @@ def main():
             else:
                 handle_map_interaction_reference(
                      map_key="edit_profile_map",
-                     center=[current_profile.get('latitude', MAP_DEFAULT_LAT), current_profile.get('longitude', MAP_DEFAULT_LON)],
-                     zoom=MAP_CLICK_ZOOM if (current_profile.get('latitude', 0.0) != 0.0 or current_profile.get('longitude', 0.0) != 0.0) else 5,
+                     center=[current_profile.latitude, current_profile.longitude],
+                     zoom=MAP_CLICK_ZOOM if current_profile.has_location else 5,
                      allow_click_updates=False
                 )
 
                 with st.form("edit_profile_form", clear_on_submit=False):
-                    st.text_input(ui_translator("profile_name_edit_label"), value=current_profile.get('name', ''), key="edit_form_name_display", disabled=True)
+                    st.text_input(ui_translator("profile_name_edit_label"), value=current_profile.name, key="edit_form_name_display", disabled=True)
 
                     st.markdown(f"**{ui_translator('selected_coords_label')}**")
                     col_lat_edit, col_lon_edit = st.columns(2)
-                    with col_lat_edit: st.number_input( ui_translator("latitude_label"), min_value=-90.0, max_value=90.0, value=float(current_profile.get('latitude', PROFILE_DEFAULT_LAT)), step=1e-6, format="%.6f", key="edit_form_lat")
-                    with col_lon_edit: st.number_input( ui_translator("longitude_label"), min_value=-180.0, max_value=180.0, value=float(current_profile.get('longitude', PROFILE_DEFAULT_LON)), step=1e-6, format="%.6f", key="edit_form_lon")
+                    with col_lat_edit: st.number_input( ui_translator("latitude_label"), min_value=-90.0, max_value=90.0, value=current_profile.latitude, step=1e-6, format="%.6f", key="edit_form_lat")
+                    with col_lon_edit: st.number_input( ui_translator("longitude_label"), min_value=-180.0, max_value=180.0, value=current_profile.longitude, step=1e-6, format="%.6f", key="edit_form_lon")
                     st.markdown("---")
 
-                    current_lang = current_profile.get('language', 'English')
+                    current_lang = current_profile.language
                     try: current_lang_index_edit = language_options.index(current_lang)
                     except ValueError: current_lang_index_edit = 0
                     st.selectbox(ui_translator("pref_lang_label"), options=language_options, index=current_lang_index_edit, key="edit_form_lang")
 
-                    current_soil = current_profile.get('soil_type', 'Unknown')
+                    current_soil = current_profile.soil_type
                     try: current_soil_index_edit = SOIL_TYPES.index(current_soil)
                     except ValueError: current_soil_index_edit = SOIL_TYPES.index('Unknown')
                     st.selectbox(ui_translator("soil_type_label"), options=SOIL_TYPES, index=current_soil_index_edit, key="edit_form_soil")
 
-                    st.number_input( ui_translator("farm_size_label"), value=float(current_profile.get('farm_size_ha', 1.0)), min_value=0.01, step=0.1, format="%.2f", key="edit_form_size")
+                    st.number_input( ui_translator("farm_size_label"), value=current_profile.farm_size_ha, min_value=0.01, step=0.1, format="%.2f", key="edit_form_size")
 
                     submitted_edit = st.form_submit_button(ui_translator("save_changes_button"))
 
                     if submitted_edit:
-                         profile_name_to_update = current_profile.get('name')
+                         profile_name_to_update = current_profile.name
                          if not profile_name_to_update:
                               st.error(ui_translator("system_error_label") + ": Cannot update profile, name is missing.")
                               logger.error("Edit form submitted but current profile name was missing.")
@@ -1941,40 +4250,30 @@ def main():
                              updated_data = { 'name': profile_name_to_update, 'language': st.session_state.edit_form_lang, 'latitude': st.session_state.edit_form_lat, 'longitude': st.session_state.edit_form_lon, 'soil_type': st.session_state.edit_form_soil, 'farm_size_ha': st.session_state.edit_form_size }
                              logger.info(f"Attempting to update profile for '{profile_name_to_update}'. Data: {updated_data}")
 
-                             current_db_state_edit = load_or_create_farmer_db()
-                             updated_db_edit = add_or_update_farmer(current_db_state_edit, updated_data)
-
-                             if isinstance(updated_db_edit, pd.DataFrame):
-                                 save_farmer_db(updated_db_edit)
-                                 reloaded_profile = find_farmer(updated_db_edit, profile_name_to_update)
-                                 if reloaded_profile:
-                                     st.session_state.current_farmer_profile = reloaded_profile
-                                     st.success(ui_translator("profile_updated_success", name=profile_name_to_update))
-                                     logger.info(f"Profile updated successfully for '{profile_name_to_update}'.")
-
-                                     new_language_pref = reloaded_profile.get('language', 'English')
-                                     lang_changed_on_edit = False
-                                     if new_language_pref != st.session_state.selected_language:
-                                         if new_language_pref in translations:
-                                             st.session_state.selected_language = new_language_pref
-                                             lang_changed_on_edit = True
-                                             logger.info(f"App language sync to '{new_language_pref}' after profile edit for {profile_name_to_update}.")
-                                         else:
-                                              logger.warning(f"Edited profile '{profile_name_to_update}' invalid lang '{new_language_pref}', keeping site lang {st.session_state.selected_language}.")
-
-                                     new_lat = reloaded_profile.get('latitude', PROFILE_DEFAULT_LAT); new_lon = reloaded_profile.get('longitude', PROFILE_DEFAULT_LON)
-                                     if new_lat != 0.0 or new_lon != 0.0: st.session_state.map_center = [new_lat, new_lon]; st.session_state.map_zoom = MAP_CLICK_ZOOM
-                                     else: st.session_state.map_center = [MAP_DEFAULT_LAT, MAP_DEFAULT_LON]; st.session_state.map_zoom = 5
-
-                                     logger.info(f"Rerun after profile edit. Lang changed: {lang_changed_on_edit}")
-                                     st.rerun()
-                                 else:
-                                     logger.error(f"Profile '{profile_name_to_update}' not found immediately after updating.")
-                                     st.error(ui_translator("profile_reload_error_after_save") + " (Update)")
-                                     st.rerun()
+                             reloaded_profile = save_farmer_profile(updated_data)
+                             if reloaded_profile:
+                                 st.session_state.current_farmer_profile = reloaded_profile
+                                 st.success(ui_translator("profile_updated_success", name=profile_name_to_update))
+                                 logger.info(f"Profile updated successfully for '{profile_name_to_update}'.")
+
+                                 new_language_pref = reloaded_profile.language
+                                 lang_changed_on_edit = False
+                                 if new_language_pref != st.session_state.selected_language:
+                                     if new_language_pref in translations:
+                                         st.session_state.selected_language = new_language_pref
+                                         lang_changed_on_edit = True
+                                         logger.info(f"App language sync to '{new_language_pref}' after profile edit for {profile_name_to_update}.")
+                                     else:
+                                          logger.warning(f"Edited profile '{profile_name_to_update}' invalid lang '{new_language_pref}', keeping site lang {st.session_state.selected_language}.")
+
+                                 if reloaded_profile.has_location: st.session_state.map_center = [reloaded_profile.latitude, reloaded_profile.longitude]; st.session_state.map_zoom = MAP_CLICK_ZOOM
+                                 else: st.session_state.map_center = [MAP_DEFAULT_LAT, MAP_DEFAULT_LON]; st.session_state.map_zoom = 5
+
+                                 logger.info(f"Rerun after profile edit. Lang changed: {lang_changed_on_edit}")
+                                 st.rerun()
                              else:
-                                logger.error(f"Failed to get updated DataFrame when updating profile '{profile_name_to_update}'.")
-                                st.error(ui_translator("db_update_error_on_save") + " (Update)")
+                                 logger.error(f"Failed to save or reload profile '{profile_name_to_update}' after edit.")
+                                 st.error(ui_translator("db_update_error_on_save") + " (Update)")
 
 
 if __name__ == "__main__":
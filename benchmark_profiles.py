@@ -0,0 +1,815 @@
+import argparse
+import csv
+import datetime
+import http.server
+import json
+import multiprocessing
+import os
+import random
+import string
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import requests
+
+import app
+
+
+def make_profiles(n_rows, seed=42):
+    rng = random.Random(seed)
+    names = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))).capitalize() + f" {i}"
+        for i in range(n_rows)
+    ]
+    return pd.DataFrame({
+        'name': names,
+        'language': [rng.choice(list(app.translations.keys())) for _ in range(n_rows)],
+        'latitude': [rng.uniform(8.0, 35.0) for _ in range(n_rows)],
+        'longitude': [rng.uniform(68.0, 97.0) for _ in range(n_rows)],
+        'soil_type': [rng.choice(app.SOIL_TYPES) for _ in range(n_rows)],
+        'farm_size_ha': [round(rng.uniform(0.2, 20.0), 2) for _ in range(n_rows)],
+    }, columns=app.CSV_COLUMNS)
+
+
+def time_per_call(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def legacy_clean_frame(df):
+    # Row-wise cleaning as load_or_create_farmer_db and save_farmer_db each did it before the shared validator.
+    df['name'] = df['name'].fillna('').astype(str).str.strip()
+    df = df[df['name'] != ''].copy()
+    df['language'] = df['language'].fillna('English').astype(str).str.strip()
+    df['language'] = df['language'].apply(lambda x: x if x in app.translations else 'English')
+    df['soil_type'] = df['soil_type'].fillna('Unknown').astype(str).str.strip()
+    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce').fillna(app.PROFILE_DEFAULT_LAT)
+    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce').fillna(app.PROFILE_DEFAULT_LON)
+    df['farm_size_ha'] = pd.to_numeric(df['farm_size_ha'], errors='coerce').fillna(1.0)
+    df['farm_size_ha'] = df['farm_size_ha'].apply(lambda x: x if pd.notna(x) and x > 0 else 1.0)
+    return df[app.CSV_COLUMNS]
+
+
+def bench_name_lookup(n_rows, repeats):
+    df = make_profiles(n_rows)
+    probe_names = [df['name'].iloc[i].upper() for i in range(0, n_rows, max(1, n_rows // repeats))][:repeats]
+
+    build_start = time.perf_counter()
+    name_index = app._build_name_index(df)
+    build_s = time.perf_counter() - build_start
+
+    probes = iter(probe_names * 2)
+    scan_s = time_per_call(lambda: df.index[df['name'].str.lower() == next(probes).lower()].tolist(), repeats)
+    probes = iter(probe_names * 2)
+    indexed_s = time_per_call(lambda: name_index.get(app.farmer_name_key(next(probes))), repeats)
+    probes = iter(probe_names * 2)
+    find_s = time_per_call(lambda: app.find_farmer(df, next(probes), name_index), repeats)
+
+    return {
+        'rows': n_rows,
+        'index_build_ms': build_s * 1e3,
+        'scan_lookup_ms': scan_s * 1e3,
+        'indexed_lookup_us': indexed_s * 1e6,
+        'find_farmer_us': find_s * 1e6,
+        'speedup': scan_s / indexed_s if indexed_s else float('inf'),
+    }
+
+
+def bench_profile_save(n_rows, repeats):
+    workdir = tempfile.mkdtemp(prefix="bench_profiles_")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app._sort_farmer_frame(make_profiles(n_rows)).to_csv(app.FARMER_CSV_PATH, index=False, encoding='utf-8')
+        app._farmer_profile_store.clear()
+        app.FARMER_JOURNAL_COMPACT_THRESHOLD = 10 ** 9
+        app.load_or_create_farmer_db()
+
+        counter = iter(range(repeats * 4))
+
+        def rewrite_save():
+            df = app.load_or_create_farmer_db()
+            df = app.add_or_update_farmer(df, {'name': f"Bench Farmer {next(counter)}", 'language': 'Hindi'})
+            app.save_farmer_db(df)
+
+        def journal_save():
+            app.save_farmer_profile({'name': f"Bench Farmer {next(counter)}", 'language': 'Hindi'})
+
+        rewrite_s = time_per_call(rewrite_save, max(1, repeats // 4))
+        journal_s = time_per_call(journal_save, repeats)
+
+        compact_start = time.perf_counter()
+        app.compact_farmer_journal()
+        compact_s = time.perf_counter() - compact_start
+    finally:
+        os.chdir(previous_cwd)
+
+    return {
+        'rows': n_rows,
+        'rewrite_save_ms': rewrite_s * 1e3,
+        'journal_save_ms': journal_s * 1e3,
+        'compaction_ms': compact_s * 1e3,
+    }
+
+
+def bench_storage_formats(n_rows):
+    workdir = tempfile.mkdtemp(prefix="bench_formats_")
+    csv_path = os.path.join(workdir, "Data.csv")
+    parquet_path = os.path.join(workdir, "Data.parquet")
+    df = app._sort_farmer_frame(make_profiles(n_rows))
+    df.to_csv(csv_path, index=False, encoding='utf-8')
+    app._apply_farmer_dtypes(df).to_parquet(parquet_path, index=False, engine='pyarrow', compression='zstd')
+
+    start = time.perf_counter()
+    csv_df = pd.read_csv(csv_path, encoding='utf-8')
+    csv_load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    parquet_df = pd.read_parquet(parquet_path, engine='pyarrow')
+    parquet_load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    pd.read_csv(csv_path, usecols=['latitude', 'longitude'], encoding='utf-8')
+    csv_latlon_s = time.perf_counter() - start
+    start = time.perf_counter()
+    pd.read_parquet(parquet_path, columns=['latitude', 'longitude'], engine='pyarrow')
+    parquet_latlon_s = time.perf_counter() - start
+
+    return {
+        'rows': n_rows,
+        'csv_file_mb': os.path.getsize(csv_path) / 2 ** 20,
+        'parquet_file_mb': os.path.getsize(parquet_path) / 2 ** 20,
+        'csv_mem_mb': csv_df.memory_usage(deep=True).sum() / 2 ** 20,
+        'parquet_mem_mb': parquet_df.memory_usage(deep=True).sum() / 2 ** 20,
+        'csv_load_ms': csv_load_s * 1e3,
+        'parquet_load_ms': parquet_load_s * 1e3,
+        'csv_latlon_ms': csv_latlon_s * 1e3,
+        'parquet_latlon_ms': parquet_latlon_s * 1e3,
+    }
+
+
+def bench_validation(n_rows):
+    workdir = tempfile.mkdtemp(prefix="bench_validation_")
+    csv_path = os.path.join(workdir, "Data.csv")
+    app._sort_farmer_frame(make_profiles(n_rows)).to_csv(csv_path, index=False, encoding='utf-8')
+
+    def load_and_save(clean_on_load, clean_on_save):
+        start = time.perf_counter()
+        df = clean_on_load(pd.read_csv(csv_path, encoding='utf-8'))
+        loaded = time.perf_counter()
+        app._sort_farmer_frame(clean_on_save(df)).to_csv(csv_path, index=False, encoding='utf-8')
+        return loaded - start, time.perf_counter() - loaded
+
+    legacy_load_s, legacy_save_s = load_and_save(legacy_clean_frame, lambda df: legacy_clean_frame(df.copy()))
+    load_s, save_s = load_and_save(app.validate_farmer_frame, app.validate_farmer_frame)
+
+    raw = pd.read_csv(csv_path, encoding='utf-8')
+    start = time.perf_counter()
+    legacy_clean_frame(raw.copy())
+    legacy_clean_s = time.perf_counter() - start
+    start = time.perf_counter()
+    app.validate_farmer_frame(raw)
+    clean_s = time.perf_counter() - start
+
+    return {
+        'rows': n_rows,
+        'legacy_clean_ms': legacy_clean_s * 1e3,
+        'shared_clean_ms': clean_s * 1e3,
+        'legacy_load_ms': legacy_load_s * 1e3,
+        'legacy_save_ms': legacy_save_s * 1e3,
+        'load_ms': load_s * 1e3,
+        'save_ms': save_s * 1e3,
+    }
+
+
+def bench_name_search(n_rows, repeats):
+    names = make_profiles(n_rows)['name'].tolist()
+    rng = random.Random(11)
+    probes_exact = [names[rng.randrange(n_rows)][:5] for _ in range(repeats)]
+    probes_typo = []
+    for _ in range(repeats):
+        name = names[rng.randrange(n_rows)].split(" ")[0]
+        pos = rng.randrange(1, len(name))
+        probes_typo.append(name[:pos] + rng.choice(string.ascii_lowercase) + name[pos + 1:])
+
+    build_start = time.perf_counter()
+    index = app.build_name_search_index(names)
+    build_s = time.perf_counter() - build_start
+
+    probes = iter(probes_exact * 2)
+    prefix_s = time_per_call(lambda: app.search_farmer_names(next(probes), max_distance=0, index=index), repeats)
+    probes = iter(probes_typo * 2)
+    fuzzy_s = time_per_call(lambda: app.search_farmer_names(next(probes), index=index), repeats)
+    keys = pd.Series(names).str.casefold()
+    probes = iter(probes_exact * 2)
+    scan_s = time_per_call(lambda: keys[keys.str.startswith(next(probes).casefold())].head(5), repeats)
+
+    return {
+        'rows': n_rows,
+        'index_build_ms': build_s * 1e3,
+        'scan_prefix_ms': scan_s * 1e3,
+        'trie_prefix_ms': prefix_s * 1e3,
+        'trie_fuzzy_ms': fuzzy_s * 1e3,
+    }
+
+
+def bench_spatial_queries(n_rows, repeats):
+    df = make_profiles(n_rows)
+    rng = random.Random(7)
+    points = [(rng.uniform(10.0, 33.0), rng.uniform(70.0, 95.0)) for _ in range(repeats)]
+    lats, lons = df['latitude'].to_numpy(), df['longitude'].to_numpy()
+
+    build_start = time.perf_counter()
+    index = app.build_spatial_index(df)
+    build_s = time.perf_counter() - build_start
+
+    probes = iter(points * 2)
+    scan_s = time_per_call(lambda: (lambda p: df[app.haversine_km(p[0], p[1], lats, lons) <= 25.0])(next(probes)), repeats)
+    probes = iter(points * 2)
+    radius_s = time_per_call(lambda: (lambda p: app.farmers_within_radius(p[0], p[1], 25.0, index=index))(next(probes)), repeats)
+    probes = iter(points * 2)
+    knn_s = time_per_call(lambda: (lambda p: app.nearest_farmers(p[0], p[1], 10, index=index))(next(probes)), repeats)
+
+    return {
+        'rows': n_rows,
+        'index_build_ms': build_s * 1e3,
+        'scan_25km_ms': scan_s * 1e3,
+        'indexed_25km_ms': radius_s * 1e3,
+        'knn10_ms': knn_s * 1e3,
+    }
+
+
+def write_synthetic_log(n_rows, n_farmers, seed=5):
+    rng = random.Random(seed)
+    start = pd.Timestamp("2024-01-01")
+    prompt_block = "Farmer Context: soil, weather and market details. " * 40
+    with open(app.QA_LOG_PATH, 'w', newline='', encoding='utf-8') as log_file:
+        writer = csv.writer(log_file, lineterminator='\n')
+        writer.writerow(app.QA_LOG_COLUMNS)
+        for i in range(n_rows):
+            ts = (start + pd.Timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+            farmer = f"Farmer {rng.randrange(n_farmers)}"
+            writer.writerow([ts, farmer, 'English', f"Question {i} about \"crops\"?", f"Answer {i},\nwith detail.", prompt_block])
+
+
+def bench_history_load(n_rows, repeats):
+    workdir = tempfile.mkdtemp(prefix="bench_history_")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        write_synthetic_log(n_rows, n_farmers=max(1, n_rows // 100))
+        app._qa_log_writer.clear()
+
+        legacy_path = app.QA_LOG_PATH + ".migrated"
+
+        def full_scan():
+            log_df = pd.read_csv(legacy_path, encoding='utf-8', keep_default_na=False, low_memory=False)
+            return log_df[log_df['farmer_name'].str.strip().str.lower() == "farmer 7"]
+
+        index_start = time.perf_counter()
+        app.flush_qa_log(timeout=600)
+        app.read_farmer_log_rows("Farmer 7")
+        index_build_s = time.perf_counter() - index_start
+        scan_s = time_per_call(full_scan, max(1, repeats // 10))
+        indexed_s = time_per_call(lambda: app.read_farmer_log_rows("Farmer 7"), repeats)
+        first_page_s = time_per_call(
+            lambda: app.read_qa_log_entries(app.farmer_log_entries("Farmer 7")[:app.HISTORY_PAGE_SIZE]), repeats
+        )
+        log_mb = os.path.getsize(legacy_path) / 2 ** 20
+        segments_mb = sum(os.path.getsize(path) for _, path in app.qa_log_segments()) / 2 ** 20
+    finally:
+        os.chdir(previous_cwd)
+
+    return {
+        'rows': n_rows,
+        'log_mb': log_mb,
+        'segments_mb': segments_mb,
+        'migrate_index_ms': index_build_s * 1e3,
+        'full_scan_ms': scan_s * 1e3,
+        'indexed_read_ms': indexed_s * 1e3,
+        'first_page_ms': first_page_s * 1e3,
+    }
+
+
+def make_synthetic_prompt(rng, farmer, district, day, query):
+    # Mirrors the block layout process_farmer_request builds: farmer line, then one intent section per query.
+    lines = [app.ui_translator('farmer_context_data', name=farmer, location_description=district, soil="Black Soil (Regur)", size="2.50 Ha"), ""]
+    intent = rng.choice(["weather", "crop", "market", "general"])
+    if intent == "weather":
+        day_rng = random.Random(f"{district}|{day}")
+        lines.append(app.ui_translator('intent_weather'))
+        lines.append(app.ui_translator('context_header_weather', location=district))
+        lines.extend(
+            f"- {day} +{d}d: {day_rng.uniform(22, 36):.1f}°C, {day_rng.choice(['clear sky', 'light rain', 'overcast clouds'])}, humidity {day_rng.randint(40, 95)}%"
+            for d in range(5)
+        )
+        lines.append(app.ui_translator('context_footer_weather'))
+    elif intent == "crop":
+        lines.append(app.ui_translator('intent_crop'))
+        lines.append(app.ui_translator('context_header_crop'))
+        lines.append(app.ui_translator('context_factors_crop', soil="Black Soil (Regur)", season="Kharif"))
+        lines.append(app.ui_translator('context_crop_ideas', crops="Cotton, Soybean, Jowar"))
+        lines.append(app.ui_translator('context_footer_crop'))
+    elif intent == "market":
+        lines.append(app.ui_translator('intent_market'))
+        lines.append(app.ui_translator('context_header_market', crop="Wheat", market="Nearby Mandi"))
+        lines.append("Forecast 7 days: Range ~₹2150.00 - ₹2210.00 / Quintal. Trend Analysis: Stable.")
+        lines.append(app.ui_translator('context_footer_market'))
+    else:
+        lines.append(app.ui_translator('intent_general'))
+        lines.append(app.ui_translator('context_header_general'))
+        lines.append(app.ui_translator('context_data_general', query=query))
+        lines.append(app.ui_translator('context_footer_general'))
+    lines.append("")
+    return "\n".join(lines)
+
+
+def bench_prompt_dedup(n_rows, n_farmers=None, n_districts=50, seed=11):
+    rng = random.Random(seed)
+    n_farmers = n_farmers or max(1, n_rows // 20)
+    districts = {f"Farmer {i}": f"District {rng.randrange(n_districts)}" for i in range(n_farmers)}
+    start = pd.Timestamp("2024-01-01")
+    rows = []
+    for i in range(n_rows):
+        ts = start + pd.Timedelta(minutes=i * 3)
+        farmer = f"Farmer {rng.randrange(n_farmers)}"
+        query = f"Question {i} about my field?"
+        prompt = make_synthetic_prompt(rng, farmer, districts[farmer], ts.strftime("%Y-%m-%d"), query)
+        rows.append([ts.strftime("%Y-%m-%d %H:%M:%S"), farmer, 'English', query, f"Answer {i}.", prompt])
+
+    workdir = tempfile.mkdtemp(prefix="bench_dedup_")
+    previous_cwd = os.getcwd()
+    previous_compress = app.QA_LOG_COMPRESS_CLOSED
+    os.chdir(workdir)
+    try:
+        # Compression is switched off so the numbers isolate what deduplication alone saves.
+        app.QA_LOG_COMPRESS_CLOSED = False
+        inline_path = "inline.csv"
+        with open(inline_path, 'w', newline='', encoding='utf-8') as log_file:
+            writer = csv.writer(log_file, lineterminator='\n')
+            writer.writerow(app.QA_LOG_COLUMNS)
+            writer.writerows(rows)
+
+        app._qa_log_writer.clear()
+        state = app._qa_log_writer()
+        write_start = time.perf_counter()
+        for i in range(0, n_rows, app.QA_LOG_BATCH_SIZE):
+            app._write_qa_log_rows(state, rows[i:i + app.QA_LOG_BATCH_SIZE])
+        write_s = time.perf_counter() - write_start
+
+        segment_paths = [path for _, path in app.qa_log_segments()]
+        inline_read_s = time_per_call(lambda: pd.read_csv(inline_path, encoding='utf-8', keep_default_na=False), 3)
+        dedup_read_s = time_per_call(
+            lambda: pd.concat([pd.read_csv(path, encoding='utf-8', keep_default_na=False) for path in segment_paths]), 3
+        )
+        sample = rows[n_rows // 2]
+        stored = app.read_farmer_log_rows(sample[1], rehydrate_prompts=True)
+        assert sample[5] in set(stored['internal_prompt']), "rehydrated prompt does not round-trip"
+        inline_mb = os.path.getsize(inline_path) / 2 ** 20
+        log_mb = sum(os.path.getsize(path) for path in segment_paths) / 2 ** 20
+        pack_mb = os.path.getsize(app.QA_LOG_BLOB_PATH) / 2 ** 20
+    finally:
+        app.QA_LOG_COMPRESS_CLOSED = previous_compress
+        app._qa_log_writer.clear()
+        os.chdir(previous_cwd)
+
+    return {
+        'rows': n_rows,
+        'inline_mb': inline_mb,
+        'dedup_log_mb': log_mb,
+        'blob_pack_mb': pack_mb,
+        'saved_pct': 100.0 * (1 - (log_mb + pack_mb) / inline_mb),
+        'inline_read_ms': inline_read_s * 1e3,
+        'dedup_read_ms': dedup_read_s * 1e3,
+        'dedup_write_ms': write_s * 1e3,
+    }
+
+
+def bench_history_search(n_rows, repeats, seed=13):
+    rng = random.Random(seed)
+    vocabulary = ["urea", "dap", "potash", "wheat", "paddy", "cotton", "irrigation", "sowing", "aphids", "rust",
+                  "यूरिया", "गेहूं", "सिंचाई", "கோதுமை", "பாசனம்", "ইউরিয়া", "సేద్యం", "खत"]
+    start = pd.Timestamp("2024-01-01")
+    rows = []
+    for i in range(n_rows):
+        ts = (start + pd.Timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S")
+        query = " ".join(rng.choices(vocabulary, k=6))
+        response = " ".join(rng.choices(vocabulary, k=80))
+        rows.append([ts, "Farmer 7", 'English', query, response, ""])
+
+    workdir = tempfile.mkdtemp(prefix="bench_search_")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app._qa_log_writer.clear()
+        state = app._qa_log_writer()
+        for i in range(0, n_rows, app.QA_LOG_BATCH_SIZE):
+            app._write_qa_log_rows(state, rows[i:i + app.QA_LOG_BATCH_SIZE])
+
+        def substring_scan():
+            history = app.read_farmer_log_rows("Farmer 7")
+            return history[history['query'].str.contains("urea") | history['response'].str.contains("urea")]
+
+        build_start = time.perf_counter()
+        app.search_farmer_history("Farmer 7", "urea irrigation")
+        build_s = time.perf_counter() - build_start
+        scan_s = time_per_call(substring_scan, max(1, repeats // 10))
+        search_s = time_per_call(lambda: app.search_farmer_history("Farmer 7", "urea irrigation"), repeats)
+    finally:
+        app._qa_log_writer.clear()
+        os.chdir(previous_cwd)
+
+    return {
+        'farmer_rows': n_rows,
+        'first_search_ms': build_s * 1e3,
+        'substring_scan_ms': scan_s * 1e3,
+        'bm25_search_ms': search_s * 1e3,
+    }
+
+
+def synthetic_forecast_payload(start, n_items=40):
+    return {'city': {'name': "Synthetic"}, 'list': [
+        {'dt': start + 10800 * i, 'main': {'temp': 30.0, 'temp_min': 25.0, 'temp_max': 33.0, 'humidity': 60},
+         'weather': [{'description': "clear sky"}], 'wind': {'speed': 3.0}}
+        for i in range(n_items)
+    ]}
+
+
+def start_stub_weather_server(latency_s=0.0, rate_limit=None):
+    # Local stand-in for OpenWeatherMap; point app.WEATHER_API_URL at the returned URL.
+    # rate_limit=(calls, window_s) answers 429 beyond that many calls in any sliding window, like the free tier.
+    limit_lock = threading.Lock()
+
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; with Nagle on, keep-alive requests would stall on delayed ACKs.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.server.requests_served.append(self.path)
+            if rate_limit and not self.within_rate_limit():
+                self.server.rate_limited += 1
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            time.sleep(latency_s)
+            body = json.dumps(synthetic_forecast_payload(int(time.time()))).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def within_rate_limit(self):
+            calls, window_s = rate_limit
+            now = time.monotonic()
+            with limit_lock:
+                recent = self.server.accepted
+                while recent and recent[0] <= now - window_s:
+                    recent.pop(0)
+                if len(recent) >= calls:
+                    return False
+                recent.append(now)
+                return True
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests_served = []
+    server.accepted = []
+    server.rate_limited = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/data/2.5/forecast"
+
+
+def bench_weather_http(n_requests):
+    server, url = start_stub_weather_server()
+    previous_url = app.WEATHER_API_URL
+    try:
+        app.WEATHER_API_URL = url
+        params = {'lat': 18.5, 'lon': 73.8, 'appid': "benchmark-key", 'units': 'metric', 'cnt': 40}
+        unpooled_s = time_per_call(lambda: requests.get(url, params=params, timeout=15).json(), n_requests)
+        app._weather_http.clear()
+        pooled_s = time_per_call(lambda: app.fetch_weather_api(params).json(), n_requests)
+    finally:
+        app.WEATHER_API_URL = previous_url
+        app._weather_http.clear()
+        server.shutdown()
+
+    return {
+        'requests': n_requests,
+        'new_connection_ms': unpooled_s * 1e3,
+        'pooled_session_ms': pooled_s * 1e3,
+    }
+
+
+def legacy_parse_forecast(data):
+    # The per-item loop get_weather_forecast used before the columnar aggregation.
+    daily = defaultdict(lambda: {'min_temp': float('inf'), 'max_temp': float('-inf'), 'conditions': set(), 'total_rain': 0.0,
+                                 'alerts': set(), 'raw_temps': [], 'raw_humidities': [], 'raw_windspeeds': []})
+    for item in data['list']:
+        main_data, weather_data = item['main'], item['weather'][0]
+        date_str = datetime.datetime.fromtimestamp(item['dt']).strftime("%Y-%m-%d")
+        temp = float(main_data.get('temp', pd.NA))
+        humidity = float(main_data.get('humidity', pd.NA))
+        rain_3h = float(item.get('rain', {}).get('3h', 0.0))
+        wind_speed = float(item.get('wind', {}).get('speed', 0.0))
+        day = daily[date_str]
+        day['min_temp'] = min(day['min_temp'], float(main_data['temp_min']))
+        day['max_temp'] = max(day['max_temp'], float(main_data['temp_max']))
+        day['conditions'].add(weather_data['description'].capitalize())
+        day['total_rain'] += rain_3h
+        day['raw_temps'].append(temp)
+        day['raw_humidities'].append(humidity)
+        day['raw_windspeeds'].append(wind_speed)
+        if rain_3h > 7: day['alerts'].add(f"Heavy rain ({rain_3h:.1f}mm/3hr)")
+        elif rain_3h > 2: day['alerts'].add(f"Moderate rain ({rain_3h:.1f}mm/3hr)")
+        if temp > 40: day['alerts'].add(f"Very High Temp ({temp:.0f}°C)")
+        elif temp > 37: day['alerts'].add(f"High Temp ({temp:.0f}°C)")
+        elif temp < 8: day['alerts'].add(f"Low Temp ({temp:.0f}°C)")
+        if wind_speed > 17: day['alerts'].add(f"Very Strong Wind ({wind_speed * 3.6:.0f} km/h)")
+        elif wind_speed > 12: day['alerts'].add(f"Strong Wind ({wind_speed * 3.6:.0f} km/h)")
+    return daily
+
+
+def bench_forecast_parse(n_payloads, repeats, seed=19):
+    rng = random.Random(seed)
+    start = int(time.time())
+    payloads = []
+    for _ in range(n_payloads):
+        payload = synthetic_forecast_payload(start)
+        for item in payload['list']:
+            item['main']['temp'] = rng.uniform(5, 43)
+            item['rain'] = {'3h': rng.choice([0.0, 0.0, 1.5, 4.0, 9.0])}
+            item['wind'] = {'speed': rng.uniform(0, 20)}
+            item['weather'][0]['description'] = rng.choice(["clear sky", "light rain", "overcast clouds", "few clouds"])
+        payloads.append(payload)
+
+    per_payload_s = time_per_call(lambda: [legacy_parse_forecast(p) for p in payloads], repeats)
+    columnar_s = time_per_call(lambda: app.aggregate_forecast_days(payloads), repeats)
+    single_legacy_s = time_per_call(lambda: legacy_parse_forecast(payloads[0]), repeats * 10)
+    single_columnar_s = time_per_call(lambda: app.aggregate_forecast_days(payloads[0]), repeats * 10)
+    return {
+        'payloads': n_payloads,
+        'loop_ms': per_payload_s * 1e3,
+        'columnar_ms': columnar_s * 1e3,
+        'one_payload_loop_us': single_legacy_s * 1e6,
+        'one_payload_columnar_us': single_columnar_s * 1e6,
+    }
+
+
+def bench_forecast_render(n_languages, repeats):
+    # Parse-per-language (what every language switch used to cost) vs parse once and render per language.
+    payload = synthetic_forecast_payload(int(time.time()))
+    languages = list(app.translations)[:n_languages]
+    parse_each_s = time_per_call(lambda: [app.render_forecast(app.parse_forecast(payload), lang) for lang in languages], repeats)
+    forecast = app.parse_forecast(payload)
+    render_only_s = time_per_call(lambda: [app.render_forecast(forecast, lang) for lang in languages], repeats)
+    return {
+        'languages': len(languages),
+        'parse_and_render_ms': parse_each_s * 1e3,
+        'render_only_ms': render_only_s * 1e3,
+        'render_per_language_us': render_only_s / len(languages) * 1e6,
+    }
+
+
+def bench_weather_cache(n_queries, n_villages=40, api_latency_s=0.05, seed=17):
+    # A fixed-latency local stub stands in for the API so the run measures the cache, not the network.
+    rng = random.Random(seed)
+    villages = [(rng.uniform(15.0, 25.0), rng.uniform(73.0, 85.0)) for _ in range(n_villages)]
+    queries = [(lat + rng.uniform(-0.01, 0.01), lon + rng.uniform(-0.01, 0.01)) for lat, lon in (rng.choice(villages) for _ in range(n_queries))]
+
+    server, url = start_stub_weather_server(api_latency_s)
+    workdir = tempfile.mkdtemp(prefix="bench_weather_")
+    previous_cwd = os.getcwd()
+    previous_url = app.WEATHER_API_URL
+    os.chdir(workdir)
+    try:
+        app.WEATHER_API_URL = url
+        app._weather_cache.clear()
+        start = time.perf_counter()
+        for lat, lon in queries:
+            app.get_weather_forecast(lat, lon, "benchmark-key")
+        cached_s = time.perf_counter() - start
+        stats = app.weather_cache_stats()
+    finally:
+        app.WEATHER_API_URL = previous_url
+        app._weather_cache.clear()
+        server.shutdown()
+        os.chdir(previous_cwd)
+
+    return {
+        'queries': n_queries,
+        'uncached_api_calls': n_queries,
+        'cached_api_calls': stats['api_calls'],
+        'hit_rate': stats['hit_rate'],
+        'uncached_ms_per_query': api_latency_s * 1e3,
+        'cached_ms_per_query': cached_s / n_queries * 1e3,
+    }
+
+
+def _coalescing_burst(url, lat, lon, n_sessions):
+    # One process's worth of farmers asking at the same moment; also the multiprocessing worker.
+    app.WEATHER_API_URL = url
+    app._weather_cache.clear()
+    app._weather_refresher.clear()
+    barrier = threading.Barrier(n_sessions)
+    latencies = []
+
+    def session():
+        barrier.wait()
+        start = time.perf_counter()
+        app.get_weather_forecast(lat + random.uniform(-0.005, 0.005), lon + random.uniform(-0.005, 0.005), "benchmark-key")
+        latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session) for _ in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return max(latencies)
+
+
+def bench_weather_coalescing(n_sessions, n_processes, api_latency_s=0.3):
+    # Cell centre, so every jittered query lands in the same grid cell.
+    _, lat, lon = app.weather_cache_cell(18.52, 73.85)
+    server, url = start_stub_weather_server(api_latency_s)
+    workdir = tempfile.mkdtemp(prefix="bench_coalesce_")
+    previous_cwd = os.getcwd()
+    previous_url = app.WEATHER_API_URL
+    previous_lock_dir = app.WEATHER_COALESCE_LOCK_DIR
+    os.chdir(workdir)
+    results = {}
+    try:
+        context = multiprocessing.get_context("fork")
+        for label, lock_dir in (("no_lock_file", ""), ("lock_file", os.path.join(workdir, "locks"))):
+            if os.path.exists(app.WEATHER_CACHE_PATH):
+                os.remove(app.WEATHER_CACHE_PATH)
+            app.WEATHER_COALESCE_LOCK_DIR = lock_dir
+            server.requests_served.clear()
+            with context.Pool(n_processes) as pool:
+                slowest = max(pool.starmap(_coalescing_burst, [(url, lat, lon, n_sessions)] * n_processes))
+            results[label] = (len(server.requests_served), slowest)
+    finally:
+        app.WEATHER_API_URL = previous_url
+        app.WEATHER_COALESCE_LOCK_DIR = previous_lock_dir
+        server.shutdown()
+        os.chdir(previous_cwd)
+
+    return {
+        'processes': n_processes,
+        'sessions': n_sessions * n_processes,
+        'api_calls_threads_only': results['no_lock_file'][0],
+        'api_calls_lock_file': results['lock_file'][0],
+        'slowest_ms_threads_only': results['no_lock_file'][1] * 1e3,
+        'slowest_ms_lock_file': results['lock_file'][1] * 1e3,
+    }
+
+
+def bench_weather_quota(n_cells, upstream_calls=10, upstream_window_s=1.0):
+    # A burst of distinct cells against an upstream that allows upstream_calls per window, with and without the shared bucket.
+    server, url = start_stub_weather_server(rate_limit=(upstream_calls, upstream_window_s))
+    workdir = tempfile.mkdtemp(prefix="bench_quota_")
+    previous_cwd = os.getcwd()
+    saved = {name: getattr(app, name) for name in ('WEATHER_API_URL', 'WEATHER_QUOTA_PER_MINUTE', 'WEATHER_QUOTA_BURST', 'WEATHER_LATENCY_BUDGET_S')}
+    os.chdir(workdir)
+    results = {}
+    try:
+        app.WEATHER_API_URL = url
+        app.WEATHER_LATENCY_BUDGET_S = 120.0
+        # Half the upstream allowance as burst, refilling at half its rate: never more than upstream_calls in any window.
+        for label, per_minute, burst in (("unlimited", 1e9, 1e9), ("bucket", upstream_calls / 2 * 60 / upstream_window_s, upstream_calls / 2)):
+            app.WEATHER_QUOTA_PER_MINUTE, app.WEATHER_QUOTA_BURST = per_minute, burst
+            for resource in (app._weather_cache, app._weather_quota, app._weather_http, app._weather_refresher):
+                resource.clear()
+            if os.path.exists(app.WEATHER_CACHE_PATH):
+                os.remove(app.WEATHER_CACHE_PATH)
+            server.accepted.clear()
+            server.rate_limited = 0
+            outcomes = []
+            start = time.perf_counter()
+            threads = [threading.Thread(target=lambda i=i: outcomes.append(app.get_weather_forecast(10.0 + i * 0.1, 75.0, "benchmark-key")['status'])) for i in range(n_cells)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[label] = (server.rate_limited, outcomes.count("error"), time.perf_counter() - start)
+            time.sleep(upstream_window_s)
+    finally:
+        for name, value in saved.items():
+            setattr(app, name, value)
+        for resource in (app._weather_cache, app._weather_quota, app._weather_http, app._weather_refresher):
+            resource.clear()
+        server.shutdown()
+        os.chdir(previous_cwd)
+
+    return {
+        'cells': n_cells,
+        'upstream_429s_unlimited': results['unlimited'][0],
+        'farmer_errors_unlimited': results['unlimited'][1],
+        'upstream_429s_bucket': results['bucket'][0],
+        'farmer_errors_bucket': results['bucket'][1],
+        'burst_s_unlimited': results['unlimited'][2],
+        'burst_s_bucket': results['bucket'][2],
+    }
+
+
+def bench_context_bundles(n_requests, n_farmers=200, seed=23):
+    # Context assembly per query: live sections (weather already cached) vs one precomputed-bundle lookup.
+    rng = random.Random(seed)
+    soils = ["Black", "Loamy", "Red", "Sandy"]
+    farmers = [
+        app.FarmerProfile(name=f"F{i}", language="Hindi", latitude=18.0 + rng.uniform(0, 0.3), longitude=73.5 + rng.uniform(0, 0.3), soil_type=rng.choice(soils))
+        for i in range(n_farmers)
+    ]
+    queries = ["weather forecast this week", "please suggest crop", "cotton market price"]
+    requests_ = [(rng.choice(farmers), rng.choice(queries)) for _ in range(n_requests)]
+
+    server, url = start_stub_weather_server()
+    workdir = tempfile.mkdtemp(prefix="bench_bundles_")
+    previous_cwd = os.getcwd()
+    previous_url = app.WEATHER_API_URL
+    os.chdir(workdir)
+    try:
+        app.WEATHER_API_URL = url
+        for resource in (app._weather_cache, app._context_bundle_store):
+            resource.clear()
+        season = app.current_season()
+        for farmer in farmers:
+            app.get_weather_forecast(farmer.latitude, farmer.longitude, "benchmark-key")
+
+        def assemble_all():
+            for farmer, query in requests_:
+                app.process_farmer_request(farmer, query, [], None, "benchmark-key", "Hindi")
+
+        live_s = time_per_call(assemble_all, 1)
+        start = time.perf_counter()
+        keys = {}
+        for farmer in farmers:
+            keys.setdefault(app.context_bundle_key(farmer.latitude, farmer.longitude, farmer.soil_type, season, "English"), farmer)
+        for key, farmer in keys.items():
+            app.store_context_bundle(key, app.build_context_bundle(farmer.latitude, farmer.longitude, farmer.soil_type, season, "English", "benchmark-key"))
+        precompute_s = time.perf_counter() - start
+        before = app.context_bundle_stats()
+        bundled_s = time_per_call(assemble_all, 1)
+        after = app.context_bundle_stats()
+    finally:
+        app.WEATHER_API_URL = previous_url
+        for resource in (app._weather_cache, app._context_bundle_store):
+            resource.clear()
+        server.shutdown()
+        os.chdir(previous_cwd)
+
+    return {
+        'requests': n_requests,
+        'bundles': len(keys),
+        'precompute_s': precompute_s,
+        'live_us_per_request': live_s / n_requests * 1e6,
+        'bundle_us_per_request': bundled_s / n_requests * 1e6,
+        'bundle_hit_rate': (after['hits'] - before['hits']) / n_requests,
+    }
+
+
+def print_rows(title, rows):
+    print(f"\n== {title} ==")
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    print(" | ".join(f"{h:>18}" for h in headers))
+    for row in rows:
+        print(" | ".join(f"{v:>18.3f}" if isinstance(v, float) else f"{v:>18}" for v in row.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the farmer profile store.")
+    parser.add_argument("--sizes", default="100000,1000000", help="Comma-separated profile counts to benchmark.")
+    parser.add_argument("--repeats", type=int, default=20, help="Lookups per measurement.")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    print_rows("find_farmer: full-column scan vs casefolded name index", [bench_name_lookup(n, args.repeats) for n in sizes])
+    print_rows("Profile save: full rewrite vs append-only journal", [bench_profile_save(n, args.repeats) for n in sizes])
+    print_rows("Validation: per-function row-wise cleaning vs shared schema validator", [bench_validation(n) for n in sizes])
+    print_rows("Name search: prefix scan vs sorted-key trie", [bench_name_search(n, args.repeats) for n in sizes])
+    print_rows("Spatial: haversine scan vs grid index", [bench_spatial_queries(n, args.repeats) for n in sizes])
+    print_rows("Q&A log: inline prompts vs content-addressed prompt blocks", [bench_prompt_dedup(n) for n in sizes])
+    print_rows("History search: substring scan vs BM25 inverted index", [bench_history_search(n // 100, args.repeats) for n in sizes])
+    print_rows("Weather HTTP: new connection per call vs pooled session", [bench_weather_http(200)])
+    print_rows("Forecast parsing: per-item loop vs columnar NumPy aggregation", [bench_forecast_parse(n, max(1, args.repeats // 10)) for n in (1, 1000)])
+    print_rows("Forecast rendering: parse per language vs parse once, render per language", [bench_forecast_render(n, args.repeats) for n in (1, len(app.translations))])
+    print_rows("Weather: API call per query vs grid-cell forecast cache", [bench_weather_cache(2000)])
+    print_rows("Weather quota: burst of distinct cells against a rate-limited upstream", [bench_weather_quota(40)])
+    print_rows("Weather: concurrent identical fetches, single-flight per process vs lock file across processes", [bench_weather_coalescing(20, n) for n in (1, 4)])
+    print_rows("Context: live section assembly vs precomputed regional bundles", [bench_context_bundles(5000)])
+    print_rows("History: full Log.csv scan vs gzip daily segments with offset index", [bench_history_load(n, args.repeats) for n in sizes])
+    print_rows("Storage: CSV vs Parquet (categorical language/soil, float32 size)", [bench_storage_formats(n) for n in sizes])
+
+
+if __name__ == "__main__":
+    main()
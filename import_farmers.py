@@ -0,0 +1,41 @@
+import argparse
+import sqlite3
+import sys
+
+import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import farmer profiles from a CSV or Parquet file.")
+    parser.add_argument("source", help="CSV or Parquet file with columns: " + ", ".join(app.CSV_COLUMNS))
+    parser.add_argument("--rejects", help="Write rejected rows and the rejection reason to this CSV file.")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and report without writing the profile database.")
+    args = parser.parse_args()
+
+    try:
+        report = app.bulk_import_farmers(args.source, dry_run=args.dry_run)
+    except (OSError, ValueError, RuntimeError, sqlite3.Error) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+
+    rejected = report.pop('rejected')
+    print(f"Rows read:              {report['read']}")
+    print(f"Valid rows:             {report['valid']}")
+    print(f"Inserted:               {report['inserted']}{' (dry run)' if args.dry_run else ''}")
+    print(f"Updated:                {report['updated']}{' (dry run)' if args.dry_run else ''}")
+    print(f"Rejected:               {len(rejected)}")
+    print(f"Duplicates in file:     {report['duplicates_in_file']} (last occurrence kept)")
+    for col in ('latitude', 'longitude', 'farm_size_ha', 'language'):
+        print(f"{col + ' defaulted:':<24}{report[f'{col}_defaulted']}")
+
+    if not rejected.empty:
+        if args.rejects:
+            rejected.to_csv(args.rejects, index=False, encoding='utf-8')
+            print(f"Rejected rows written to {args.rejects}")
+        else:
+            print(rejected.head(20).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import argparse
+import csv
+import datetime
+import gzip
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+
+import app
+
+LENGTH_PERCENTILES = (50, 90, 99)
+DEFAULT_TOP_FARMERS = 20
+
+
+def iter_log_rows(paths):
+    # Row-at-a-time: only the current record is ever held, whatever the size of the log.
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rt', newline='', encoding='utf-8', errors='replace') as log_file:
+            reader = csv.reader(log_file)
+            for row in reader:
+                if row == app.QA_LOG_COLUMNS or len(row) < 5:
+                    continue
+                yield row
+
+
+def default_log_paths(start_date=None, end_date=None):
+    paths = [path for _, path in app.qa_log_segments(start_date, end_date)]
+    if os.path.exists(app.QA_LOG_PATH):
+        paths.append(app.QA_LOG_PATH)
+    return paths
+
+
+def new_aggregate(track_farmers=False):
+    aggregate = {
+        'queries': 0,
+        'errors': 0,
+        'by_language': Counter(),
+        'by_intent': Counter(),
+        # Exact length histogram: bounded by the longest response, not by the number of rows.
+        'response_lengths': Counter(),
+    }
+    if track_farmers:
+        # Only the overall total counts farmers: per-day counters would grow with farmers x days.
+        aggregate['by_farmer'] = Counter()
+    return aggregate
+
+
+def update_aggregate(aggregate, farmer, language, query, response):
+    aggregate['queries'] += 1
+    aggregate['errors'] += app.is_error_log_response(response)
+    aggregate['by_language'][language] += 1
+    aggregate['by_intent'][app.detect_query_intent(query)] += 1
+    if 'by_farmer' in aggregate:
+        aggregate['by_farmer'][farmer] += 1
+    aggregate['response_lengths'][len(response)] += 1
+
+
+def compute_log_analytics(rows, start_date=None, end_date=None):
+    days = defaultdict(new_aggregate)
+    total = new_aggregate(track_farmers=True)
+    farmer_names = {}
+    start = start_date.isoformat() if start_date else None
+    end = end_date.isoformat() if end_date else None
+    for row in rows:
+        timestamp, farmer_name, language, query, response = row[:5]
+        day = timestamp[:10]
+        if (start and day < start) or (end and day > end):
+            continue
+        farmer = app.farmer_name_key(farmer_name)
+        farmer_names.setdefault(farmer, farmer_name.strip())
+        update_aggregate(days[day], farmer, language, query, response)
+        update_aggregate(total, farmer, language, query, response)
+    return {'days': dict(sorted(days.items())), 'total': total, 'farmer_names': farmer_names}
+
+
+def length_summary(lengths):
+    count = sum(lengths.values())
+    if not count:
+        return {'min': 0, 'max': 0, 'mean': 0.0, **{f"p{p}": 0 for p in LENGTH_PERCENTILES}}
+    summary = {'min': min(lengths), 'max': max(lengths), 'mean': sum(k * v for k, v in lengths.items()) / count}
+    targets = [(p, p / 100 * count) for p in LENGTH_PERCENTILES]
+    seen = 0
+    for length in sorted(lengths):
+        seen += lengths[length]
+        while targets and seen >= targets[0][1]:
+            summary[f"p{targets.pop(0)[0]}"] = length
+    return summary
+
+
+def summarize_aggregate(aggregate, farmer_names, top_farmers=0):
+    summary = {
+        'queries': aggregate['queries'],
+        'errors': aggregate['errors'],
+        'error_rate': aggregate['errors'] / aggregate['queries'] if aggregate['queries'] else 0.0,
+        'by_language': dict(aggregate['by_language'].most_common()),
+        'by_intent': dict(aggregate['by_intent'].most_common()),
+        'response_length': length_summary(aggregate['response_lengths']),
+    }
+    if 'by_farmer' in aggregate:
+        farmers = aggregate['by_farmer'].most_common(top_farmers or None)
+        summary['by_farmer'] = {farmer_names.get(key, key): count for key, count in farmers}
+    return summary
+
+
+def build_report(analytics, top_farmers=0):
+    names = analytics['farmer_names']
+    return {
+        'days': {day: summarize_aggregate(agg, names, top_farmers) for day, agg in analytics['days'].items()},
+        'total': summarize_aggregate(analytics['total'], names, top_farmers),
+    }
+
+
+def report_rows(report):
+    sections = list(report['days'].items()) + [("ALL", report['total'])]
+    for day, summary in sections:
+        for metric in ('queries', 'errors', 'error_rate'):
+            yield [day, metric, "", summary[metric]]
+        for metric in ('by_language', 'by_intent', 'by_farmer', 'response_length'):
+            for key, value in summary.get(metric, {}).items():
+                yield [day, metric, key, value]
+
+
+def write_report(report, output_format, out_file):
+    if output_format == "json":
+        json.dump(report, out_file, ensure_ascii=False, indent=2)
+        out_file.write("\n")
+        return
+    writer = csv.writer(out_file, lineterminator='\n')
+    writer.writerow(['day', 'metric', 'key', 'value'])
+    writer.writerows(report_rows(report))
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got '{value}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-pass daily analytics over the Q&A log.")
+    parser.add_argument("paths", nargs="*", help=f"Log files to read (.csv or .csv.gz). Defaults to the segments in {app.QA_LOG_DIR} plus a legacy {app.QA_LOG_PATH}.")
+    parser.add_argument("--start", type=parse_date, help="First day to include (YYYY-MM-DD).")
+    parser.add_argument("--end", type=parse_date, help="Last day to include (YYYY-MM-DD).")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="Output format.")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout.")
+    parser.add_argument("--top-farmers", type=int, default=DEFAULT_TOP_FARMERS, help=f"Report the N busiest farmers over the whole range (default {DEFAULT_TOP_FARMERS}, 0 = all).")
+    args = parser.parse_args()
+
+    paths = args.paths or default_log_paths(args.start, args.end)
+    if not paths:
+        print(f"No Q&A log found in {app.QA_LOG_DIR} or {app.QA_LOG_PATH}.", file=sys.stderr)
+        return 1
+
+    try:
+        analytics = compute_log_analytics(iter_log_rows(paths), args.start, args.end)
+    except (OSError, csv.Error) as e:
+        print(f"Could not read the Q&A log: {e}", file=sys.stderr)
+        return 1
+
+    report = build_report(analytics, args.top_farmers)
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as out_file:
+            write_report(report, args.format, out_file)
+        print(f"Analytics for {report['total']['queries']} queries written to {args.output}")
+    else:
+        write_report(report, args.format, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
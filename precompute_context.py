@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+import app
+
+
+def bundle_targets(profiles, languages=None, season=None):
+    # One bundle per (grid cell, soil, season, language); the first farmer seen in a group supplies the coordinates.
+    season = season or app.current_season()
+    targets = {}
+    for row in profiles.itertuples(index=False):
+        profile = app.FarmerProfile(name="precompute", language=row.language, latitude=row.latitude, longitude=row.longitude, soil_type=row.soil_type)
+        if not profile.has_location:
+            continue
+        for language in languages or [profile.language]:
+            key = app.context_bundle_key(profile.latitude, profile.longitude, profile.soil_type, season, language)
+            targets.setdefault(key, (profile.latitude, profile.longitude, profile.soil_type))
+    return targets
+
+
+def precompute_bundles(targets, weather_api_key):
+    report = {'bundles': 0, 'with_weather': 0, 'failed': 0}
+    for key, (latitude, longitude, soil) in targets.items():
+        _, _, season, language = key
+        sections = app.build_context_bundle(latitude, longitude, soil, season, language, weather_api_key)
+        if not app.store_context_bundle(key, sections):
+            report['failed'] += 1
+            continue
+        report['bundles'] += 1
+        report['with_weather'] += 'weather' in sections
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute advisory context bundles per (grid cell, soil, season, language). Run on a schedule, e.g. every 3 hours from cron.")
+    parser.add_argument("--languages", help="Comma-separated languages to build (default: each farmer's profile language).")
+    parser.add_argument("--season", choices=["Kharif", "Rabi"], help="Season to build for (default: the current season).")
+    parser.add_argument("--weather-api-key", default=os.environ.get("WEATHER_API_KEY", ""), help="OpenWeatherMap key (default: $WEATHER_API_KEY). Without one, bundles omit the weather section.")
+    args = parser.parse_args()
+
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()] if args.languages else None
+    unknown = [lang for lang in languages or [] if lang not in app.translations]
+    if unknown:
+        print(f"Unknown languages: {', '.join(unknown)}. Available: {', '.join(app.translations)}", file=sys.stderr)
+        return 1
+
+    try:
+        profiles = app.read_farmer_columns(['language', 'latitude', 'longitude', 'soil_type'])
+    except (OSError, ValueError) as e:
+        print(f"Could not read farmer profiles: {e}", file=sys.stderr)
+        return 1
+
+    targets = bundle_targets(profiles, languages, args.season)
+    start = time.perf_counter()
+    report = precompute_bundles(targets, args.weather_api_key)
+    print(f"Farmer profiles:        {len(profiles)}")
+    print(f"Bundles written:        {report['bundles']} to {app.CONTEXT_BUNDLE_PATH}")
+    print(f"With weather section:   {report['with_weather']}")
+    print(f"Failed writes:          {report['failed']}")
+    print(f"Elapsed:                {time.perf_counter() - start:.1f}s")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())